@@ -6,8 +6,12 @@ echo "Starting MLflow UI..."
 uv run mlflow ui --host 0.0.0.0 --port 5000 --backend-store-uri file:///app/mlruns &
 
 # 2. Start API Backend
+# Pre-forked workers share one copy of the model; API_WORKERS overrides the CPU-based default.
+# `kill -HUP` on the server reloads model and workers without dropping requests.
+# With more than one worker chat sessions live in Data/chat_sessions.sqlite (CHAT_MEMORY_DB) so any
+# worker can continue a conversation; CHAT_MEMORY_BACKEND=memory is only valid with API_WORKERS=1.
 echo "Starting FastAPI Backend..."
-uv run uvicorn src.nps_latam.api:app --host 0.0.0.0 --port 8000 &
+uv run python -m src.nps_latam.serve --host 0.0.0.0 --port 8000 &
 
 # 3. Start Streamlit Frontend
 echo "Starting Streamlit Frontend on 7860..."
@@ -1,6 +1,36 @@
-from .config import PROJECT_ROOT, DATA_DIR, PROCESSED_DATA_PATH
-from .data_utils import load_processed_dataset, info_dataset
-from .data_pipeline import clean_and_save_dataset, split_data
-from .evaluation import get_model_metrics, get_cv_metrics
-from .model_training import create_logreg_pipeline, run_rfecv_selection, apply_feature_selection
-from .chatbot import FlightChatbot
+import importlib
+
+# Public names are resolved on first access, so importing the package does not
+# pull in sklearn, langchain or MLflow for subsystems the caller never touches.
+_LAZY_ATTRS = {
+    "PROJECT_ROOT": "config",
+    "DATA_DIR": "config",
+    "PROCESSED_DATA_PATH": "config",
+    "load_processed_dataset": "data_utils",
+    "info_dataset": "data_utils",
+    "clean_and_save_dataset": "data_pipeline",
+    "split_data": "data_pipeline",
+    "get_model_metrics": "evaluation",
+    "get_cv_metrics": "evaluation",
+    "get_cv_scores": "evaluation",
+    "bootstrap_metrics": "evaluation",
+    "create_logreg_pipeline": "model_training",
+    "run_rfecv_selection": "model_training",
+    "apply_feature_selection": "model_training",
+    "FlightChatbot": "chatbot",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class RateLimited(Exception):
+    """The client exceeded its rate limit; retry after `retry_after` seconds (HTTP 429)."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s.")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """No LLM capacity is available right now; retry after `retry_after` seconds (HTTP 503)."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Service overloaded, retry after {retry_after:.1f}s.")
+        self.retry_after = retry_after
+
+
+class RequestTooLarge(Exception):
+    """The request costs more than a full bucket, so it could never be admitted (HTTP 413)."""
+
+    def __init__(self, cost: float, capacity: float):
+        super().__init__(f"Request cost {cost:g} exceeds the per-client burst of {capacity:g}; split it up.")
+        self.cost = cost
+        self.capacity = capacity
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum tokens (burst size).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, cost: float = 1.0) -> float:
+        """Takes `cost` tokens. Returns 0 on success, otherwise the seconds until they are available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if cost > self.capacity:
+            # Could never be satisfied; ask the client to wait for a full bucket
+            return self.capacity / self.rate
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    def __init__(self, rate: float, burst: float, max_clients: int = 10_000):
+        """
+        Per-client token buckets.
+
+        Args:
+            rate (float): Sustained requests (cost units) per second per client. 0 disables limiting.
+            burst (float): Bucket capacity per client.
+            max_clients (int): Buckets kept; the least recently seen clients are dropped beyond it.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str, cost: float = 1.0):
+        """
+        Charges `cost` to the client's bucket; raises RateLimited when it is empty and
+        RequestTooLarge when `cost` is above the burst (waiting would never help).
+        """
+        if self.rate <= 0:
+            return
+        if cost > self.burst:
+            raise RequestTooLarge(cost, self.burst)
+        with self._lock:
+            bucket = self._buckets.pop(client, None) or TokenBucket(self.rate, self.burst)
+            self._buckets[client] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            retry_after = bucket.try_acquire(cost)
+        if retry_after:
+            raise RateLimited(retry_after)
+
+
+class ConcurrencyBudget:
+    def __init__(self, limit: int, acquire_timeout: float = 0.5, retry_after: float = 2.0):
+        """
+        Global cap on concurrent LLM calls.
+
+        Args:
+            limit (int): Maximum calls in flight.
+            acquire_timeout (float): Seconds a call waits for a free slot before being shed.
+            retry_after (float): Retry-After hint returned with shed requests.
+        """
+        self.limit = limit
+        self.acquire_timeout = acquire_timeout
+        self.retry_after = retry_after
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+
+    @contextmanager
+    def slot(self):
+        """Holds one slot for the duration of the block; raises Overloaded if none frees up in time."""
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.shed += 1
+            raise Overloaded(self.retry_after)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def resize(self, limit: int):
+        """Changes the limit. Only valid while no call holds a slot (e.g. at worker startup)."""
+        with self._lock:
+            if self.in_flight:
+                raise RuntimeError("Cannot resize a concurrency budget with calls in flight.")
+            self.limit = limit
+            self._semaphore = threading.BoundedSemaphore(limit)
+
+    def wrap(self, func):
+        """Returns `func` running inside a slot (e.g. an LLM batch analyzer)."""
+        def limited(*args, **kwargs):
+            with self.slot():
+                return func(*args, **kwargs)
+        return limited
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self.in_flight, "shed": self.shed}
+
+
+def chunked(items: list, size: int):
+    """Splits `items` into consecutive lists of at most `size` elements."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def chunk_count(n: int, size: int) -> int:
+    return max(1, math.ceil(n / size))
@@ -1,9 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
 import pandas as pd
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import sys
 import os
+import json
+import math
+import signal
+import time
 from pathlib import Path
 
 # Add project root to sys.path
@@ -19,43 +23,138 @@ from src.nps_latam import (
     create_logreg_pipeline,
     FlightChatbot
 )
-from src.nps_latam.genai_features import analyze_feedback_batch
+from src.nps_latam.genai_features import calculate_csi, analyze_feedback_batch
+from src.nps_latam.log_analytics import ChatLogTail
+from src.nps_latam.tiered_analysis import TieredFeedbackAnalyzer
+from src.nps_latam.model_registry import ModelRegistry
+from src.nps_latam.feature_schema import SchemaError
+from src.nps_latam.admission import (
+    ClientRateLimiter, ConcurrencyBudget, RateLimited, Overloaded, RequestTooLarge, chunked, chunk_count,
+)
+from src.nps_latam.fake_llm import FakeChatModel, make_fake_feedback_analyzer
+from src.nps_latam.jobs import JobQueue, JobStore
 
 app = FastAPI(title="NPS Latam API", description="API for Flight Satisfaction Prediction and Chatbot", version="1.0.0")
 
 # --- Global State ---
-model_pipeline = None
-model_features = None
+# The registry's run index refreshes at most every DASHBOARD_RUN_TTL seconds and only
+# reads runs created since the previous refresh
+model_registry = ModelRegistry(
+    forest_quantize=os.getenv("MODEL_FOREST_QUANTIZE", "float64"),
+    best_metric=os.getenv("DASHBOARD_BEST_METRIC", "roc_auc"),
+    runs_refresh_interval=float(os.getenv("DASHBOARD_RUN_TTL", "30")),
+)
 chatbot_instance = None
+# Aggregates are snapshotted so a restarted worker only parses rows logged since
+chat_log_tail = ChatLogTail(project_root / "Data" / "chatbot_logs.csv",
+                            snapshot_path=project_root / "Data" / "chatbot_log_stats.json")
+
+# Admission control for the LLM-backed endpoints: per-client token buckets (cost 1 per
+# chat message or feedback chunk) and a global cap on concurrent LLM calls.
+# Clients are identified by the X-Client-Id header (the portal sends one per browser
+# session), falling back to the remote address; a request costing more than
+# LLM_RATE_BURST chunks is rejected with 413.
+# Buckets and slots live in each process: with WEB_CONCURRENCY workers (set by serve.py)
+# every worker enforces 1/N of LLM_RATE_LIMIT and LLM_MAX_CONCURRENCY (at least one slot),
+# so the totals match the settings. LLM_RATE_BURST stays per worker, as it also caps the
+# size of a single request: a client spread over N workers can burst N times once.
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "1.0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+llm_rate_limiter = ClientRateLimiter(
+    rate=LLM_RATE_LIMIT,
+    burst=float(os.getenv("LLM_RATE_BURST", "10")),
+)
+llm_budget = ConcurrencyBudget(
+    limit=LLM_MAX_CONCURRENCY,
+    acquire_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "0.5")),
+)
+FEEDBACK_MAX_TEXTS = int(os.getenv("FEEDBACK_MAX_TEXTS", "1000"))
+FEEDBACK_CHUNK_SIZE = int(os.getenv("FEEDBACK_CHUNK_SIZE", "100"))
+
+# LLM_BACKEND=fake swaps Gemini for a local fake (load tests, no quota used)
+USE_FAKE_LLM = os.getenv("LLM_BACKEND", "gemini") == "fake"
+
+# Local rules/model answer confident cases; only the rest reaches Gemini
+feedback_analyzer = TieredFeedbackAnalyzer(
+    # Fake labels must not end up in the cache the local model is trained on
+    cache_path=None if USE_FAKE_LLM else str(project_root / "Data" / "genai_feedback_cache.json"),
+    confidence_threshold=float(os.getenv("FEEDBACK_LOCAL_CONFIDENCE", "0.8")),
+    llm_analyzer=llm_budget.wrap(make_fake_feedback_analyzer() if USE_FAKE_LLM else analyze_feedback_batch),
+)
+
+# Dashboard cache: CSI results are keyed on the log size
+_csi_cache = {}
+
+# Background jobs; created at startup so pre-forked workers each open their own SQLite connection
+JOBS_DB = os.getenv("JOBS_DB", str(project_root / "Data" / "jobs.sqlite"))
+FEEDBACK_JOB_MAX_TEXTS = int(os.getenv("FEEDBACK_JOB_MAX_TEXTS", "50000"))
+# Seconds running jobs get to finish on shutdown before they are marked failed (serve.py
+# sets its graceful timeout)
+JOBS_SHUTDOWN_TIMEOUT = float(os.getenv("JOBS_SHUTDOWN_TIMEOUT", "30"))
+job_queue = None
+
+# MODEL_REGISTRY_WATCH_* settings
+WATCH_INTERVAL = float(os.getenv("MODEL_REGISTRY_WATCH_INTERVAL") or 0)
+WATCH_MODE = os.getenv("MODEL_REGISTRY_WATCH_MODE", "activate")
+WATCH_SHADOW_FRACTION = float(os.getenv("MODEL_REGISTRY_SHADOW_FRACTION", "0.1"))
+# serve.py watches in the pre-fork parent and forks workers sharing each new model,
+# so workers must not each load their own copy
+watch_in_worker = True
+# Set by serve.py: file through which a worker hands registry swaps to the parent
+serving_state_path = None
 
 # --- Pydantic Data Models ---
 class PassengerFeatures(BaseModel):
-    # Dictionary to allow dynamic features matching the training set
-    # Expected keys: 'Gender', 'age', 'Wif_a_bordo', etc. (as per processed dataset columns)
-    data: dict
+    # Keys are the active model's features (processed dataset columns, e.g. 'Edad', 'Wifi_a_bordo');
+    # they are validated against the schema generated from them, see GET /predict/schema
+    data: Dict[str, Any]
+    # Set missing features to 0 instead of rejecting the request (reported as missing_fields)
+    fill_missing: bool = False
 
 class ChatRequest(BaseModel):
     message: str
+    # Conversation id; turns of the same session share server-side memory
+    session_id: Optional[str] = None
 
 class FeedbackRequest(BaseModel):
     texts: List[str]
 
-# --- Startup Event ---
-@app.on_event("startup")
-def startup():
-    global model_pipeline, model_features, chatbot_instance
-    
-    print("Starting NPS Latam API Services...")
-    
-    # 1. Initialize Chatbot
-    try:
-        log_path = project_root / "Data" / "chatbot_logs.csv"
-        chatbot_instance = FlightChatbot(log_file=str(log_path))
-        print("✅ Chatbot initialized.")
-    except Exception as e:
-        print(f"❌ Chatbot initialization failed: {e}")
-        
-    # 2. Train and Load Model
+class TrainJobRequest(BaseModel):
+    # NPS_TEXT_FEATURES env var when omitted
+    use_text_features: Optional[bool] = None
+    # Load the new run into the registry and serve it once training finishes
+    activate: bool = False
+
+class RetrainJobRequest(BaseModel):
+    # CSV partitions with new labelled rows, relative to the Data/ directory
+    partitions: List[str]
+    model_kind: str = "forest"
+    parent_run_id: Optional[str] = None
+    n_new_trees: int = 20
+    # Oldest trees are dropped beyond this forest size
+    max_estimators: int = 300
+    activate: bool = False
+
+class LoadModelRequest(BaseModel):
+    # Latest run of the experiment when omitted
+    run_id: Optional[str] = None
+    activate: bool = False
+
+class ActivateModelRequest(BaseModel):
+    version: str
+    retire_previous: bool = True
+
+class ShadowModelRequest(BaseModel):
+    version: str
+    fraction: float = 0.1
+
+# --- Model Loading ---
+def load_model():
+    """
+    Trains the serving model and activates it in the registry.
+    Called from the startup event, or once in the parent process by `serve.py`
+    so forked workers share the fitted model instead of each training their own.
+    """
     # In a production environment, we would load a serialized .pkl file.
     # Here, we train largely for demonstration purposes on startup.
     try:
@@ -69,72 +168,511 @@ def startup():
         # Split
         X_train, X_valid, X_test, y_train, y_valid, y_test = split_data(df_processed)
         
-        # Store feature names to align input later
-        model_features = list(X_train.columns)
-        
-        # Create and Fit Pipeline
-        model_pipeline = create_logreg_pipeline()
-        model_pipeline.fit(X_train, y_train)
-        print(f"✅ Model trained on {len(X_train)} records. Features: {len(model_features)}")
+        # Create and Fit Pipeline; feature names are stored to align input later
+        pipeline = create_logreg_pipeline()
+        pipeline.fit(X_train, y_train)
+        version = f"local-logreg-{time.strftime('%Y%m%d%H%M%S')}"
+        model_registry.register(version, pipeline, X_train.columns, activate=True)
+        print(f"✅ Model trained on {len(X_train)} records. Features: {X_train.shape[1]}")
         
     except Exception as e:
         print(f"❌ Model training failed: {e}")
 
+# --- Startup Event ---
+@app.on_event("startup")
+def startup():
+    global chatbot_instance, job_queue
+    
+    print("Starting NPS Latam API Services...")
+    
+    # 1. Initialize Chatbot
+    try:
+        log_path = project_root / "Data" / "chatbot_logs.csv"
+        llm = FakeChatModel(latency=float(os.getenv("FAKE_LLM_LATENCY", "0.2"))) if USE_FAKE_LLM else None
+        chatbot_instance = FlightChatbot(log_file=str(log_path), llm=llm)
+        print("✅ Chatbot initialized.")
+    except Exception as e:
+        print(f"❌ Chatbot initialization failed: {e}")
+        
+    # Per-process admission limits: this worker's share of the configured totals
+    api_workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1") or 1))
+    llm_rate_limiter.rate = LLM_RATE_LIMIT / api_workers
+    llm_budget.resize(max(1, LLM_MAX_CONCURRENCY // api_workers))
+
+    # Local feedback model: fitted from the LLM label cache in the background, per worker
+    feedback_analyzer.fit_async()
+
+    # 2. Train and Load Model (skipped when preloaded by the serving parent)
+    if model_registry.active is None:
+        load_model()
+
+    # 3. Background job queue
+    store = JobStore(JOBS_DB)
+    orphans = store.fail_orphans()
+    if orphans:
+        print(f"Marked {orphans} interrupted jobs as failed.")
+    job_queue = JobQueue(store, workers=int(os.getenv("JOBS_WORKERS", "2")))
+    job_queue.register("analyze_feedback", _analyze_feedback_job)
+    job_queue.register("train", _train_job)
+    job_queue.register("retrain", _retrain_job)
+    job_queue.register("drift_report", _drift_report_job)
+
+    # 4. Optionally follow the MLflow experiment and hot-swap new runs in
+    if WATCH_INTERVAL and watch_in_worker:
+        model_registry.watch(interval=WATCH_INTERVAL, mode=WATCH_MODE, shadow_fraction=WATCH_SHADOW_FRACTION)
+        print(f"✅ Watching MLflow registry every {WATCH_INTERVAL:g}s.")
+
+@app.on_event("shutdown")
+def shutdown():
+    model_registry.stop_watching()
+    chat_log_tail.save_snapshot()
+    if job_queue is not None:
+        job_queue.shutdown(timeout=JOBS_SHUTDOWN_TIMEOUT)
+
 # --- Endpoints ---
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "model_loaded": model_pipeline is not None, "chatbot_loaded": chatbot_instance is not None}
+    active = model_registry.active
+    return {
+        "status": "ok",
+        "model_loaded": active is not None,
+        "model_version": active.version if active else None,
+        "chatbot_loaded": chatbot_instance is not None,
+        "worker_pid": os.getpid(),
+    }
+
+def _score(model_version, data: dict, fill_missing: bool = False):
+    # Typed row straight from the request dict, in model column order
+    row, report = model_version.schema.parse(data, fill_missing=fill_missing)
+
+    # The scorer's feature order was checked at registration, so it takes the bare row
+    prob = model_version.scorer.predict_proba(row)[0][1]
+    prediction = int(model_version.pipeline.classes_[int(prob > 0.5)])
+    return prediction, float(prob), report
+
+def _shadow_score(version: str, data: dict, fill_missing: bool, primary_prob: float):
+    with model_registry.lease(version) as candidate:
+        if candidate is None or candidate.pipeline is None:
+            return
+        try:
+            _, shadow_prob, _ = _score(candidate, data, fill_missing)
+            model_registry.record_shadow(primary_prob, shadow_prob)
+        except Exception as e:
+            print(f"Shadow scoring with '{version}' failed: {e}")
 
 @app.post("/predict")
-def predict(features: PassengerFeatures):
-    if model_pipeline is None:
-        raise HTTPException(status_code=503, detail="Model is not available.")
-    
-    try:
-        # Create DataFrame from input
-        input_df = pd.DataFrame([features.data])
-        
-        # Align columns with training data
-        # Fill missing with 0, drop extras, strictly order columns
-        input_df_aligned = input_df.reindex(columns=model_features, fill_value=0)
-        
-        # Predict
-        prediction = model_pipeline.predict(input_df_aligned)[0]
-        prob = model_pipeline.predict_proba(input_df_aligned)[0][1]
-        
+def predict(features: PassengerFeatures, background_tasks: BackgroundTasks):
+    with model_registry.lease() as model_version:
+        if model_version is None:
+            raise HTTPException(status_code=503, detail="Model is not available.")
+
+        try:
+            prediction, prob, report = _score(model_version, features.data, features.fill_missing)
+        except SchemaError as e:
+            raise HTTPException(status_code=422, detail={"message": str(e), **e.report})
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
+
+    # Candidate scoring runs after the response is sent so it never adds latency
+    shadow_version = model_registry.pick_shadow()
+    if shadow_version is not None:
+        background_tasks.add_task(_shadow_score, shadow_version, features.data, features.fill_missing, prob)
+
+    return {
+        "prediction": prediction,
+        "probability": prob,
+        "label": "Satisfied" if prediction == 1 else "Neutral/Dissatisfied",
+        "model_version": model_version.version,
+        "missing_fields": report["missing"],
+        "derived_fields": report["derived"],
+    }
+
+@app.post("/predict/explain")
+def predict_explain(features: PassengerFeatures, top_k: int = 5):
+    """
+    Prediction plus the features that drove it: coefficient x scaled value (log-odds)
+    for linear models, path contributions to the probability for forests.
+    Repeated feature vectors are served from the model's explanation cache.
+    """
+    with model_registry.lease() as model_version:
+        if model_version is None:
+            raise HTTPException(status_code=503, detail="Model is not available.")
+        explainer = model_version.explainer
+        if not explainer.supported:
+            raise HTTPException(status_code=501, detail=f"Model version '{model_version.version}' cannot be explained.")
+
+        try:
+            row, report = model_version.schema.parse(features.data, fill_missing=features.fill_missing)
+            prob, base_value, contributions = explainer.explain_row(row)
+        except SchemaError as e:
+            raise HTTPException(status_code=422, detail={"message": str(e), **e.report})
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Explanation error: {str(e)}")
+        prediction = int(model_version.pipeline.classes_[int(prob > 0.5)])
+
         return {
-            "prediction": int(prediction),
-            "probability": float(prob),
-            "label": "Satisfied" if prediction == 1 else "Neutral/Dissatisfied"
+            "prediction": prediction,
+            "probability": prob,
+            "label": "Satisfied" if prediction == 1 else "Neutral/Dissatisfied",
+            "model_version": model_version.version,
+            "method": explainer.kind,
+            "units": explainer.units,
+            "base_value": base_value,
+            "contributions": explainer.top(row, contributions, k=max(top_k, 0)),
+            "missing_fields": report["missing"],
+            "derived_fields": report["derived"],
         }
+
+@app.get("/predict/schema")
+def predict_schema():
+    """JSON Schema of the `data` object accepted by /predict for the active model."""
+    with model_registry.lease() as model_version:
+        if model_version is None:
+            raise HTTPException(status_code=503, detail="Model is not available.")
+        return {"model_version": model_version.version, "schema": model_version.schema.json_schema()}
+
+# --- Model Registry Admin ---
+
+@app.get("/admin/models")
+def list_models():
+    return model_registry.describe()
+
+def _publish_registry_state():
+    """
+    Under serve.py a swap only changes the registry of the worker that handled it, and
+    workers forked afterwards would undo it. The worker hands its registry state to the
+    parent (SIGUSR2), which applies it and forks a new generation serving it.
+    Concurrent swaps through different workers: the last one published wins.
+    """
+    if serving_state_path is None:
+        return
+    tmp_path = f"{serving_state_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(model_registry.export_state(), f)
+    os.replace(tmp_path, serving_state_path)
+    os.kill(os.getppid(), signal.SIGUSR2)
+
+@app.get("/admin/models/runs")
+def list_model_runs(max_results: int = 20):
+    try:
+        return model_registry.list_runs(max_results=max_results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Registry error: {str(e)}")
+
+@app.post("/admin/models/load")
+def load_model_version(request: LoadModelRequest):
+    try:
+        model_version = model_registry.load_from_mlflow(request.run_id, activate=request.activate)
+        _publish_registry_state()
+        return model_version.describe()
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Model load error: {str(e)}")
+
+@app.post("/admin/models/activate")
+def activate_model(request: ActivateModelRequest):
+    try:
+        model_registry.activate(request.version, retire_previous=request.retire_previous)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    _publish_registry_state()
+    return model_registry.describe()
+
+@app.post("/admin/models/shadow")
+def shadow_model(request: ShadowModelRequest):
+    try:
+        model_registry.set_shadow(request.version, request.fraction)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _publish_registry_state()
+    return model_registry.describe()
+
+@app.delete("/admin/models/shadow")
+def clear_shadow_model():
+    model_registry.clear_shadow()
+    _publish_registry_state()
+    return model_registry.describe()
+
+@app.delete("/admin/models/{version}")
+def unload_model(version: str):
+    try:
+        model_registry.unload(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _publish_registry_state()
+    return model_registry.describe()
+
+def _client_id(http_request: Request) -> str:
+    # Behind the portal every user shares one host; X-Client-Id lets callers identify themselves
+    return http_request.headers.get("X-Client-Id") or (http_request.client.host if http_request.client else "unknown")
+
+def _shed(e: Exception):
+    if isinstance(e, RequestTooLarge):
+        raise HTTPException(status_code=413, detail=str(e))
+    status_code = 429 if isinstance(e, RateLimited) else 503
+    raise HTTPException(status_code=status_code, detail=str(e),
+                        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
 
 @app.post("/chat")
-def chat_endpoint(request: ChatRequest):
+def chat_endpoint(request: ChatRequest, http_request: Request):
     if chatbot_instance is None:
         raise HTTPException(status_code=503, detail="Chatbot is not available.")
     
     try:
-        response = chatbot_instance.respond(request.message)
-        return {"response": response}
+        llm_rate_limiter.check(_client_id(http_request))
+        with llm_budget.slot():
+            response = chatbot_instance.respond(request.message, session_id=request.session_id)
+        return {"response": response, "session_id": request.session_id}
+    except (RateLimited, Overloaded, RequestTooLarge) as e:
+        _shed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+@app.delete("/chat/sessions/{session_id}")
+def clear_chat_session(session_id: str):
+    if chatbot_instance is None:
+        raise HTTPException(status_code=503, detail="Chatbot is not available.")
+    chatbot_instance.memory.clear(session_id)
+    return {"session_id": session_id, "cleared": True}
+
 @app.post("/analyze_feedback")
-def analyze_endpoint(request: FeedbackRequest):
+def analyze_endpoint(request: FeedbackRequest, http_request: Request):
+    if len(request.texts) > FEEDBACK_MAX_TEXTS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {FEEDBACK_MAX_TEXTS} texts per request; got {len(request.texts)}.")
     try:
-        # This uses the external GenAI module
+        # Local tiers first, the external GenAI module for the rest
         if not request.texts:
             return []
-            
-        df_result = analyze_feedback_batch(request.texts)
-        # Convert to list of dicts
-        return df_result.to_dict(orient="records")
+
+        # Large requests are processed in chunks so one client cannot hold LLM slots for long
+        llm_rate_limiter.check(_client_id(http_request), cost=chunk_count(len(request.texts), FEEDBACK_CHUNK_SIZE))
+        records = []
+        for chunk in chunked(request.texts, FEEDBACK_CHUNK_SIZE):
+            df_result = feedback_analyzer.analyze(chunk)
+            # Convert to list of dicts
+            records.extend(df_result.to_dict(orient="records"))
+        return records
+    except (RateLimited, Overloaded, RequestTooLarge) as e:
+        _shed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
+@app.get("/analyze_feedback/stats")
+def analyze_stats():
+    return feedback_analyzer.stats()
+
+@app.get("/admin/limits")
+def admission_stats():
+    return {
+        "llm_backend": "fake" if USE_FAKE_LLM else "gemini",
+        "rate_limit": {"rate": llm_rate_limiter.rate, "burst": llm_rate_limiter.burst},
+        "llm_concurrency": llm_budget.stats(),
+        "feedback": {"max_texts": FEEDBACK_MAX_TEXTS, "chunk_size": FEEDBACK_CHUNK_SIZE},
+    }
+
+# --- Background Jobs ---
+
+def _analyze_feedback_job(ctx, texts):
+    records = []
+    chunks = chunked(texts, FEEDBACK_CHUNK_SIZE)
+    for i, chunk in enumerate(chunks):
+        ctx.progress(i / len(chunks), f"Analyzed {len(records)}/{len(texts)} texts")
+        records.extend(feedback_analyzer.analyze(chunk).to_dict(orient="records"))
+    return records
+
+def _train_job(ctx, use_text_features=None, activate=False):
+    from src.nps_latam.train_mlflow import train_and_track
+
+    result = train_and_track(use_text_features=use_text_features, progress=ctx.progress)
+    if result is None:
+        raise RuntimeError("Training did not complete; see the API logs.")
+    if activate:
+        ctx.progress(0.95, "Activating model")
+        result["model_version"] = model_registry.load_from_mlflow(result["run_id"], activate=True).version
+        _publish_registry_state()
+    return result
+
+def _retrain_job(ctx, partitions, model_kind="forest", parent_run_id=None, n_new_trees=20, max_estimators=300,
+                 activate=False):
+    from src.nps_latam.incremental_training import train_incremental
+
+    result = train_incremental(partitions, model_kind=model_kind, parent_run_id=parent_run_id,
+                               n_new_trees=n_new_trees, max_estimators=max_estimators, progress=ctx.progress)
+    if activate:
+        ctx.progress(0.95, "Activating model")
+        result["model_version"] = model_registry.load_from_mlflow(result["run_id"], activate=True).version
+        _publish_registry_state()
+    return result
+
+def _drift_report_job(ctx):
+    from src.nps_latam.drift_detection import (
+        load_config, load_validated, generate_drift_report, generate_segment_drift_report,
+    )
+
+    config = load_config().get("drift_detection", {})
+    ref_path = project_root / config.get("reference_data_path", "Data/reference_data.csv")
+    cur_path = project_root / config.get("current_data_path", "Data/current_data.csv")
+    output_path = project_root / config.get("report_output_path", "reports/data_drift_report.html")
+    for path in (ref_path, cur_path):
+        if not path.exists():
+            raise FileNotFoundError(f"Drift input not found: {path}")
+
+    # Both reports share one load and validation of each batch
+    ctx.progress(0.0, "Loading and validating data")
+    ref_df = load_validated(str(ref_path), "drift_reference")
+    cur_df = load_validated(str(cur_path), "drift_current")
+
+    report_path = generate_drift_report(ref_df, cur_df, str(output_path),
+                                        column_config=config.get("column_mapping", {}),
+                                        progress=lambda fraction, message: ctx.progress(0.1 + 0.6 * fraction, message))
+    if report_path is None:
+        raise RuntimeError("Drift report generation failed; see the API logs.")
+
+    segment_config = config.get("segment_drift", {})
+    segment_output = project_root / segment_config.get("report_output_path", "reports/segment_drift.csv")
+    top_segments = generate_segment_drift_report(
+        ref_df, cur_df, str(segment_output), segment_config=segment_config,
+        column_config=config.get("column_mapping", {}),
+        progress=lambda fraction, message: ctx.progress(0.7 + 0.3 * fraction, message),
+    )
+    return {
+        "report_path": report_path,
+        "segment_report_path": str(segment_output),
+        "top_segments": top_segments.to_dict(orient="records"),
+    }
+
+def _public_job(job: dict) -> dict:
+    # Texts can be large; callers submitted them and do not need them echoed on every poll
+    job["params"].pop("texts", None)
+    return job
+
+def _require_jobs():
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available.")
+    return job_queue
+
+@app.post("/jobs/analyze_feedback", status_code=202)
+def submit_analyze_job(request: FeedbackRequest, http_request: Request):
+    queue = _require_jobs()
+    if len(request.texts) > FEEDBACK_JOB_MAX_TEXTS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {FEEDBACK_JOB_MAX_TEXTS} texts per job; got {len(request.texts)}.")
+    # Jobs run at the LLM concurrency budget's pace, so a submission costs at most one full
+    # bucket; charging every chunk would make any job above LLM_RATE_BURST chunks impossible
+    cost = chunk_count(len(request.texts), FEEDBACK_CHUNK_SIZE)
+    try:
+        llm_rate_limiter.check(_client_id(http_request), cost=min(cost, llm_rate_limiter.burst))
+    except RateLimited as e:
+        _shed(e)
+    return {"job_id": queue.submit("analyze_feedback", {"texts": request.texts}), "status": "queued"}
+
+@app.post("/jobs/train", status_code=202)
+def submit_train_job(request: TrainJobRequest):
+    queue = _require_jobs()
+    params = {"use_text_features": request.use_text_features, "activate": request.activate}
+    return {"job_id": queue.submit("train", params), "status": "queued"}
+
+@app.post("/jobs/retrain", status_code=202)
+def submit_retrain_job(request: RetrainJobRequest):
+    queue = _require_jobs()
+    data_dir = (project_root / "Data").resolve()
+    partitions = []
+    for name in request.partitions:
+        # Clients may only point at files inside Data/
+        path = (data_dir / name).resolve()
+        if data_dir not in path.parents or not path.is_file():
+            raise HTTPException(status_code=400, detail=f"Partition '{name}' not found under Data/.")
+        partitions.append(str(path))
+    params = {**request.model_dump(), "partitions": partitions}
+    return {"job_id": queue.submit("retrain", params), "status": "queued"}
+
+@app.post("/jobs/drift_report", status_code=202)
+def submit_drift_job():
+    queue = _require_jobs()
+    return {"job_id": queue.submit("drift_report"), "status": "queued"}
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50, status: Optional[str] = None):
+    return [_public_job(job) for job in _require_jobs().store.list(limit=limit, status=status)]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, include_result: bool = True):
+    job = _require_jobs().store.get(job_id, include_result=include_result)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return _public_job(job)
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = _require_jobs().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return _public_job(job)
+
+# --- Dashboard Data ---
+
+@app.get("/dashboard/kpis")
+def dashboard_kpis(days: int = 30):
+    chat_log_tail.refresh()
+    return chat_log_tail.kpis(days=days)
+
+@app.get("/dashboard/logs")
+def dashboard_logs(since: int = 0, limit: int = 500):
+    chat_log_tail.refresh()
+    return chat_log_tail.rows_since(cursor=since, limit=limit)
+
+@app.get("/dashboard/latest_run")
+def dashboard_latest_run():
+    try:
+        return model_registry.latest_run_summary() or {}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"MLflow error: {str(e)}")
+
+@app.get("/dashboard/best_run")
+def dashboard_best_run():
+    try:
+        return model_registry.best_run_summary() or {}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"MLflow error: {str(e)}")
+
+@app.get("/dashboard/csi")
+def dashboard_csi(limit: int = 20):
+    chat_log_tail.refresh()
+    cache_key = (limit, chat_log_tail.total)
+    if cache_key in _csi_cache:
+        return _csi_cache[cache_key]
+
+    texts = chat_log_tail.recent_queries(limit)
+    if not texts:
+        return {"csi": None, "analyzed": 0}
+    try:
+        results_df = feedback_analyzer.analyze(texts)
+    except Overloaded as e:
+        _shed(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+
+    keywords = [k for sublist in results_df.get("keywords", []) for k in (sublist or [])]
+    result = {
+        "csi": calculate_csi(results_df),
+        "analyzed": len(texts),
+        "sentiment_counts": results_df["sentiment"].value_counts().to_dict(),
+        "intent_counts": results_df["intent"].value_counts().to_dict() if "intent" in results_df.columns else {},
+        "top_keywords": pd.Series(keywords).value_counts().head(10).to_dict() if keywords else {},
+        "records": results_df.to_dict(orient="records"),
+    }
+    # Only the latest log state is worth keeping
+    _csi_cache.clear()
+    _csi_cache[cache_key] = result
+    return result
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds per endpoint group
+DEFAULT_TIMEOUTS = {
+    "health": (0.5, 1.0),
+    "predict": (2.0, 5.0),
+    "chat": (2.0, 60.0),
+    "dashboard": (2.0, 10.0),
+    "csi": (2.0, 120.0),
+}
+
+
+class ApiClient:
+    def __init__(self, base_url: str, timeouts: dict = None, retries: int = 2,
+                 pool_size: int = 10, health_ttl: float = 5.0, chat_workers: int = 4):
+        """
+        Shared HTTP client for the Streamlit portal.
+
+        Keeps connections alive in a pooled `requests.Session`, applies per-endpoint
+        timeouts, retries idempotent calls with backoff, caches the health check for
+        `health_ttl` seconds and runs chat calls on a background thread pool.
+
+        The client is shared by every portal session, so LLM-backed calls take a
+        `client_id` (one per browser session) sent as the X-Client-Id header; the API
+        rate-limits per client id, not per host.
+
+        Args:
+            base_url (str): Base URL of the NPS Latam API.
+            timeouts (dict): Overrides for DEFAULT_TIMEOUTS.
+            retries (int): Retries for idempotent calls (GETs and /predict).
+            pool_size (int): Max pooled connections to the API.
+            health_ttl (float): Seconds a health result is reused.
+            chat_workers (int): Threads available for background chat calls.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.health_ttl = health_ttl
+
+        # raise_on_status=False returns the last 5xx response once retries run out, so callers
+        # get an HTTPError from raise_for_status() rather than a RetryError
+        retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+        # Chat goes to the LLM: never replay it automatically
+        no_retry = Retry(total=0)
+
+        self.session = requests.Session()
+        self.session.mount(self.base_url, HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry))
+        self.session.mount(f"{self.base_url}/chat", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=no_retry))
+
+        self._health_lock = threading.Lock()
+        self._health = None
+        self._health_checked = 0.0
+        self._chat_pool = ThreadPoolExecutor(max_workers=chat_workers, thread_name_prefix="api-chat")
+
+    def _request(self, method: str, path: str, timeout_key: str, client_id: str = None, **kwargs):
+        if client_id:
+            kwargs["headers"] = {**kwargs.get("headers", {}), "X-Client-Id": client_id}
+        resp = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeouts[timeout_key], **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def health(self) -> dict:
+        """Returns the cached /health payload; raises requests.RequestException if the API is down."""
+        with self._health_lock:
+            if time.monotonic() - self._health_checked < self.health_ttl:
+                if isinstance(self._health, Exception):
+                    raise self._health
+                return self._health
+            try:
+                self._health = self._request("GET", "/health", "health")
+            except requests.RequestException as e:
+                self._health = e
+            self._health_checked = time.monotonic()
+            if isinstance(self._health, Exception):
+                raise self._health
+            return self._health
+
+    def predict(self, features: dict, fill_missing: bool = False) -> dict:
+        payload = {"data": features, "fill_missing": fill_missing}
+        return self._request("POST", "/predict", "predict", json=payload)
+
+    def explain(self, features: dict, fill_missing: bool = False, top_k: int = 5) -> dict:
+        payload = {"data": features, "fill_missing": fill_missing}
+        return self._request("POST", "/predict/explain", "predict", json=payload, params={"top_k": top_k})
+
+    def chat(self, message: str, session_id: str = None, client_id: str = None) -> str:
+        payload = {"message": message, "session_id": session_id}
+        return self._request("POST", "/chat", "chat", client_id=client_id,
+                             json=payload).get("response", "No response content.")
+
+    def chat_async(self, message: str, session_id: str = None, client_id: str = None):
+        """Submits a chat call to the background pool and returns its Future."""
+        return self._chat_pool.submit(self.chat, message, session_id, client_id)
+
+    def clear_chat_session(self, session_id: str) -> dict:
+        return self._request("DELETE", f"/chat/sessions/{session_id}", "dashboard")
+
+    def dashboard(self, name: str, timeout_key: str = "dashboard", **params) -> dict:
+        return self._request("GET", f"/dashboard/{name}", timeout_key, params=params)
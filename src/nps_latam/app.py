@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import os
+import uuid
 import pandas as pd
 import plotly.graph_objects as go
 from pathlib import Path
@@ -12,8 +13,7 @@ st.set_page_config(page_title="NPS Latam Portal", page_icon="✈️", layout="wi
 API_URL = os.getenv("API_URL", "http://0.0.0.0:8000")
 
 # Determine Project Root for direct file access (for Dashboard only)
-# In a real microservice architecture, dashboard should fetch data via API, not file system.
-# But for this monolithic repo structure, file access is acceptable.
+# Dashboard data comes from the API; local files are only stat'ed to key the caches.
 current_dir = Path(__file__).resolve().parent
 project_root = current_dir.parent.parent
 
@@ -21,6 +21,15 @@ import sys
 if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
+from src.nps_latam.api_client import ApiClient
+
+@st.cache_resource
+def get_api_client():
+    # One pooled client per server process, shared by all sessions and reruns
+    return ApiClient(API_URL)
+
+api_client = get_api_client()
+
 st.title("✈️ Portal de Experiencia del Cliente")
 
 # --- Tabs ---
@@ -34,37 +43,65 @@ with tab1:
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-    # Display Chat History
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    if "pending_chat" not in st.session_state:
+        st.session_state.pending_chat = None
+
+    # The API keeps the conversation memory; the browser session only holds its id
+    if "chat_session_id" not in st.session_state:
+        st.session_state.chat_session_id = uuid.uuid4().hex
+
+    # Rate-limit key for this browser session; unlike chat_session_id it survives "Borrar Chat"
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+
+    def _chat_result(future):
+        try:
+            return future.result()
+        except requests.HTTPError as e:
+            if e.response.status_code in (429, 503):
+                retry_after = e.response.headers.get("Retry-After", "unos")
+                return f"El asistente está ocupado. Intenta de nuevo en {retry_after} segundos."
+            return f"Error del servidor: {e.response.status_code} - {e.response.text}"
+        except Exception as e:
+            return f"No se pudo conectar con el API: {str(e)}"
+
+    def render_chat_history():
+        # Collect a finished background reply before drawing the history
+        pending = st.session_state.pending_chat
+        if pending is not None and pending.done():
+            st.session_state.messages.append({"role": "assistant", "content": _chat_result(pending)})
+            st.session_state.pending_chat = None
+            # run_every is only re-evaluated on a full rerun; this one stops the polling
+            st.rerun()
 
-    # Handle Input
+        # Display Chat History
+        for message in st.session_state.messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+        if st.session_state.pending_chat is not None:
+            with st.chat_message("assistant"):
+                st.caption("Conectando con el servidor...")
+
+    # Handle Input: the API call runs in the background so the rest of the page renders immediately
     if prompt := st.chat_input("Escribe tu consulta aquí..."):
-        with st.chat_message("user"):
-            st.markdown(prompt)
         st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.pending_chat = api_client.chat_async(prompt, st.session_state.chat_session_id,
+                                                              st.session_state.client_id)
 
-        # Call API
-        with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            full_response = ""
-            try:
-                with st.spinner("Conectando con el servidor..."):
-                    resp = requests.post(f"{API_URL}/chat", json={"message": prompt})
-                    if resp.status_code == 200:
-                        full_response = resp.json().get("response", "No response content.")
-                    else:
-                        full_response = f"Error del servidor: {resp.status_code} - {resp.text}"
-            except Exception as e:
-                full_response = f"No se pudo conectar con el API: {str(e)}"
-
-            message_placeholder.markdown(full_response)
-        
-        st.session_state.messages.append({"role": "assistant", "content": full_response})
+    # While a reply is pending only this fragment polls for it; collecting the reply
+    # triggers a full rerun, which renders the fragment again without run_every
+    poll_every = 0.5 if st.session_state.pending_chat is not None else None
+    st.fragment(run_every=poll_every)(render_chat_history)()
 
     if st.button("Borrar Chat"):
+        try:
+            api_client.clear_chat_session(st.session_state.chat_session_id)
+        except requests.RequestException:
+            pass  # The API evicts idle sessions anyway
         st.session_state.messages = []
+        st.session_state.pending_chat = None
+        st.session_state.chat_session_id = uuid.uuid4().hex
         st.rerun()
 
 # --- Tab 2: Prediction ---
@@ -101,61 +138,112 @@ with tab2:
                 "Comida_Bebida": food,
                 "Comodidad_Asiento": comfort,
                 "Entretenimiento": entertainment,
-                "Servicio_a_bordo": onboard_service,
+                "Servicio_Abordo": onboard_service,
                 "Espacio_Piernas": leg_room,
                 "Manejo_Equipaje": baggage,
-                "Gender_bin": 0, "CustomerType_bin": 0, "TypeOfTravel_bin": 0, "Class_Eco": 0, "Class_Eco Plus": 0
+                "TypeOfTravel_bin": 0, "Class_Eco": 0, "Class_Eco Plus": 0
             }
             
             try:
-                resp = requests.post(f"{API_URL}/predict", json={"data": features})
-                if resp.status_code == 200:
-                    result = resp.json()
-                    label = result["label"]
-                    prob = result["probability"]
-                    
-                    st.success(f"Predicción: **{label}**")
-                    st.metric("Probabilidad de Satisfacción", f"{prob:.2%}")
-                else:
-                    st.error(f"Error en predicción: {resp.text}")
+                # The form only covers part of the survey; the rest is filled with 0 and reported
+                result = api_client.explain(features, fill_missing=True, top_k=6)
+                label = result["label"]
+                prob = result["probability"]
+                
+                st.success(f"Predicción: **{label}**")
+                st.metric("Probabilidad de Satisfacción", f"{prob:.2%}")
+                if result.get("contributions"):
+                    # Positive contributions push towards "Satisfied"
+                    units = "log-odds" if result["units"] == "log_odds" else "probabilidad"
+                    st.markdown(f"**Factores principales** (contribución en {units})")
+                    drivers = pd.DataFrame(result["contributions"]).set_index("feature")["contribution"]
+                    st.bar_chart(drivers)
+                if result.get("missing_fields"):
+                    st.caption("Campos no informados (valor 0): " + ", ".join(result["missing_fields"]))
+            except requests.HTTPError as e:
+                st.error(f"Error en predicción: {e.response.text}")
             except Exception as e:
                 st.error(f"Error de conexión: {e}")
 
+# --- Dashboard data (pre-aggregated by the API) ---
+# Cached calls are keyed on the source file mtime when it is visible locally,
+# so a rerun only hits the API once the underlying data changed or the TTL expired.
+log_file = project_root / "Data" / "chatbot_logs.csv"
+mlruns_dir = project_root / "mlruns"
+
+def _source_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_chat_kpis(source_mtime):
+    return api_client.dashboard("kpis")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_latest_run(source_mtime):
+    return api_client.dashboard("latest_run")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_best_run(source_mtime):
+    return api_client.dashboard("best_run")
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_csi(source_mtime, limit):
+    return api_client.dashboard("csi", timeout_key="csi", limit=limit)
+
+def fetch_new_log_rows(total, max_rows=500):
+    """Appends only rows the session has not seen yet to the session's log buffer."""
+    if "log_rows" not in st.session_state:
+        st.session_state.log_rows = []
+        st.session_state.log_cursor = 0
+    if total > st.session_state.log_cursor:
+        payload = api_client.dashboard("logs", since=st.session_state.log_cursor, limit=max_rows)
+        st.session_state.log_rows = (st.session_state.log_rows + payload["rows"])[-max_rows:]
+        st.session_state.log_cursor = payload["cursor"]
+    return st.session_state.log_rows
+
 # --- Tab 3: KPI & Dashboard ---
 with tab3:
     st.header("📊 KPI Dashboard & Auditoría")
     
-    # Load Logs
-    log_file = project_root / "Data" / "chatbot_logs.csv"
-    
-    if log_file.exists():
-        try:
-            df_logs = pd.read_csv(log_file)
-            
-            # Metrics
-            st.subheader("Métricas de Chatbot")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Interacciones", len(df_logs))
-            
-            if "timestamp" in df_logs.columns and not df_logs.empty:
-                df_logs["timestamp"] = pd.to_datetime(df_logs["timestamp"])
-                last_msg = df_logs["timestamp"].max()
-                col2.metric("Última Interacción", str(last_msg))
+    try:
+        kpis = fetch_chat_kpis(_source_mtime(log_file))
+        
+        # Metrics
+        st.subheader("Métricas de Chatbot")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Interacciones", kpis["total_interactions"])
+        
+        if kpis["latest_interaction"]:
+            col2.metric("Última Interacción", str(pd.Timestamp(kpis["latest_interaction"])))
+        col3.metric("Tasa de Error", f"{kpis['error_rate']:.1%}")
 
+        if kpis["total_interactions"]:
             # Visualize
             st.subheader("Historial de Consultas")
+            log_rows = fetch_new_log_rows(kpis["total_interactions"])
+            df_logs = pd.DataFrame(log_rows).set_index("index")
             st.dataframe(df_logs.sort_index(ascending=False), use_container_width=True)
             
-            # Basic Analysis (Mock or Real)
-            if not df_logs.empty:
-                st.subheader("Distribución de Actividad")
-                st.bar_chart(df_logs["timestamp"].dt.hour.value_counts())
-                st.caption("Interacciones por hora del día")
+            st.subheader("Distribución de Actividad")
+            hourly = pd.Series(kpis["hourly_counts"], name="count")
+            st.bar_chart(hourly[hourly > 0])
+            st.caption("Interacciones por hora del día")
 
-        except Exception as e:
-            st.error(f"Error cargando logs: {e}")
-    else:
-        st.warning(f"No se encontraron logs en {log_file}")
+            daily = pd.Series(kpis["daily_counts"], name="count")
+            st.bar_chart(daily)
+            st.caption("Interacciones por día (últimos 30 días)")
+
+            col_q, col_r = st.columns(2)
+            col_q.metric("Largo medio de consulta", f"{kpis['query_length']['mean']:.0f} caracteres")
+            col_r.metric("Largo medio de respuesta", f"{kpis['response_length']['mean']:.0f} caracteres")
+        else:
+            st.warning("No se encontraron logs del chatbot.")
+
+    except Exception as e:
+        st.error(f"Error cargando logs: {e}")
         
     st.divider()
     
@@ -167,23 +255,21 @@ with tab3:
     # 1. Performance Tracking (from MLflow)
     with col1:
         st.markdown("#### 🎯 Performance del Modelo (MLflow)")
-        import mlflow
         try:
-            # Set tracking URI to local file store
-            mlflow.set_tracking_uri("file://" + str(project_root / "mlruns"))
-            runs = mlflow.search_runs(experiment_names=["NPS_Latam_Model_Tracking"])
+            latest_run = fetch_latest_run(_source_mtime(mlruns_dir))
             
-            if not runs.empty:
-                latest_run = runs.iloc[0]
-                st.write(f"**Run ID:** `{latest_run.run_id[:8]}...`")
-                st.write(f"**Fecha:** {latest_run['start_time'].strftime('%Y-%m-%d %H:%M')}")
+            if latest_run:
+                st.write(f"**Run ID:** `{latest_run['run_id'][:8]}...`")
+                st.write(f"**Fecha:** {pd.Timestamp(latest_run['start_time']).strftime('%Y-%m-%d %H:%M')}")
                 
                 # Dynamic Metrics Display
-                metrics_cols = [c for c in runs.columns if c.startswith("metrics.")]
-                for metric in metrics_cols:
-                    metric_name = metric.replace("metrics.", "")
-                    val = latest_run[metric]
+                for metric_name, val in latest_run["metrics"].items():
                     st.metric(label=metric_name.replace("_", " ").title(), value=f"{val:.4f}")
+
+                best_run = fetch_best_run(_source_mtime(mlruns_dir))
+                if best_run and best_run["run_id"] != latest_run["run_id"]:
+                    st.caption(f"Mejor run: `{best_run['run_id'][:8]}...` "
+                               f"(ROC AUC {best_run['metrics'].get('roc_auc', float('nan')):.4f})")
             else:
                 st.info("No se encontraron experimentos registrados.")
         except Exception as e:
@@ -192,22 +278,17 @@ with tab3:
     # 2. Sentiment KPI (from Chatbot Logs)
     with col2:
         st.markdown("#### ❤️ Customer Sentiment Index (CSI)")
-        if log_file.exists():
-            if st.button("Calcular KPIs de Sentimiento"):
-                with st.spinner("Analizando feedback reciente..."):
-                    try:
-                        # Extract user queries (limit to last 20 for better demo)
-                        user_texts = df_logs["user_query"].dropna().tolist()
-                        
-                        # Call Analysis API
-                        from src.nps_latam.genai_features import analyze_feedback_batch, calculate_csi
-                        
-                        # Analyze last 20 interactions
-                        analysis_limit = 20
-                        results_df = analyze_feedback_batch(user_texts[-analysis_limit:])
-                        
-                        # Calculate CSI Score using module logic
-                        csi_score = calculate_csi(results_df)
+        if st.button("Calcular KPIs de Sentimiento"):
+            with st.spinner("Analizando feedback reciente..."):
+                try:
+                    # Analyze last 20 interactions
+                    analysis_limit = 20
+                    csi = fetch_csi(_source_mtime(log_file), analysis_limit)
+                    
+                    if csi["csi"] is None:
+                        st.warning("Sin datos para analizar.")
+                    else:
+                        csi_score = csi["csi"]
                         
                         # Metric Display
                         st.metric("CSI Score (0-100)", f"{csi_score:.1f}", delta=f"{csi_score - 50:.1f} vs Neutral")
@@ -239,33 +320,27 @@ with tab3:
                         
                         with col_a:
                             st.write("**Distribución de Sentimientos:**")
-                            st.bar_chart(results_df["sentiment"].value_counts())
+                            st.bar_chart(pd.Series(csi["sentiment_counts"]))
                             
                         with col_b:
-                            if "intent" in results_df.columns:
+                            if csi["intent_counts"]:
                                 st.write("**Intenciones Detectadas:**")
-                                st.bar_chart(results_df["intent"].value_counts())
-
-                        if "keywords" in results_df.columns:
-                            st.write("**Top Tópicos Mencinados:**")
-                            # Flatten list of lists
-                            all_keywords = [k for sublist in results_df["keywords"] for k in sublist]
-                            if all_keywords:
-                                top_k = pd.Series(all_keywords).value_counts().head(10)
-                                st.bar_chart(top_k)
-                            else:
-                                st.caption("No se detectaron keywords suficientes.")
+                                st.bar_chart(pd.Series(csi["intent_counts"]))
+
+                        st.write("**Top Tópicos Mencinados:**")
+                        if csi["top_keywords"]:
+                            st.bar_chart(pd.Series(csi["top_keywords"]))
+                        else:
+                            st.caption("No se detectaron keywords suficientes.")
                         
                         # Show raw data for verification
                         with st.expander("Ver Datos Procesados"):
-                            st.dataframe(results_df)
-                        
-                    except Exception as e:
-                        st.error(f"Error en análisis: {e}")
-            else:
-                st.caption("Haga clic para analizar el sentimiento de las últimas 20 interacciones.")
+                            st.dataframe(pd.DataFrame(csi["records"]))
+                    
+                except Exception as e:
+                    st.error(f"Error en análisis: {e}")
         else:
-            st.warning("Sin datos para analizar.")
+            st.caption("Haga clic para analizar el sentimiento de las últimas 20 interacciones.")
 
     st.divider()
     
@@ -274,7 +349,7 @@ with tab3:
 # --- Sidebar info ---
 st.sidebar.markdown(f"**Estado del Sistema**")
 try:
-    health = requests.get(f"{API_URL}/health", timeout=1).json()
+    health = api_client.health()
     st.sidebar.success(f"API Online: {health.get('status')}")
     st.sidebar.markdown(f"- Modelo Cargado: {'✅' if health.get('model_loaded') else '❌'}")
     st.sidebar.markdown(f"- Chatbot Cargado: {'✅' if health.get('chatbot_loaded') else '❌'}")
@@ -0,0 +1,265 @@
+import json
+import math
+import multiprocessing
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data_pipeline import clean_and_save_dataset
+from .data_quality import suggest_columns
+from .forest_inference import compile_model
+from .model_registry import ModelRegistry
+
+# Rows are always scored in blocks aligned to this global row offset, so every row
+# sees the same block composition (and the same floating point path) whatever the
+# chunk size or worker count. Chunk sizes are rounded up to a multiple of it.
+SCORE_BLOCK_ROWS = 4096
+
+# Model state of pool workers, set once by _init_worker
+_worker_model = {}
+# Prediction and label of rows that were not scored because a feature value is missing
+UNSCORED_PREDICTION, UNSCORED_LABEL = -1, "Not scored: missing features"
+
+
+def load_scoring_model(run_id: str = None, model_uri: str = None, forest_quantize: str = "float64"):
+    """
+    Loads the model used for batch scoring.
+
+    Args:
+        run_id (str): MLflow run to load from the tracked experiment (latest run when None).
+        model_uri (str): Any MLflow model URI or local model directory; takes precedence over `run_id`.
+        forest_quantize (str): Precision used when compiling forests (see FlatForest).
+
+    Returns:
+        tuple: (pipeline, feature list, version name)
+    """
+    if model_uri:
+        import mlflow.sklearn
+        model = mlflow.sklearn.load_model(model_uri)
+        features = getattr(model, "feature_names_in_", None)
+        if features is None:
+            raise ValueError(f"Model at '{model_uri}' does not expose feature_names_in_.")
+        return compile_model(model, quantize=forest_quantize), list(features), model_uri
+
+    model_version = ModelRegistry(forest_quantize=forest_quantize).load_from_mlflow(run_id)
+    return model_version.pipeline, model_version.features, model_version.version
+
+
+def _is_parquet(path) -> bool:
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def read_columns(path) -> list:
+    """Column names of a CSV or Parquet file, read from its header/schema only."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return list(pq.ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0, encoding="utf-8").columns)
+
+
+def check_input_columns(columns, features, keep_columns=None):
+    """
+    Raises ValueError listing every model feature (and requested keep column) missing
+    from the input, with the closest existing column, before anything is scored.
+    """
+    missing = suggest_columns(list(features) + list(keep_columns or []), columns)
+    if missing:
+        details = ", ".join(f"'{name}'" + (f" (did you mean '{match}'?)" if match else "")
+                            for name, match in missing.items())
+        raise ValueError(f"Input is missing {len(missing)} required columns: {details}.")
+
+
+def iter_input_chunks(path, chunk_size: int, keep_columns=None):
+    """
+    Streams a CSV or Parquet file as (start_row, DataFrame) chunks of exactly
+    `chunk_size` rows (the last one may be shorter).
+
+    `keep_columns` are read with a dtype that does not depend on the chunk's values
+    (CSV: string, Parquet: the file's Arrow type), so e.g. an id column with gaps
+    does not switch between int and float from one output partition to the next.
+    """
+    keep_columns = list(keep_columns or [])
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        def to_frame(batch):
+            df = batch.to_pandas()
+            for column in keep_columns:
+                df[column] = batch.column(column).to_pandas(types_mapper=pd.ArrowDtype)
+            return df
+
+        pieces = (to_frame(batch) for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+    else:
+        pieces = pd.read_csv(path, chunksize=chunk_size, encoding="utf-8",
+                             dtype={column: "string" for column in keep_columns})
+
+    # Parquet batches stop at row group boundaries; re-cut so chunks stay block aligned
+    buffer, buffered, start = [], 0, 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        while buffered >= chunk_size:
+            merged = pd.concat(buffer, ignore_index=True)
+            yield start, merged.iloc[:chunk_size].reset_index(drop=True)
+            start += chunk_size
+            rest = merged.iloc[chunk_size:].reset_index(drop=True)
+            buffer, buffered = [rest], len(rest)
+    if buffered:
+        yield start, pd.concat(buffer, ignore_index=True)
+
+
+def _init_worker(pipeline, features):
+    _worker_model["pipeline"] = pipeline
+    _worker_model["features"] = features
+
+
+def _score_chunk(start: int, df: pd.DataFrame, keep_columns=None) -> pd.DataFrame:
+    pipeline, features = _worker_model["pipeline"], _worker_model["features"]
+
+    # Same preprocessing as training; the header was checked against the features up front
+    df_clean = clean_and_save_dataset(df, output_path=None)
+    X = df_clean[features].astype(np.float64)
+    # The models cannot score NaN: such rows are reported as not scored instead of
+    # failing the job or being imputed with a value the model never saw
+    scorable = X.notna().all(axis=1).to_numpy()
+
+    probs = np.full(len(X), np.nan, dtype=np.float64)
+    block_start = 0
+    while block_start < len(X):
+        # Cut at global multiples of SCORE_BLOCK_ROWS
+        block_end = min(len(X), block_start + SCORE_BLOCK_ROWS - (start + block_start) % SCORE_BLOCK_ROWS)
+        rows = block_start + np.flatnonzero(scorable[block_start:block_end])
+        if len(rows):
+            probs[rows] = pipeline.predict_proba(X.iloc[rows])[:, 1]
+        block_start = block_end
+
+    predictions = np.where(scorable, np.asarray(pipeline.classes_)[(probs > 0.5).astype(int)], UNSCORED_PREDICTION)
+    result = pd.DataFrame({
+        "row_id": np.arange(start, start + len(X), dtype=np.int64),
+        "probability": probs,
+        "prediction": predictions.astype(np.int64),
+    })
+    result["label"] = np.select([~scorable, result["prediction"] == 1],
+                                [UNSCORED_LABEL, "Satisfied"], "Neutral/Dissatisfied")
+    for column in keep_columns or []:
+        result[column] = df[column].array
+    return result
+
+
+class _PartitionWriter:
+    """Buffers scored rows and writes one file per `rows_per_file` global row range."""
+
+    def __init__(self, output_dir: Path, rows_per_file: int, output_format: str):
+        self.output_dir = output_dir
+        self.rows_per_file = rows_per_file
+        self.output_format = output_format
+        self.buffer = []
+        self.buffered = 0
+        self.partition = 0
+        self.files = []
+
+    def add(self, result: pd.DataFrame):
+        while len(result):
+            room = (self.partition + 1) * self.rows_per_file - int(result["row_id"].iloc[0])
+            self.buffer.append(result.iloc[:room])
+            self.buffered += min(room, len(result))
+            result = result.iloc[room:]
+            if self.buffered == self.rows_per_file:
+                self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        part = pd.concat(self.buffer, ignore_index=True)
+        path = self.output_dir / f"part-{self.partition:05d}.{self.output_format}"
+        if self.output_format == "parquet":
+            part.to_parquet(path, index=False)
+        else:
+            part.to_csv(path, index=False)
+        self.files.append(path.name)
+        self.buffer, self.buffered = [], 0
+        self.partition += 1
+
+
+def score_file(input_path, output_dir, run_id: str = None, model_uri: str = None, chunk_size: int = 200_000,
+               workers: int = None, rows_per_file: int = 1_000_000, output_format: str = "csv",
+               keep_columns=None, forest_quantize: str = "float64") -> dict:
+    """
+    Scores a survey export in chunks across a process pool and writes partitioned results.
+
+    Output files depend only on the input, the model and `rows_per_file`: the same
+    bytes are produced for any `chunk_size` or `workers`.
+
+    The input header must contain every model feature and keep column (ValueError
+    otherwise, before scoring starts). Rows with a missing feature value are written
+    with prediction -1 and counted in the report as `unscored_rows`.
+
+    Returns:
+        dict: Run report with row count, partitions, throughput and peak memory.
+    """
+    if output_format not in ("csv", "parquet"):
+        raise ValueError("output_format must be 'csv' or 'parquet'.")
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, math.ceil(chunk_size / SCORE_BLOCK_ROWS)) * SCORE_BLOCK_ROWS
+
+    pipeline, features, version = load_scoring_model(run_id, model_uri, forest_quantize)
+    check_input_columns(read_columns(input_path), features, keep_columns)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    writer = _PartitionWriter(output_dir, rows_per_file, output_format)
+
+    print(f"Scoring {input_path} with model '{version}' ({workers} workers, {chunk_size} rows per chunk)...")
+    started = time.perf_counter()
+    counts = {"rows": 0, "unscored": 0}
+    chunks = iter_input_chunks(input_path, chunk_size, keep_columns)
+
+    def consume(result):
+        writer.add(result)
+        counts["rows"] += len(result)
+        counts["unscored"] += int((result["prediction"] == UNSCORED_PREDICTION).sum())
+
+    if workers == 1:
+        _init_worker(pipeline, features)
+        for start, df in chunks:
+            consume(_score_chunk(start, df, keep_columns))
+    else:
+        # Fork shares the loaded model with workers instead of pickling it per task
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(pipeline, features)) as pool:
+            # Bounded window of in-flight chunks keeps memory flat; results are consumed in order
+            in_flight = deque()
+            for start, df in chunks:
+                in_flight.append(pool.submit(_score_chunk, start, df, keep_columns))
+                if len(in_flight) >= 2 * workers:
+                    consume(in_flight.popleft().result())
+            while in_flight:
+                consume(in_flight.popleft().result())
+    writer.flush()
+
+    elapsed = time.perf_counter() - started
+    rows = counts["rows"]
+    manifest = {"input": str(input_path), "model": version, "rows": rows, "unscored_rows": counts["unscored"],
+                "partitions": writer.files}
+    with open(output_dir / "_manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    report = {
+        **manifest,
+        "elapsed_s": elapsed,
+        "rows_per_s": rows / elapsed if elapsed else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_worker_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+    print(f"✅ Scored {rows} rows in {elapsed:.1f}s ({report['rows_per_s'] or 0:.0f} rows/s) "
+          f"into {len(writer.files)} partitions at {output_dir}")
+    if counts["unscored"]:
+        print(f"⚠️ {counts['unscored']} rows with missing feature values were not scored (prediction -1).")
+    print(f"Peak RSS: main {report['peak_rss_mb']:.0f} MB, largest worker {report['peak_worker_rss_mb']:.0f} MB")
+    return report
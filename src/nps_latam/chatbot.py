@@ -2,26 +2,36 @@ import os
 import csv
 import datetime
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
+
+from .conversation_memory import ConversationMemory
 
 # Load environment variables
 load_dotenv()
 
 class FlightChatbot:
-    def __init__(self, log_file: str = "Data/chatbot_logs.csv"):
+    def __init__(self, log_file: str = "Data/chatbot_logs.csv", memory: ConversationMemory = None, llm=None):
         """
         Initialize the Flight Chatbot.
         
         Args:
             log_file (str): Path to the CSV file where logs will be stored.
+            memory (ConversationMemory): Per-session conversation memory (default backend from the environment when None).
+            llm: Chat model with an `invoke(messages)` method; Gemini when None (e.g. FakeChatModel in tests).
         """
-        self.api_key = os.getenv("GOOGLE_API_KEY")
-        if not self.api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-            
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=self.api_key)
+        if llm is None:
+            self.api_key = os.getenv("GOOGLE_API_KEY")
+            if not self.api_key:
+                raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+
+            # Imported here so that importing the package does not load the Gemini client
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=self.api_key)
+        self.llm = llm
         self.log_file = log_file
+        self.memory = memory or ConversationMemory(
+            max_context_tokens=int(os.getenv("CHAT_CONTEXT_TOKENS", "1200")),
+            idle_ttl=float(os.getenv("CHAT_SESSION_TTL", "1800")),
+        )
         self._ensure_log_file_exists()
 
     def _ensure_log_file_exists(self):
@@ -42,24 +52,33 @@ class FlightChatbot:
             writer = csv.writer(file)
             writer.writerow([timestamp, user_query, bot_response])
 
-    def respond(self, user_input: str) -> str:
+    def respond(self, user_input: str, session_id: str = None) -> str:
         """
         Generates a response to the user input using the LLM and logs the interaction.
         
         Args:
             user_input (str): The query from the customer.
+            session_id (str): Conversation id; when given, the summary and recent turns of the
+                session are sent with the query and the new turn is remembered.
             
         Returns:
             str: The response from the chatbot.
         """
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
         # Define the system context
-        messages = [
-            SystemMessage(content="You are a helpful and polite airline customer service assistant. "
-                                  "Your goal is to assist customers with questions about their flight experience, "
-                                  "services (wifi, food, comfort), and satisfaction. "
-                                  "Keep your answers concise and professional."),
-            HumanMessage(content=user_input)
-        ]
+        system_prompt = ("You are a helpful and polite airline customer service assistant. "
+                         "Your goal is to assist customers with questions about their flight experience, "
+                         "services (wifi, food, comfort), and satisfaction. "
+                         "Keep your answers concise and professional.")
+        summary, turns = self.memory.context(session_id) if session_id else ("", [])
+        if summary:
+            system_prompt += f"\n\nSummary of the earlier conversation:\n{summary}"
+
+        messages = [SystemMessage(content=system_prompt)]
+        for role, content in turns:
+            messages.append(HumanMessage(content=content) if role == "user" else AIMessage(content=content))
+        messages.append(HumanMessage(content=user_input))
         
         try:
             response_msg = self.llm.invoke(messages)
@@ -67,10 +86,17 @@ class FlightChatbot:
             
             # Log the interaction
             self._log_interaction(user_input, bot_response)
+            if session_id:
+                self.memory.add_turn(session_id, user_input, bot_response)
             
             return bot_response
         except Exception as e:
             error_msg = f"I'm sorry, I encountered an error processing your request: {str(e)}"
+            # Failed replies are logged too; the log analytics error rate is computed from them
+            try:
+                self._log_interaction(user_input, error_msg)
+            except OSError:
+                pass
             return error_msg
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+import argparse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="nps-latam", description="NPS Latam command line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score = subparsers.add_parser("score", help="Score a survey export (CSV/Parquet) in bulk.")
+    score.add_argument("input", help="Input CSV or Parquet file.")
+    score.add_argument("output", help="Output directory for the partitioned results.")
+    score.add_argument("--run-id", help="MLflow run to load (default: latest run of the experiment).")
+    score.add_argument("--model-uri", help="MLflow model URI or local model directory (overrides --run-id).")
+    score.add_argument("--chunk-size", type=int, default=200_000, help="Rows read and scored per task.")
+    score.add_argument("--workers", type=int, default=None, help="Scoring processes (default: CPU count).")
+    score.add_argument("--rows-per-file", type=int, default=1_000_000, help="Rows per output partition.")
+    score.add_argument("--format", dest="output_format", choices=["csv", "parquet"], default="csv")
+    score.add_argument("--keep-columns", nargs="*", default=None,
+                       help="Input columns copied to the output (e.g. an id column).")
+    score.add_argument("--forest-quantize", choices=["float64", "float32", "int8"], default="float64")
+
+    retrain = subparsers.add_parser("retrain", help="Update the latest model with new labelled partitions only.")
+    retrain.add_argument("partitions", nargs="+", help="CSV files with new labelled rows.")
+    retrain.add_argument("--model", dest="model_kind", choices=["forest", "sgd"], default="forest",
+                         help="forest: add warm-started trees; sgd: partial_fit the scaler and weights.")
+    retrain.add_argument("--parent-run-id", help="Run to continue from (default: latest run of the same kind).")
+    retrain.add_argument("--new-trees", type=int, default=20, help="Trees added per forest update.")
+    retrain.add_argument("--max-trees", type=int, default=300,
+                         help="Forest size cap; the oldest trees are dropped beyond it.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "score":
+        from .batch_scoring import score_file
+        score_file(
+            args.input, args.output,
+            run_id=args.run_id,
+            model_uri=args.model_uri,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            rows_per_file=args.rows_per_file,
+            output_format=args.output_format,
+            keep_columns=args.keep_columns,
+            forest_quantize=args.forest_quantize,
+        )
+    elif args.command == "retrain":
+        from .incremental_training import train_incremental
+        train_incremental(
+            args.partitions,
+            model_kind=args.model_kind,
+            parent_run_id=args.parent_run_id,
+            n_new_trees=args.new_trees,
+            max_estimators=args.max_trees,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting prompts."""
+    return len(text) // 4 + 1
+
+
+def extractive_summary(previous: str, turns: list, max_tokens: int) -> str:
+    """
+    Default summarizer: appends one trimmed line per evicted turn to the previous
+    summary and keeps only the most recent `max_tokens` worth of it. No LLM call.
+    """
+    lines = [previous] if previous else []
+    for role, content in turns:
+        speaker = "User" if role == "user" else "Assistant"
+        lines.append(f"{speaker}: {' '.join(content.split())[:200]}")
+    summary = "\n".join(lines)
+    max_chars = max_tokens * 4
+    return summary[-max_chars:] if len(summary) > max_chars else summary
+
+
+class ConversationSession:
+    def __init__(self):
+        self.summary = ""
+        self.turns = []
+        self.last_active = time.time()
+
+
+class InMemoryBackend:
+    """
+    Process-local session store. Only valid with a single API worker: under pre-fork
+    serving each worker would hold its own sessions (see default_backend).
+    Other backends implement the same methods.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def put(self, session_id: str, session: ConversationSession):
+        with self._lock:
+            self._sessions[session_id] = session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def last_active(self) -> dict:
+        with self._lock:
+            return {sid: s.last_active for sid, s in self._sessions.items()}
+
+
+class SQLiteBackend:
+    """Session store in a SQLite file, shared by every API worker process on the host."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Readers in other processes do not block the writer
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions "
+            "(id TEXT PRIMARY KEY, summary TEXT NOT NULL, turns TEXT NOT NULL, last_active REAL NOT NULL)"
+        )
+
+    def _execute(self, sql: str, args=()):
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def get(self, session_id: str):
+        rows = self._execute("SELECT summary, turns, last_active FROM chat_sessions WHERE id = ?", (session_id,))
+        if not rows:
+            return None
+        session = ConversationSession()
+        session.summary = rows[0][0]
+        session.turns = [tuple(turn) for turn in json.loads(rows[0][1])]
+        session.last_active = rows[0][2]
+        return session
+
+    def put(self, session_id: str, session: ConversationSession):
+        self._execute("INSERT OR REPLACE INTO chat_sessions (id, summary, turns, last_active) VALUES (?, ?, ?, ?)",
+                      (session_id, session.summary, json.dumps(session.turns), session.last_active))
+
+    def delete(self, session_id: str):
+        self._execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+
+    def last_active(self) -> dict:
+        return dict(self._execute("SELECT id, last_active FROM chat_sessions"))
+
+
+def default_backend():
+    """
+    Session store selected from the environment:
+    CHAT_MEMORY_BACKEND=memory|sqlite, otherwise SQLite whenever WEB_CONCURRENCY > 1
+    (set by serve.py for its workers) so a session's turns are visible to every worker.
+    The SQLite file is CHAT_MEMORY_DB (default Data/chat_sessions.sqlite).
+    """
+    kind = os.getenv("CHAT_MEMORY_BACKEND")
+    if kind is None:
+        kind = "sqlite" if int(os.getenv("WEB_CONCURRENCY", "1") or 1) > 1 else "memory"
+    if kind == "memory":
+        return InMemoryBackend()
+    if kind != "sqlite":
+        raise ValueError("CHAT_MEMORY_BACKEND must be 'memory' or 'sqlite'.")
+    from .config import DATA_DIR
+    return SQLiteBackend(os.getenv("CHAT_MEMORY_DB", str(DATA_DIR / "chat_sessions.sqlite")))
+
+
+class ConversationMemory:
+    def __init__(self, backend=None, max_context_tokens: int = 1200, max_turns: int = 20,
+                 summary_max_tokens: int = 300, idle_ttl: float = 1800.0, summarizer=None):
+        """
+        Server-side chat memory keyed by session id.
+
+        Each session keeps a window of recent turns bounded by `max_turns` and
+        `max_context_tokens`; turns falling out of the window are folded into a
+        summary capped at `summary_max_tokens`. Prompt size therefore stays bounded
+        however long the conversation gets. Sessions idle for more than `idle_ttl`
+        seconds are evicted.
+
+        Args:
+            backend: Session store (defaults to default_backend()).
+            max_context_tokens (int): Token budget for the recent-turn window.
+            max_turns (int): Maximum number of turns (user + assistant messages) kept verbatim.
+            summary_max_tokens (int): Token budget for the summary of older turns.
+            idle_ttl (float): Seconds of inactivity before a session is evicted.
+            summarizer (callable): f(previous_summary, turns, max_tokens) -> str. Defaults to extractive_summary.
+        """
+        self.backend = backend or default_backend()
+        self.max_context_tokens = max_context_tokens
+        self.max_turns = max_turns
+        self.summary_max_tokens = summary_max_tokens
+        self.idle_ttl = idle_ttl
+        self.summarizer = summarizer or extractive_summary
+        self._last_eviction = time.time()
+
+    def context(self, session_id: str):
+        """Returns (summary, recent turns) for the session; empty for unknown sessions."""
+        self._maybe_evict()
+        session = self.backend.get(session_id)
+        if session is None:
+            return "", []
+        return session.summary, list(session.turns)
+
+    def add_turn(self, session_id: str, user_message: str, bot_message: str):
+        session = self.backend.get(session_id) or ConversationSession()
+        session.turns.extend([("user", user_message), ("assistant", bot_message)])
+        session.last_active = time.time()
+
+        # Move the oldest exchanges out of the window until it fits both budgets;
+        # user/assistant pairs go together so the window always starts with a user turn
+        evicted = []
+        while session.turns and (
+            len(session.turns) > self.max_turns
+            or sum(estimate_tokens(content) for _, content in session.turns) > self.max_context_tokens
+        ):
+            evicted.extend(session.turns[:2])
+            del session.turns[:2]
+        if evicted:
+            session.summary = self.summarizer(session.summary, evicted, self.summary_max_tokens)
+
+        self.backend.put(session_id, session)
+
+    def clear(self, session_id: str):
+        self.backend.delete(session_id)
+
+    def _maybe_evict(self):
+        now = time.time()
+        # Sweeping is O(sessions); do it at most once a minute
+        if now - self._last_eviction < 60:
+            return
+        self._last_eviction = now
+        for session_id, last_active in self.backend.last_active().items():
+            if now - last_active > self.idle_ttl:
+                self.backend.delete(session_id)
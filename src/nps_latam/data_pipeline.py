@@ -2,7 +2,9 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 
 def clean_and_save_dataset(df, output_path='airline_satisfaction_transformed_clean.csv'):
-    df['target'] = df['Satisfaccion'].map({'satisfied': 1, 'neutral or dissatisfied': 0})
+    # Unlabelled exports (e.g. surveys sent for scoring) have no Satisfaccion column
+    if 'Satisfaccion' in df.columns:
+        df['target'] = df['Satisfaccion'].map({'satisfied': 1, 'neutral or dissatisfied': 0})
     columns_to_drop = ['Genero', 'Tipo_Cliente', 'Tipo_Viaje', 'Clase', 'Satisfaccion', 'Satisfaccion_bin']
     
     existing_cols = [c for c in columns_to_drop if c in df.columns]
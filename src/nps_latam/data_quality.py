@@ -0,0 +1,365 @@
+import difflib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# Add project root to sys.path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+DEFAULT_SCHEMA_PATH = project_root / "config" / "data_quality.yaml"
+# Fixed block size: results do not depend on the number of threads
+BLOCK_ROWS = 250_000
+
+
+class DataQualityError(ValueError):
+    """A dataset failed a data-quality gate; `report` holds the full validation report."""
+
+    def __init__(self, report: dict):
+        super().__init__(f"Data quality check failed for {report.get('dataset') or 'dataset'}: "
+                         + "; ".join(report["failures"]))
+        self.report = report
+
+
+def suggest_columns(names, columns) -> dict:
+    """Closest existing column for each name not in `columns` (None when nothing is close)."""
+    columns = list(columns)
+    suggestions = {}
+    for name in names:
+        if name not in columns:
+            matches = difflib.get_close_matches(name, columns, n=1, cutoff=0.75)
+            suggestions[name] = matches[0] if matches else None
+    return suggestions
+
+
+class ColumnRule:
+    def __init__(self, name: str, spec: dict, defaults: dict):
+        self.name = name
+        self.dtype = spec.get("dtype", "float")
+        self.low = spec.get("min")
+        self.high = spec.get("max")
+        self.allowed = spec.get("allowed")
+        self.required = spec.get("required", True)
+        self.nullable = spec.get("nullable", False)
+        self.max_null_rate = spec.get("max_null_rate", defaults.get("max_null_rate", 0.0))
+
+    def violations(self, series: pd.Series):
+        """
+        Null count and the row masks of the checks that failed. Cheap reductions (null
+        count, min/max, bad categories) run first; row masks are only built for checks
+        that actually have violations, which keeps clean data close to a single scan.
+        """
+        masks = {}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            nulls = codes == -1
+            if self.allowed is not None:
+                # Check the categories once, then map through the codes
+                bad_categories = ~series.cat.categories.isin(self.allowed)
+                if bad_categories.any():
+                    masks["domain"] = np.append(bad_categories, False)[codes]
+        elif pd.api.types.is_bool_dtype(series) and series.dtype != object:
+            nulls = None
+        elif pd.api.types.is_integer_dtype(series) and series.dtype != object:
+            # Plain integer columns cannot hold nulls
+            nulls = None
+            values = series.to_numpy()
+            masks.update(self._range_masks(values))
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            nulls = np.isnan(values)
+            masks.update(self._range_masks(values))
+            if self.dtype == "int":
+                with np.errstate(invalid="ignore"):
+                    not_integer = np.mod(values, 1) != 0
+                if not_integer.any():
+                    masks["not_integer"] = not_integer & ~nulls
+        else:
+            nulls = series.isna().to_numpy()
+            if self.dtype == "category":
+                if self.allowed is not None:
+                    domain = ~series.isin(self.allowed).to_numpy() & ~nulls
+                    if domain.any():
+                        masks["domain"] = domain
+            elif self.dtype == "bool":
+                invalid = ~series.isin([True, False, 0, 1]).to_numpy() & ~nulls
+                if invalid.any():
+                    masks["type"] = invalid
+            else:
+                values = pd.to_numeric(series, errors="coerce").to_numpy(np.float64, na_value=np.nan)
+                invalid = np.isnan(values) & ~nulls
+                if invalid.any():
+                    masks["type"] = invalid
+                masks.update(self._range_masks(values))
+
+        null_count = int(nulls.sum()) if nulls is not None else 0
+        if null_count and not self.nullable:
+            masks["null"] = nulls
+        return null_count, masks
+
+    def _range_masks(self, values: np.ndarray) -> dict:
+        if not len(values) or (self.low is None and self.high is None):
+            return {}
+        # NaN-aware extremes decide whether a row mask is needed at all
+        if values.dtype.kind == "f":
+            if np.isnan(values).all():
+                return {}
+            low, high = np.nanmin(values), np.nanmax(values)
+        else:
+            low, high = values.min(), values.max()
+        if (self.low is None or low >= self.low) and (self.high is None or high <= self.high):
+            return {}
+        with np.errstate(invalid="ignore"):
+            out_of_range = np.zeros(len(values), dtype=bool)
+            if self.low is not None:
+                out_of_range |= values < self.low
+            if self.high is not None:
+                out_of_range |= values > self.high
+        return {"range": out_of_range}
+
+
+class DataQualitySchema:
+    def __init__(self, spec: dict):
+        """
+        Declarative data-quality schema (see config/data_quality.yaml): per-column dtype,
+        range, categorical domain, presence and null-rate rules.
+
+        Every column is checked with vectorized NumPy masks in a single pass per block of
+        rows; blocks run on a thread pool and are merged in row order, so reports and
+        quarantine files are identical whatever the number of threads.
+        """
+        defaults = spec.get("defaults", {})
+        self.rules = [ColumnRule(name, column_spec, defaults) for name, column_spec in spec["columns"].items()]
+        self.quarantine_dir = spec.get("quarantine_dir", "reports/quarantine")
+        self.report_dir = spec.get("report_dir", "reports/data_quality")
+
+    @classmethod
+    def from_yaml(cls, path=None):
+        with open(path or DEFAULT_SCHEMA_PATH, "r") as f:
+            return cls(yaml.safe_load(f))
+
+    def check_columns(self, columns) -> dict:
+        """Missing required/optional columns, unexpected ones, and likely renames between them."""
+        columns = list(columns)
+        expected = {rule.name for rule in self.rules}
+        missing = [rule.name for rule in self.rules if rule.name not in columns]
+        unexpected = [c for c in columns if c not in expected]
+        return {
+            "missing_required": [rule.name for rule in self.rules if rule.required and rule.name not in columns],
+            "missing_optional": [rule.name for rule in self.rules if not rule.required and rule.name not in columns],
+            "unexpected": unexpected,
+            # e.g. an export with Servicio_Check-in instead of Servicio_Checkin
+            "renamed": {k: v for k, v in suggest_columns(unexpected, missing).items() if v},
+        }
+
+    def _validate_block(self, block: pd.DataFrame):
+        counts, nulls, labelled = {}, {}, []
+        bad = np.zeros(len(block), dtype=bool)
+        for rule in self.rules:
+            if rule.name not in block.columns:
+                continue
+            nulls[rule.name], masks = rule.violations(block[rule.name])
+            for check, mask in masks.items():
+                n = int(mask.sum())
+                if n:
+                    counts[(rule.name, check)] = n
+                    bad |= mask
+                    labelled.append((f"{rule.name}:{check}", mask))
+
+        # Issue labels are only built for the (few) bad rows
+        bad_rows = np.flatnonzero(bad)
+        issues = np.full(len(bad_rows), "", dtype=object)
+        for label, mask in labelled:
+            hit = mask[bad_rows]
+            issues[hit] = issues[hit] + (label + ";")
+        return counts, nulls, bad, issues
+
+    def _validate_blocks(self, df: pd.DataFrame, n_jobs=None):
+        blocks = [df.iloc[start:start + BLOCK_ROWS] for start in range(0, len(df), BLOCK_ROWS)] or [df]
+        if len(blocks) == 1 or n_jobs == 1:
+            return [self._validate_block(block) for block in blocks]
+        with ThreadPoolExecutor(max_workers=n_jobs or min(len(blocks), os.cpu_count() or 1)) as pool:
+            return list(pool.map(self._validate_block, blocks))
+
+    def validate(self, df: pd.DataFrame, name: str = None, quarantine: bool = True, n_jobs: int = None,
+                 raise_on_failure: bool = False):
+        """
+        Validates a loaded dataset.
+
+        Args:
+            df (pd.DataFrame): Data to check.
+            name (str): Dataset name used in the report and the quarantine file name.
+            quarantine (bool): Write rows failing a row-level check to `quarantine_dir/<name>.csv`.
+            n_jobs (int): Threads validating row blocks (all cores when None).
+            raise_on_failure (bool): Raise DataQualityError when a dataset-level gate fails.
+
+        Returns:
+            tuple: (rows passing every row-level check, report dict)
+        """
+        accumulator = _ReportAccumulator(self, df.columns, name)
+        results = self._validate_blocks(df, n_jobs=n_jobs)
+        offset = 0
+        bad_masks, bad_frames = [], []
+        for counts, nulls, bad, issues in results:
+            accumulator.add(counts, nulls, len(bad), int(bad.sum()))
+            bad_masks.append(bad)
+            if quarantine and bad.any():
+                bad_frames.append(_quarantine_frame(df.iloc[offset:offset + len(bad)], bad, issues, offset))
+            offset += len(bad)
+
+        if quarantine:
+            self._clear_quarantine(name)
+        if bad_frames:
+            accumulator.quarantine_path = self._quarantine_path(name)
+            pd.concat(bad_frames).to_csv(accumulator.quarantine_path, index=False)
+        report = accumulator.report()
+        if raise_on_failure and not report["passed"]:
+            raise DataQualityError(report)
+
+        bad = np.concatenate(bad_masks) if bad_masks else np.zeros(0, dtype=bool)
+        return (df[~bad] if bad.any() else df), report
+
+    def validate_csv(self, path, name: str = None, chunk_rows: int = 1_000_000, quarantine: bool = True,
+                     n_jobs: int = None):
+        """
+        Validates a CSV without loading it whole: chunks are parsed, checked in parallel
+        blocks and discarded; bad rows are appended to the quarantine file as they are found.
+
+        Returns:
+            dict: Validation report.
+        """
+        from src.nps_latam.ingestion import IngestionPlan
+
+        name = name or Path(path).stem
+        read_dtypes = IngestionPlan(path, sample_rows=1_000).read_dtypes
+        accumulator = None
+        quarantine_path = self._quarantine_path(name) if quarantine else None
+        if quarantine:
+            self._clear_quarantine(name)
+        header_written, offset = False, 0
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=read_dtypes, encoding="utf-8"):
+            if accumulator is None:
+                accumulator = _ReportAccumulator(self, chunk.columns, name)
+            start = 0
+            for counts, nulls, bad, issues in self._validate_blocks(chunk, n_jobs=n_jobs):
+                accumulator.add(counts, nulls, len(bad), int(bad.sum()))
+                if quarantine and bad.any():
+                    frame = _quarantine_frame(chunk.iloc[start:start + len(bad)], bad, issues, offset + start)
+                    frame.to_csv(quarantine_path, mode="a" if header_written else "w",
+                                 header=not header_written, index=False)
+                    header_written = True
+                    accumulator.quarantine_path = quarantine_path
+                start += len(bad)
+            offset += len(chunk)
+        if accumulator is None:
+            accumulator = _ReportAccumulator(self, [], name)
+        return accumulator.report()
+
+    @staticmethod
+    def _output_path(directory: str, name: str, suffix: str) -> str:
+        directory = Path(directory)
+        if not directory.is_absolute():
+            directory = project_root / directory
+        directory.mkdir(parents=True, exist_ok=True)
+        return str(directory / f"{name or 'dataset'}{suffix}")
+
+    def _quarantine_path(self, name: str = None) -> str:
+        return self._output_path(self.quarantine_dir, name, ".csv")
+
+    def _clear_quarantine(self, name: str = None):
+        # A file left by an earlier run would otherwise look like this run's bad rows
+        try:
+            os.remove(self._quarantine_path(name))
+        except FileNotFoundError:
+            pass
+
+    def save_report(self, report: dict) -> str:
+        """Writes the report to `report_dir/<dataset>.json` and returns the path."""
+        path = self._output_path(self.report_dir, report.get("dataset"), ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+def _quarantine_frame(block: pd.DataFrame, bad: np.ndarray, issues: np.ndarray, offset: int) -> pd.DataFrame:
+    frame = block[bad].copy()
+    frame.insert(0, "_row", offset + np.flatnonzero(bad))
+    frame.insert(1, "_issues", issues)
+    return frame
+
+
+class _ReportAccumulator:
+    """Merges per-block counts into the dataset report."""
+
+    def __init__(self, schema: DataQualitySchema, columns, name: str = None):
+        self.schema = schema
+        self.name = name
+        self.columns = schema.check_columns(columns)
+        self.rows = 0
+        self.bad_rows = 0
+        self.counts = {}
+        self.nulls = {}
+        self.quarantine_path = None
+
+    def add(self, counts: dict, nulls: dict, rows: int, bad_rows: int):
+        self.rows += rows
+        self.bad_rows += bad_rows
+        for key, n in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        for key, n in nulls.items():
+            self.nulls[key] = self.nulls.get(key, 0) + n
+
+    def report(self) -> dict:
+        rows = max(self.rows, 1)
+        failures = []
+        if self.columns["missing_required"]:
+            failures.append("missing required columns " + ", ".join(self.columns["missing_required"]))
+        null_rates = {column: n / rows for column, n in self.nulls.items() if n}
+        for rule in self.schema.rules:
+            rate = null_rates.get(rule.name, 0.0)
+            if rate > rule.max_null_rate:
+                failures.append(f"{rule.name} null rate {rate:.2%} above {rule.max_null_rate:.2%}")
+        return {
+            "dataset": self.name,
+            "rows": self.rows,
+            "bad_rows": self.bad_rows,
+            "bad_row_rate": self.bad_rows / rows,
+            "columns": self.columns,
+            "checks": [{"column": column, "check": check, "violations": n, "rate": n / rows}
+                       for (column, check), n in sorted(self.counts.items())],
+            "null_rates": null_rates,
+            "failures": failures,
+            "passed": not failures,
+            "quarantine_path": self.quarantine_path,
+        }
+
+
+def validate_dataset(df: pd.DataFrame, name: str = None, schema: DataQualitySchema = None,
+                     save_report: bool = True, raise_on_failure: bool = False, **kwargs):
+    """
+    Validates `df` against the project schema (config/data_quality.yaml) and saves the
+    report (its path is added as `report_path`); see DataQualitySchema.validate.
+    """
+    schema = schema or DataQualitySchema.from_yaml()
+    clean, report = schema.validate(df, name=name, **kwargs)
+    if save_report:
+        report["report_path"] = schema.save_report(report)
+    if raise_on_failure and not report["passed"]:
+        raise DataQualityError(report)
+    return clean, report
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else str(project_root / "Data" / "Satisfaccion_pasajeros_limpio.csv")
+    schema = DataQualitySchema.from_yaml()
+    result = schema.validate_csv(target)
+    print(json.dumps(result, indent=2))
+    print(f"Report saved to {schema.save_report(result)}")
@@ -2,21 +2,27 @@ import pandas as pd
 import os
 try:
     from nps_latam import config
+    from nps_latam.ingestion import load_dataset
 except ImportError:
     # Fallback if run directly from root without package context
     import config
+    from ingestion import load_dataset
 
-def load_processed_dataset(path=None):
-    """Carga el dataset procesado desde la ruta especificada."""
+def load_processed_dataset(path=None, memory_budget=None):
+    """
+    Carga el dataset procesado desde la ruta especificada, con tipos mínimos
+    (int8, float32, category) y dentro del presupuesto de memoria (ver ingestion.load_dataset).
+    """
     if path is None:
         path = config.PROCESSED_DATA_PATH
     
     if not os.path.exists(path):
         raise FileNotFoundError(f"El archivo no se encuentra en: {path}")
         
-    df = pd.read_csv(path, encoding="utf-8")
+    df = load_dataset(path, memory_budget=memory_budget)
     return df
 
 def info_dataset(df):
-    """Muestra información sobre el dataset."""
-    print(df.info())
\ No newline at end of file
+    """Muestra información sobre el dataset, incluida la memoria por columna."""
+    df.info(memory_usage="deep")
+    print(df.memory_usage(deep=True, index=False).sort_values(ascending=False).to_string())
\ No newline at end of file
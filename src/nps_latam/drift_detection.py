@@ -4,9 +4,6 @@ import os
 import sys
 import yaml
 from pathlib import Path
-from evidently.report import Report
-from evidently.metric_preset import DataDriftPreset, TargetDriftPreset
-from evidently.pipeline.column_mapping import ColumnMapping
 
 # Add project root to sys.path
 current_dir = Path(__file__).resolve().parent
@@ -14,21 +11,53 @@ project_root = current_dir.parent.parent
 if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
-from src.nps_latam import load_processed_dataset, clean_and_save_dataset
-
 def load_config(config_path="config/drift_config.yaml"):
     """Loads YAML configuration."""
     with open(project_root / config_path, "r") as f:
         return yaml.safe_load(f)
 
-def generate_drift_report(reference_path: str, current_path: str, output_path: str = "reports/drift_report.html", column_config=None):
+def load_validated(path, name: str):
+    """Loads a drift batch and drops the rows failing data_quality.yaml (they are quarantined)."""
+    from src.nps_latam.data_quality import validate_dataset
+    from src.nps_latam.ingestion import load_dataset
+
+    df, report = validate_dataset(load_dataset(path), name=name)
+    if report["bad_rows"] or not report["passed"]:
+        print(f"Data quality ({name}): {report['bad_rows']} rows quarantined"
+              + (f"; {'; '.join(report['failures'])}" if report["failures"] else ""))
+    return df
+
+def _as_validated(data, name: str):
+    """`data` as a validated DataFrame: frames are used as given (already validated), paths loaded."""
+    return data if isinstance(data, pd.DataFrame) else load_validated(data, name)
+
+def configured_columns(names, columns, kind: str):
+    """Configured columns present in the data; missing ones are reported with the closest match."""
+    from src.nps_latam.data_quality import suggest_columns
+
+    for name, match in suggest_columns(names, columns).items():
+        hint = f" (did you mean '{match}'?)" if match else ""
+        print(f"Warning: {kind} '{name}' from drift_config.yaml is not in the data{hint}")
+    return [c for c in names if c in columns]
+
+def generate_drift_report(reference_path, current_path, output_path: str = "reports/drift_report.html", column_config=None, progress=None):
     """
     Generates a Data Drift report comparing reference data (training) vs current data (new batch).
+    Both batches are file paths or frames already returned by load_validated.
+    Returns the report path, or None if it could not be generated.
+    `progress` is an optional f(fraction, message) callback (used by the job queue).
     """
+    progress = progress or (lambda fraction, message: None)
+    # Evidently is only needed here; importing it at module level costs seconds
+    from evidently.report import Report
+    from evidently.metric_preset import DataDriftPreset, TargetDriftPreset
+    from evidently.pipeline.column_mapping import ColumnMapping
+
     # Load Data
     try:
-        ref_df = pd.read_csv(reference_path)
-        cur_df = pd.read_csv(current_path)
+        progress(0.1, "Loading and validating data")
+        ref_df = _as_validated(reference_path, "drift_reference")
+        cur_df = _as_validated(current_path, "drift_current")
         
         # Determine Column Mapping from config if valid
         col_mapping = ColumnMapping()
@@ -36,12 +65,11 @@ def generate_drift_report(reference_path: str, current_path: str, output_path: s
             if "target" in column_config:
                 col_mapping.target = column_config["target"]
             if "numerical_features" in column_config:
-                # Filter strictly those present in DF
-                valid_num = [c for c in column_config["numerical_features"] if c in ref_df.columns]
-                col_mapping.numerical_features = valid_num
+                col_mapping.numerical_features = configured_columns(
+                    column_config["numerical_features"], ref_df.columns, "numerical feature")
             if "categorical_features" in column_config:
-                valid_cat = [c for c in column_config["categorical_features"] if c in ref_df.columns]
-                col_mapping.categorical_features = valid_cat
+                col_mapping.categorical_features = configured_columns(
+                    column_config["categorical_features"], ref_df.columns, "categorical feature")
 
         # Initialize Report
         report = Report(metrics=[
@@ -50,20 +78,60 @@ def generate_drift_report(reference_path: str, current_path: str, output_path: s
         ])
         
         print(f"Calculating Drift comparing {len(ref_df)} ref vs {len(cur_df)} cur rows...")
+        progress(0.3, "Calculating drift")
         report.run(reference_data=ref_df, current_data=cur_df, column_mapping=col_mapping)
         
         # Ensure directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         # Save Report
+        progress(0.9, "Saving report")
         report.save_html(output_path)
         print(f"Drift report saved to: {output_path}")
+        return output_path
         
     except Exception as e:
         print(f"Error generating drift report: {e}")
         import traceback
         traceback.print_exc()
 
+def generate_segment_drift_report(reference_path, current_path, output_path: str = "reports/segment_drift.csv",
+                                  segment_config=None, column_config=None, progress=None):
+    """
+    Ranks segments (and pairs of segments) of the current batch by drift vs the reference
+    and saves the full table as CSV. Returns the top-k segments as a DataFrame.
+    Batches are paths or validated frames, as in generate_drift_report.
+    `segment_config` is the segment_drift section of drift_config.yaml.
+    """
+    from src.nps_latam.segment_drift import segment_drift
+
+    progress = progress or (lambda fraction, message: None)
+    segment_config = segment_config or {}
+    column_config = column_config or {}
+
+    progress(0.1, "Loading and validating data")
+    ref_df = _as_validated(reference_path, "drift_reference")
+    cur_df = _as_validated(current_path, "drift_current")
+
+    features = column_config.get("numerical_features")
+    if features:
+        features = configured_columns(features, ref_df.columns, "numerical feature")
+    progress(0.4, "Calculating segment drift")
+    result = segment_drift(
+        ref_df, cur_df,
+        segment_columns=segment_config.get("segment_columns", ["Clase", "Tipo_Viaje", "Distance_Bin"]),
+        features=features,
+        target=column_config.get("target", "target"),
+        pairs=segment_config.get("pairs", True),
+        min_rows=segment_config.get("min_rows", 100),
+        top_k=None,
+    )
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    result.to_csv(output_path, index=False)
+    print(f"Segment drift report saved to: {output_path}")
+    return result.head(segment_config.get("top_k", 10))
+
 if __name__ == "__main__":
     # Example Usage integrated with YAML
     try:
@@ -80,7 +148,8 @@ if __name__ == "__main__":
             print("Reference or Current data not found. Creating samples from main dataset for demo...")
             main_file = data_dir / "Satisfaccion_pasajeros_limpio.csv"
             if main_file.exists():
-                df = pd.read_csv(main_file)
+                from src.nps_latam.ingestion import load_dataset
+                df = load_dataset(main_file)
                 split_idx = int(len(df) * 0.7)
                 ref_df = df.iloc[:split_idx]
                 cur_df = df.iloc[split_idx:]
@@ -94,6 +163,13 @@ if __name__ == "__main__":
         
         col_conf = config.get("column_mapping", {})
         generate_drift_report(str(ref_path), str(cur_path), str(output_path), column_config=col_conf)
+
+        segment_conf = config.get("segment_drift", {})
+        segment_output = project_root / segment_conf.get("report_output_path", "reports/segment_drift.csv")
+        top_segments = generate_segment_drift_report(str(ref_path), str(cur_path), str(segment_output),
+                                                     segment_config=segment_conf, column_config=col_conf)
+        print("Top drifting segments:")
+        print(top_segments[["segment", "mean_psi", "top_feature"]].to_string(index=False))
         
     except Exception as e:
         print(f"Failed to run drift detection: {e}")
@@ -1,3 +1,10 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
 from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, classification_report
 from sklearn.model_selection import cross_val_score
 
@@ -34,3 +41,248 @@ def get_cv_metrics(model, X, y, cv=5, scoring='f1'):
     """
     cv_scores = cross_val_score(model, X, y, cv=cv, scoring=scoring, n_jobs=-1)
     return cv_scores.mean(), cv_scores.std()
+
+def get_cv_scores(model, X, y, cv=5, scoring=("roc_auc", "f1", "accuracy"), n_jobs=-1):
+    """
+    Cross-validates several metrics in one parallel pass (folds run on `n_jobs` processes).
+    Returns {metric: {"mean": ..., "std": ..., "folds": [...]}}.
+    """
+    from sklearn.model_selection import cross_validate
+
+    results = cross_validate(model, X, y, cv=cv, scoring=list(scoring), n_jobs=n_jobs)
+    return {
+        metric: {
+            "mean": results[f"test_{metric}"].mean(),
+            "std": results[f"test_{metric}"].std(),
+            "folds": results[f"test_{metric}"].tolist(),
+        }
+        for metric in scoring
+    }
+
+
+# --- Bootstrap confidence intervals ---
+#
+# Every replicate is a vector of draw counts w, so metrics become weighted sums over
+# precomputed arrays and no resampled copy of the data is ever built. Rows with the
+# same label, segments and scores are interchangeable, so they are collapsed into
+# keys first and w counts draws per key: forest probabilities take few distinct
+# values, which turns a million rows into a few thousand keys. AUC uses the
+# Mann-Whitney form on keys sorted once by (segment, score): each positive counts
+# the negatives ranked below it.
+
+# Named like the metrics logged to MLflow
+BOOTSTRAP_METRICS = ("roc_auc", "f1_score", "accuracy")
+
+# Arrays shared with pool workers, set once by _init_bootstrap_worker
+_bootstrap_state = {}
+# Keys per row below which a replicate is drawn as one multinomial over the keys
+# (O(keys)) rather than n row indices mapped to their keys (O(n))
+_MULTINOMIAL_MAX_KEY_SHARE = 0.1
+
+
+class _Grouping:
+    """
+    Keys (or rows) of one model sorted by (segment code, score). Segments are contiguous in
+    this order, so every per-replicate sum is a sequential np.add.reduceat over key ranges.
+    """
+
+    def __init__(self, codes, n_groups, y, prob, threshold):
+        self.order = np.lexsort((prob, codes))
+        codes_sorted, prob_sorted = codes[self.order], prob[self.order]
+        # factorize codes cover every group, so no segment is empty
+        self.group_first_row = np.searchsorted(codes_sorted, np.arange(n_groups))
+
+        # Tie blocks (same segment and score); with ties a positive counts half of the tied negatives
+        new_block = np.empty(len(codes), dtype=bool)
+        new_block[:1] = True
+        new_block[1:] = (codes_sorted[1:] != codes_sorted[:-1]) | (prob_sorted[1:] != prob_sorted[:-1])
+        if new_block.all():
+            self.row_block_start = self.row_block_end = None
+        else:
+            block_starts = np.flatnonzero(new_block)
+            block_sizes = np.diff(np.append(block_starts, len(codes)))
+            self.row_block_start = np.repeat(block_starts, block_sizes)
+            self.row_block_end = self.row_block_start + np.repeat(block_sizes, block_sizes)
+
+        y_sorted = y[self.order]
+        pred_sorted = prob_sorted > threshold
+        self.y_sorted = y_sorted.astype(np.float64)
+        self.pred_sorted = pred_sorted.astype(np.float64)
+        self.tp_sorted = (y_sorted & pred_sorted).astype(np.float64)
+
+    def metrics(self, w):
+        """Weighted AUC, F1 and accuracy per group for draw counts `w` (in original row order)."""
+        ws = w[self.order]
+        wpos = ws * self.y_sorted
+        # neg_cum[i]: weight of negatives in sorted rows before i
+        neg_cum = np.zeros(len(ws) + 1)
+        np.cumsum(ws - wpos, out=neg_cum[1:])
+        if self.row_block_start is None:
+            neg_below = neg_cum[:-1]
+        else:
+            neg_below = 0.5 * (neg_cum[self.row_block_start] + neg_cum[self.row_block_end])
+
+        starts = self.group_first_row
+        n_pos = np.add.reduceat(wpos, starts)
+        n_neg = np.add.reduceat(ws, starts) - n_pos
+        # Counts restart at each segment: subtract the negatives of earlier segments
+        auc_num = np.add.reduceat(wpos * neg_below, starts) - neg_cum[starts] * n_pos
+
+        tp = np.add.reduceat(ws * self.tp_sorted, starts)
+        fp = np.add.reduceat(ws * self.pred_sorted, starts) - tp
+        fn = n_pos - tp
+        tn = n_neg - fp
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.stack([
+                auc_num / (n_pos * n_neg),
+                2 * tp / (2 * tp + fp + fn),
+                (tp + tn) / (n_pos + n_neg),
+            ])
+
+
+def _replicate_metrics(models, w):
+    """Metrics of every model and grouping for draw counts `w`, shape (models, metrics, groups)."""
+    return np.stack([np.concatenate([g.metrics(w) for g in groupings], axis=1) for groupings in models])
+
+
+def _init_bootstrap_worker(state):
+    _bootstrap_state.update(state)
+
+
+def _compress_rows(columns):
+    """Id of each row's distinct combination of `columns` (0..K-1, in order of first appearance) and K."""
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    n_keys = 1
+    for column in columns:
+        codes, uniques = pd.factorize(column)
+        # Re-factorized at every step, so ids stay below the row count
+        key, keys = pd.factorize(key * len(uniques) + codes)
+        n_keys = len(keys)
+    return key, n_keys
+
+
+def _bootstrap_task(seed_seq, n_replicates):
+    """Pool task: `n_replicates` resamples; every model is scored on the same draws."""
+    n, models = _bootstrap_state["n"], _bootstrap_state["models"]
+    row_keys, key_share = _bootstrap_state["row_keys"], _bootstrap_state["key_share"]
+    n_keys = len(key_share)
+    rng = np.random.default_rng(seed_seq)
+
+    def draw():
+        # Resampling n rows and counting them per key is a multinomial over the keys
+        if n_keys <= _MULTINOMIAL_MAX_KEY_SHARE * n:
+            return rng.multinomial(n, key_share).astype(np.float64)
+        return np.bincount(row_keys[rng.integers(0, n, size=n)], minlength=n_keys).astype(np.float64)
+
+    return np.stack([_replicate_metrics(models, draw()) for _ in range(n_replicates)])
+
+
+def bootstrap_metrics(y_true, y_prob, segments=None, y_prob_baseline=None, threshold=0.5,
+                      n_boot=1000, ci=0.95, seed=42, n_jobs=None, replicates_per_task=25):
+    """
+    Bootstrap confidence intervals for ROC AUC, F1 and accuracy, overall and per segment.
+
+    Args:
+        y_true: Binary labels (0/1).
+        y_prob: Predicted probability of class 1.
+        segments (pd.DataFrame): Optional segment columns aligned with y_true
+            (e.g. df.loc[X_valid.index, ['Clase', 'Tipo_Cliente', 'Age_Bin']]).
+        y_prob_baseline: Optional probabilities of a baseline model; adds paired
+            "delta" rows (model - baseline) computed on the same resamples, so the
+            release gate can tell a real change from noise.
+        threshold (float): Probability threshold for F1 and accuracy.
+        n_boot (int): Bootstrap replicates.
+        ci (float): Confidence level of the percentile intervals.
+        seed (int): Results are reproducible for a seed whatever `n_jobs` is.
+        n_jobs (int): Worker processes (CPU count when None; 1 runs in-process).
+        replicates_per_task (int): Replicates computed per pool task.
+
+    Cost per replicate is O(keys): with forest probabilities (few distinct values) 1M rows,
+    1000 replicates and two segment columns take seconds on one core. Continuous scores
+    leave about one key per row; then expect ~50 ms per segmentation, model and replicate
+    per million rows per core, and size `n_jobs` accordingly.
+
+    Returns:
+        pd.DataFrame: One row per (segment, value, metric) with estimate, lower, upper, std and n
+        (and a "model" column when a baseline is given).
+    """
+    y = np.asarray(y_true).astype(bool)
+    probs = [np.asarray(y_prob, dtype=np.float64)]
+    if y_prob_baseline is not None:
+        probs.append(np.asarray(y_prob_baseline, dtype=np.float64))
+    n = len(y)
+
+    # One segmentation per segment column, plus the whole set as a single group
+    labels = [("all", "all")]
+    segmentations = [(np.zeros(n, dtype=np.int64), 1)]
+    if segments is not None:
+        for column in segments.columns:
+            codes, uniques = pd.factorize(segments[column], use_na_sentinel=False)
+            segmentations.append((codes.astype(np.int64), len(uniques)))
+            labels.extend((column, value) for value in uniques)
+
+    # Replicates draw counts per key; every key holds at least one row, so no segment is empty
+    row_keys, n_keys = _compress_rows([y] + [codes for codes, _ in segmentations[1:]] + probs)
+    key_counts = np.bincount(row_keys, minlength=n_keys)
+    first_row = np.zeros(n_keys, dtype=np.int64)
+    first_row[row_keys[::-1]] = np.arange(n - 1, -1, -1)
+
+    # AUC needs each model's own score order, so groupings are built per model
+    models = [[_Grouping(codes[first_row], n_groups, y[first_row], prob[first_row], threshold)
+               for codes, n_groups in segmentations] for prob in probs]
+    estimate = _replicate_metrics(models, key_counts.astype(np.float64))
+
+    # Seeds are spawned per task, so task boundaries (not workers) fix the random streams
+    n_tasks = max(1, -(-n_boot // replicates_per_task))
+    seeds = np.random.SeedSequence(seed).spawn(n_tasks)
+    sizes = [min(replicates_per_task, n_boot - i * replicates_per_task) for i in range(n_tasks)]
+    state = {"n": n, "models": models, "row_keys": row_keys, "key_share": key_counts / n}
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    if n_jobs == 1 or n_tasks == 1:
+        _init_bootstrap_worker(state)
+        chunks = [_bootstrap_task(s, size) for s, size in zip(seeds, sizes)]
+    else:
+        # Fork shares the precomputed arrays with workers instead of pickling them per task.
+        # Forking from a non-main thread (e.g. a job queue worker in the API) can copy
+        # locks held by other threads, so there workers are spawned and get `state` once each
+        methods = multiprocessing.get_all_start_methods()
+        if "fork" in methods and threading.current_thread() is threading.main_thread():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=min(n_jobs, n_tasks), mp_context=context,
+                                 initializer=_init_bootstrap_worker, initargs=(state,)) as pool:
+            chunks = list(pool.map(_bootstrap_task, seeds, sizes))
+    replicates = np.concatenate(chunks)
+
+    model_names = ["model", "baseline"][:len(probs)]
+    if len(probs) > 1:
+        replicates = np.concatenate([replicates, replicates[:, :1] - replicates[:, 1:2]], axis=1)
+        estimate = np.concatenate([estimate, estimate[:1] - estimate[1:2]])
+        model_names.append("delta")
+
+    alpha = (1 - ci) / 2
+    # Segments with a single class have no AUC in any replicate; their intervals stay NaN
+    # (reducing only the defined cells avoids NumPy's all-NaN slice warnings)
+    defined = ~np.isnan(replicates).all(axis=0)
+    lower, upper, std = (np.full(replicates.shape[1:], np.nan) for _ in range(3))
+    lower[defined] = np.nanquantile(replicates[:, defined], alpha, axis=0)
+    upper[defined] = np.nanquantile(replicates[:, defined], 1 - alpha, axis=0)
+    std[defined] = np.nanstd(replicates[:, defined], axis=0)
+
+    counts = np.concatenate([np.bincount(codes, minlength=n_groups) for codes, n_groups in segmentations])
+    rows = []
+    for m, model_name in enumerate(model_names):
+        for k, metric in enumerate(BOOTSTRAP_METRICS):
+            for j, (segment, value) in enumerate(labels):
+                rows.append({
+                    "model": model_name, "segment": segment, "value": value, "metric": metric,
+                    "estimate": estimate[m, k, j], "lower": lower[m, k, j], "upper": upper[m, k, j],
+                    "std": std[m, k, j], "n": int(counts[j]),
+                })
+    result = pd.DataFrame(rows)
+    if len(probs) == 1:
+        result = result.drop(columns="model")
+    return result
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .forest_inference import FlatForest
+
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class Explainer:
+    def __init__(self, model, features, cache_size: int = 4096):
+        """
+        Per-prediction feature contributions for a served model.
+
+        - Linear models (a fitted LogisticRegression or log-loss SGDClassifier, optionally
+          behind a StandardScaler pipeline): contribution = coefficient x scaled value,
+          in log-odds. With a scaler the scaled value is relative to the training mean, so
+          `base_value` is the intercept and `base_value + sum(contributions)` is the
+          decision function exactly.
+        - Forests (FlatForest, or sklearn forests compiled on first use): path-based
+          contributions to the satisfied probability, see FlatForest.contributions.
+
+        Probabilities come out of the same vectorized pass, so explaining a row costs one
+        scoring call. Single-row explanations are kept in an LRU cache keyed on the row bytes.
+
+        Args:
+            model: Fitted pipeline or classifier as served by the registry.
+            features (list): Model columns, in order.
+            cache_size (int): Rows kept in the explanation cache (0 disables it).
+        """
+        self.model = model
+        self.features = list(features)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._forest = model if isinstance(model, FlatForest) else None
+        self._transform = None
+        self._linear = None
+        if self._forest is not None or hasattr(model, "estimators_"):
+            self.kind, self.units = "forest", "probability"
+        elif hasattr(getattr(model, "steps", [(None, None)])[-1][1], "coef_") or hasattr(model, "coef_"):
+            self.kind, self.units = "linear", "log_odds"
+            if hasattr(model, "steps"):
+                self._transform = model[:-1].transform if len(model.steps) > 1 else None
+                self._linear = model.steps[-1][1]
+            else:
+                self._linear = model
+            if self._linear.coef_.shape[0] != 1:
+                raise ValueError("Linear explanations need a binary classifier.")
+        else:
+            self.kind, self.units = None, None
+
+    @property
+    def supported(self) -> bool:
+        return self.kind is not None
+
+    def explain(self, X):
+        """
+        Scores and explains a batch in one pass.
+
+        Returns:
+            tuple: (satisfied probabilities (n_rows,), base value (float), contributions (n_rows, n_features))
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.kind == "forest":
+            if self._forest is None:
+                # sklearn forest registered without compilation; flattened once, on first use
+                self._forest = FlatForest(self.model)
+            return self._forest.contributions(X, class_index=self._positive_index(self._forest.classes_))
+        if self.kind == "linear":
+            Z = self._transform(X) if self._transform is not None else X
+            coef, intercept = self._linear.coef_[0], float(self._linear.intercept_[0])
+            contributions = Z * coef
+            probs = _expit(intercept + contributions.sum(axis=1))
+            # coef_ refers to classes_[1]; report the satisfied class like /predict does
+            if self._positive_index(self._linear.classes_) == 0:
+                return 1.0 - probs, -intercept, -contributions
+            return probs, intercept, contributions
+        raise ValueError(f"Explanations are not supported for {type(self.model).__name__} models.")
+
+    @staticmethod
+    def _positive_index(classes) -> int:
+        classes = list(classes)
+        return classes.index(1) if 1 in classes else len(classes) - 1
+
+    def explain_row(self, row):
+        """
+        Explains one (1, n_features) row, through the cache.
+
+        Returns:
+            tuple: (probability, base value, read-only contributions (n_features,))
+        """
+        row = np.ascontiguousarray(row, dtype=np.float64).reshape(1, -1)
+        key = row.tobytes()
+        if self.cache_size:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return cached
+                self.misses += 1
+
+        probs, base, contributions = self.explain(row)
+        result = (float(probs[0]), base, contributions[0])
+        result[2].setflags(write=False)
+        if self.cache_size:
+            self._store(key, result)
+        return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def warm(self, X):
+        """Precomputes the cache for the rows of X (e.g. the most frequent answer profiles) in one batch."""
+        if not self.cache_size:
+            return
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        probs, base, contributions = self.explain(X)
+        contributions.setflags(write=False)
+        for i in range(len(X)):
+            self._store(X[i:i + 1].tobytes(), (float(probs[i]), base, contributions[i]))
+
+    def top(self, row, contributions, k: int = 5) -> list:
+        """The k largest contributions by magnitude, with the feature values they come from."""
+        row = np.asarray(row, dtype=np.float64).reshape(-1)
+        order = np.argsort(-np.abs(contributions), kind="stable")[:k]
+        return [{"feature": self.features[i], "value": float(row[i]), "contribution": float(contributions[i])}
+                for i in order]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"kind": self.kind, "cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def benchmark(n_rows=(1, 10_000), repeats: int = 500, n_estimators: int = 100, max_depth: int = 10, seed: int = 42):
+    """
+    Extra latency of explanations over plain predict_proba, per row, for the logistic
+    regression pipeline and a compiled forest: single rows (uncached and cached) and batches.
+    Also checks that the explanations add up to the model's probabilities.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from nps_latam.generate_data import generate_synthetic_data
+    from nps_latam.model_training import create_logreg_pipeline
+
+    df = generate_synthetic_data(num_rows=max(n_rows) + 5000, seed=seed)
+    X = df.select_dtypes(include=["number", "bool"]).drop(columns=["target"]).astype(float)
+    y = df["target"]
+    X_train, y_train = X.iloc[:5000].to_numpy(), y.iloc[:5000]
+    X_eval = X.iloc[5000:].to_numpy()
+
+    models = {
+        "logreg": create_logreg_pipeline().fit(X_train, y_train),
+        "forest": FlatForest(RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                                    random_state=seed).fit(X_train, y_train)),
+    }
+
+    def per_row_us(step, rows, count):
+        step()
+        start = time.perf_counter()
+        for _ in range(count):
+            step()
+        return (time.perf_counter() - start) / count / rows * 1e6
+
+    results = []
+    for name, model in models.items():
+        explainer = Explainer(model, X.columns)
+        probs, base, contributions = explainer.explain(X_eval[:1000])
+        np.testing.assert_allclose(probs, model.predict_proba(X_eval[:1000])[:, 1], atol=1e-9)
+        if explainer.kind == "forest":
+            np.testing.assert_allclose(base + contributions.sum(axis=1), probs, atol=1e-9)
+
+        for rows in n_rows:
+            batch = X_eval[:rows]
+            count = max(3, repeats // rows)
+            result = {
+                "model": name,
+                "rows": rows,
+                "predict_us_per_row": per_row_us(lambda: model.predict_proba(batch), rows, count),
+                "explain_us_per_row": per_row_us(lambda: explainer.explain(batch), rows, count),
+            }
+            if rows == 1:
+                uncached = Explainer(model, X.columns, cache_size=0)
+                result["explain_uncached_row_us"] = per_row_us(lambda: uncached.explain_row(batch), 1, count)
+                result["explain_cached_row_us"] = per_row_us(lambda: explainer.explain_row(batch), 1, count)
+            results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark():
+        line = (f"{result['model']:>6} {result['rows']:>6} rows | predict {result['predict_us_per_row']:8.2f} us/row | "
+                f"explain {result['explain_us_per_row']:8.2f} us/row")
+        if "explain_cached_row_us" in result:
+            line += (f" | explain_row {result['explain_uncached_row_us']:.1f} us, "
+                     f"cached {result['explain_cached_row_us']:.1f} us")
+        print(line)
@@ -0,0 +1,32 @@
+import time
+
+import pandas as pd
+
+
+class FakeChatResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    def __init__(self, latency: float = 0.2):
+        """
+        Stand-in for ChatGoogleGenerativeAI in load and admission-control tests.
+        Sleeps `latency` seconds per call and echoes the last message.
+        """
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return FakeChatResponse(f"[fake] {messages[-1].content[:200]}")
+
+
+def make_fake_feedback_analyzer(latency_per_text: float = 0.01):
+    """Returns a drop-in for analyze_feedback_batch that sleeps per text and labels everything Neutral/Other."""
+    def analyze(texts):
+        time.sleep(latency_per_text * len(texts))
+        features_df = pd.DataFrame([{"sentiment": "Neutral", "intent": "Other", "keywords": []} for _ in texts])
+        features_df['original_text'] = list(texts)
+        features_df['sentiment_score'] = 0
+        return features_df
+    return analyze
@@ -0,0 +1,222 @@
+import math
+import time
+
+import numpy as np
+
+# Survey ratings (Likert 1-5, 0 = not answered in the original survey export)
+RATING_FEATURES = (
+    "Wifi_a_bordo", "Comodidad_Horario", "Facilidad_Reserva", "Ubicacion_Puerta",
+    "Comida_Bebida", "Embarque_Online", "Comodidad_Asiento", "Entretenimiento",
+    "Servicio_Abordo", "Espacio_Piernas", "Manejo_Equipaje", "Servicio_Checkin",
+    "Servicio_Vuelo", "Limpieza",
+)
+# Aggregates of RATING_FEATURES computed by the data pipeline (see generate_data)
+SERVICE_AGGREGATES = ("Service_Mean", "Service_Min", "Service_Max", "Service_Var")
+
+# (dtype, low, high) of known columns; anything else the model expects is an unbounded float64
+_KNOWN_FIELDS = {
+    **{name: ("int8", 0, 5) for name in RATING_FEATURES},
+    "id": ("int64", 0, None),
+    "Edad": ("int16", 0, 120),
+    "Distancia_Vuelo": ("int32", 0, 20_000),
+    "TypeOfTravel_bin": ("bool", 0, 1),
+    "Class_Eco": ("bool", 0, 1),
+    "Class_Eco Plus": ("bool", 0, 1),
+    "Service_Mean": ("float64", 0, 5),
+    "Service_Min": ("float64", 0, 5),
+    "Service_Max": ("float64", 0, 5),
+    "Service_Var": ("float64", 0, None),
+    "Age_Bin": ("int8", 0, 9),
+    "Distance_Bin": ("int8", 0, 9),
+    "txt_sentiment": ("int8", -1, 1),
+}
+_TEXT_FLAG_PREFIXES = ("txt_intent_", "txt_topic_")
+
+
+class SchemaError(ValueError):
+    """The request does not match the model's feature schema; `report` lists every problem."""
+
+    def __init__(self, report: dict):
+        problems = [f"{key}: {', '.join(map(str, report[key]))}"
+                    for key in ("unknown", "missing", "invalid") if report.get(key)]
+        super().__init__("Invalid features (" + "; ".join(problems) + ").")
+        self.report = report
+
+
+def field_spec(name: str):
+    """(dtype, low, high) of a feature name."""
+    if name in _KNOWN_FIELDS:
+        return _KNOWN_FIELDS[name]
+    if name.startswith(_TEXT_FLAG_PREFIXES):
+        return ("bool", 0, 1)
+    return ("float64", None, None)
+
+
+class FeatureSchema:
+    def __init__(self, features):
+        """
+        Typed request schema generated from a model's feature list.
+
+        Ratings are int8 in 0-5, flags are 0/1 and other known columns have bounded
+        integer or float ranges. `parse` validates a request dict in one pass and writes
+        the values straight into a float64 row in model column order, ready for
+        predict_proba, without building a DataFrame.
+
+        Args:
+            features (list): Columns the model was trained on, in order.
+        """
+        self.features = list(features)
+        self.index = {name: i for i, name in enumerate(self.features)}
+        self.specs = [field_spec(name) for name in self.features]
+        self._integer = [dtype != "float64" for dtype, _, _ in self.specs]
+        self._low = [-math.inf if low is None else low for _, low, _ in self.specs]
+        self._high = [math.inf if high is None else high for _, _, high in self.specs]
+        self._ratings = [self.index[name] for name in RATING_FEATURES if name in self.index]
+        # Aggregates can only be rebuilt when the model sees every rating they summarize
+        self._derivable = len(self._ratings) == len(RATING_FEATURES)
+
+    def parse(self, data: dict, fill_missing: bool = False):
+        """
+        Validates `data` and returns it as a (1, n_features) float64 row.
+
+        Unknown keys and out-of-range or mistyped values are always rejected. Missing
+        service aggregates are computed from the ratings; other missing features are
+        rejected unless `fill_missing`, in which case they are set to 0.
+
+        Returns:
+            tuple: (row, report) where report lists the `missing` (filled) and `derived` features.
+
+        Raises:
+            SchemaError: with a report of the unknown, missing and invalid features.
+        """
+        row = np.zeros((1, len(self.features)))
+        values = row[0]
+        seen = np.zeros(len(self.features), dtype=bool)
+        unknown, invalid = [], []
+
+        index, integer, low, high = self.index, self._integer, self._low, self._high
+        for name, value in data.items():
+            i = index.get(name)
+            if i is None:
+                unknown.append(name)
+                continue
+            # bool is an int subclass; accepted only where a flag is expected
+            problem = None
+            if type(value) is bool:
+                value = int(value)
+                if high[i] != 1 or low[i] != 0:
+                    problem = "expected a number, got a boolean"
+            elif not isinstance(value, (int, float)):
+                problem = f"expected a number, got {type(value).__name__}"
+            elif not math.isfinite(value):
+                problem = f"expected a finite number, got {value}"
+            elif integer[i] and value != int(value):
+                problem = f"expected an integer, got {value}"
+            elif not low[i] <= value <= high[i]:
+                problem = f"{value} outside [{self.specs[i][1]}, {self.specs[i][2]}]"
+            # Invalid fields are reported once, as invalid rather than missing
+            seen[i] = True
+            if problem:
+                invalid.append(f"{name} ({problem})")
+                continue
+            values[i] = value
+
+        derived = []
+        if self._derivable and seen[self._ratings].all():
+            ratings = values[self._ratings]
+            aggregates = {
+                "Service_Mean": ratings.mean(),
+                "Service_Min": ratings.min(),
+                "Service_Max": ratings.max(),
+                "Service_Var": ratings.var(ddof=1),
+            }
+            for name, value in aggregates.items():
+                i = index.get(name)
+                if i is not None and not seen[i]:
+                    values[i] = value
+                    seen[i] = True
+                    derived.append(name)
+
+        missing = [self.features[i] for i in np.flatnonzero(~seen)]
+        report = {"unknown": unknown, "missing": missing, "invalid": invalid, "derived": derived}
+        if unknown or invalid or (missing and not fill_missing):
+            raise SchemaError(report)
+        return row, report
+
+    def json_schema(self) -> dict:
+        """JSON Schema of the `data` object, for clients and the API docs."""
+        properties = {}
+        for name, (dtype, low, high) in zip(self.features, self.specs):
+            prop = {"type": "number" if dtype == "float64" else "integer", "format": dtype}
+            if low is not None:
+                prop["minimum"] = low
+            if high is not None:
+                prop["maximum"] = high
+            properties[name] = prop
+        optional = set(SERVICE_AGGREGATES) if self._derivable else set()
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": [name for name in self.features if name not in optional],
+            "additionalProperties": False,
+        }
+
+
+def benchmark(repeats: int = 2000, seed: int = 42):
+    """
+    Compares the previous request path (DataFrame from the dict, reindex with 0 fill)
+    with FeatureSchema.parse: time and peak allocated memory per request, with and without scoring.
+    """
+    import tracemalloc
+
+    import pandas as pd
+    from nps_latam.generate_data import generate_synthetic_data
+    from nps_latam.model_training import create_logreg_pipeline
+
+    df = generate_synthetic_data(num_rows=2000, seed=seed).drop(columns=["Genero", "Tipo_Cliente", "Tipo_Viaje", "Clase"])
+    X, y = df.drop(columns=["target"]), df["target"]
+    pipeline = create_logreg_pipeline().fit(X.values, y)
+    schema = FeatureSchema(X.columns)
+    request = {name: (bool(v) if isinstance(v, (bool, np.bool_)) else v.item())
+               for name, v in X.iloc[0].items()}
+
+    def dataframe_path():
+        return pd.DataFrame([request]).reindex(columns=schema.features, fill_value=0)
+
+    def schema_path():
+        return schema.parse(request)[0]
+
+    np.testing.assert_allclose(dataframe_path().to_numpy(dtype=float), schema_path())
+
+    results = []
+    for label, build in (("dataframe", dataframe_path), ("schema", schema_path)):
+        for scored in (False, True):
+            step = (lambda: pipeline.predict_proba(np.asarray(build(), dtype=float))) if scored else build
+            step()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                step()
+            elapsed = (time.perf_counter() - start) / repeats
+
+            # Peak traced memory of a single request: what the path allocates on top of the result
+            tracemalloc.start()
+            peaks = []
+            for _ in range(50):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                step()
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            tracemalloc.stop()
+            results.append({
+                "path": label,
+                "scored": scored,
+                "us_per_request": elapsed * 1e6,
+                "peak_kib_per_request": float(np.median(peaks)) / 1024,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark():
+        print(f"{result['path']:>9} {'+ predict' if result['scored'] else '         '} | "
+              f"{result['us_per_request']:8.1f} us | {result['peak_kib_per_request']:7.1f} KiB peak")
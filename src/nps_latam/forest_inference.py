@@ -0,0 +1,255 @@
+import copy
+import time
+import numpy as np
+
+INT8_MIN, INT8_MAX = np.iinfo(np.int8).min, np.iinfo(np.int8).max
+# Batches needing more (row, tree, level) steps than this are scored by sklearn's
+# compiled traversal instead: the NumPy gathers win on small batches (no per-call
+# thread/tree dispatch) but lose on large ones. Crossover measured with benchmark()
+# on 1 CPU at roughly 1-3M steps for 30-100 trees of depth 8, 10 and unbounded.
+SKLEARN_MIN_STEPS = 2_000_000
+
+
+class FlatForest:
+    """
+    Array-backed copy of a fitted sklearn forest classifier for low-latency scoring.
+
+    All trees are concatenated into contiguous node arrays (feature index, threshold,
+    left/right child) with the per-node class probabilities precomputed. Leaves point
+    to themselves, so a whole batch is scored by stepping every (row, tree) pair
+    `max_depth` times with vectorized NumPy gathers instead of dispatching per tree.
+    Children are interleaved as [left, right] pairs so each step is a single gather.
+
+    `predict_proba` matches the source forest's output:
+    - 'float64' (default) compares float32-cast inputs against float64 thresholds, as sklearn does.
+    - 'float32' stores thresholds as the largest float32 not above the original one,
+      which gives identical splits for float32 inputs at half the memory.
+    - 'int8' stores floored thresholds and requires every input to be an integer in
+      the int8 range (e.g. models trained on 1-5 rating columns only).
+
+    Batches above `sklearn_min_steps` (rows x trees x max_depth) are handed back to
+    the source forest, which is kept as a shallow copy (tree arrays are shared, not
+    duplicated); all variants make the same splits, so results do not change.
+    None always uses the flat traversal.
+    """
+
+    def __init__(self, forest, quantize: str = "float64", chunk_size: int = 4096,
+                 sklearn_min_steps: int = SKLEARN_MIN_STEPS):
+        if quantize not in ("float64", "float32", "int8"):
+            raise ValueError("quantize must be 'float64', 'float32' or 'int8'.")
+        if not hasattr(forest, "estimators_"):
+            raise ValueError("FlatForest requires a fitted forest classifier.")
+
+        self.quantize = quantize
+        self.chunk_size = chunk_size
+        self.sklearn_min_steps = sklearn_min_steps
+        # Fed positional arrays (like the flat path), so its fitted names are dropped
+        self._forest = copy.copy(forest)
+        self._forest.__dict__.pop("feature_names_in_", None)
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        if hasattr(forest, "feature_names_in_"):
+            self.feature_names_in_ = forest.feature_names_in_
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves and always take the left branch
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+
+            value = tree.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.children = np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).ravel().astype(np.intp)
+        # Class-major so each class column is a contiguous gather
+        self.value = np.ascontiguousarray(np.concatenate(values).T)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.threshold = self._quantize_thresholds(np.concatenate(thresholds))
+
+    def _quantize_thresholds(self, threshold):
+        if self.quantize == "float64":
+            return threshold.astype(np.float64)
+        if self.quantize == "float32":
+            # x32 <= t  <=>  x32 <= largest float32 that is <= t
+            t32 = threshold.astype(np.float32)
+            too_high = t32.astype(np.float64) > threshold
+            t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+            return t32
+        # int8: for integer x, x <= t  <=>  x <= floor(t); int16 keeps room for out-of-range bounds
+        floored = np.floor(np.clip(threshold, INT8_MIN - 1, INT8_MAX))
+        return floored.astype(np.int16)
+
+    def _prepare(self, X):
+        if self.quantize == "int8":
+            X = np.asarray(X)
+            if X.size and (not np.all(np.mod(X, 1) == 0) or X.min() < INT8_MIN or X.max() > INT8_MAX):
+                raise ValueError("int8 quantized forest requires integer inputs within the int8 range.")
+            return np.ascontiguousarray(X, dtype=np.int8)
+        # sklearn trees evaluate splits on float32 inputs
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return X if self.quantize == "float32" else X.astype(np.float64)
+
+    def apply(self, X):
+        """Returns the leaf node (global index) reached by every row in every tree, shape (n_rows, n_trees)."""
+        X = self._prepare(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input with {self.n_features_in_} features, got shape {X.shape}.")
+
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        leaves = np.empty((n_rows, len(self.roots)), dtype=np.intp)
+
+        # Row chunks keep the (rows x trees) index arrays cache-sized on large batches
+        for start in range(0, n_rows, self.chunk_size):
+            stop = min(start + self.chunk_size, n_rows)
+            row_offsets = (np.arange(start, stop, dtype=np.intp) * n_features)[:, None]
+            nodes = np.broadcast_to(self.roots, (stop - start, len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                go_right = flat_X[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right]
+            leaves[start:stop] = nodes
+        return leaves
+
+    def predict_proba(self, X):
+        if self.sklearn_min_steps is not None \
+                and len(X) * len(self.roots) * self.max_depth > self.sklearn_min_steps:
+            X_checked = self._prepare(X)
+            return self._forest.predict_proba(X_checked.astype(np.float32, copy=False))
+        leaves = self.apply(X)
+        return np.column_stack([class_value[leaves].mean(axis=1) for class_value in self.value])
+
+    def contributions(self, X, class_index: int = 1):
+        """
+        Path-based feature contributions (Saabas) to the probability of `class_index`.
+
+        Walks the same vectorized traversal as `apply` and credits every step's change
+        in node probability to the feature split on, so for each row
+        `bias + contributions.sum()` equals `predict_proba(X)[:, class_index]`.
+
+        Returns:
+            tuple: (probabilities (n_rows,), bias (float), contributions (n_rows, n_features))
+        """
+        X = self._prepare(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input with {self.n_features_in_} features, got shape {X.shape}.")
+
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        class_value = self.value[class_index]
+        flat_X = X.ravel()
+        bias = float(class_value[self.roots].mean())
+        probs = np.empty(n_rows, dtype=np.float64)
+        contributions = np.empty((n_rows, n_features), dtype=np.float64)
+
+        for start in range(0, n_rows, self.chunk_size):
+            stop = min(start + self.chunk_size, n_rows)
+            rows = stop - start
+            row_offsets = (np.arange(rows, dtype=np.intp) * n_features)[:, None]
+            nodes = np.broadcast_to(self.roots, (rows, n_trees)).copy()
+            node_value = np.broadcast_to(class_value[self.roots], (rows, n_trees))
+            totals = np.zeros(rows * n_features, dtype=np.float64)
+            for _ in range(self.max_depth):
+                split_feature = self.feature[nodes]
+                go_right = flat_X[start * n_features + row_offsets + split_feature] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right]
+                child_value = class_value[nodes]
+                # Leaves loop back to themselves, so finished paths add zero to feature 0
+                totals += np.bincount((row_offsets + split_feature).ravel(),
+                                      weights=(child_value - node_value).ravel(), minlength=rows * n_features)
+                node_value = child_value
+            contributions[start:stop] = totals.reshape(rows, n_features) / n_trees
+            probs[start:stop] = node_value.mean(axis=1)
+        return probs, bias, contributions
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_model(model, quantize: str = "float64"):
+    """
+    Returns a FlatForest for fitted forest classifiers and the model unchanged otherwise,
+    so serving code can compile whatever it loads.
+    """
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)) and hasattr(model, "estimators_"):
+        return FlatForest(model, quantize=quantize)
+    return model
+
+
+def benchmark(n_estimators=100, max_depth=10, n_rows=(1, 1_000, 10_000), repeats=20, seed=42,
+              max_slowdown=1.15):
+    """
+    Times sklearn's predict_proba against FlatForest on the synthetic dataset, checks
+    that every variant returns the same probabilities and raises AssertionError when a
+    variant is more than `max_slowdown` times slower than sklearn at any batch size.
+
+    float64/float32 use all numeric columns; int8 uses a forest trained on the integer
+    survey columns only (its required input domain). Times are the best of `repeats`.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from nps_latam.feature_schema import RATING_FEATURES
+    from nps_latam.generate_data import generate_synthetic_data
+
+    df = generate_synthetic_data(num_rows=max(n_rows) + 5000, seed=seed)
+    X = df.select_dtypes(include=["number", "bool"]).drop(columns=["target"]).astype(float).to_numpy()
+    X_int = df[list(RATING_FEATURES)].to_numpy(dtype=float)
+    y = df["target"]
+
+    def fit(features):
+        forest = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=seed)
+        return forest.fit(features[:5000], y.iloc[:5000])
+
+    forest, forest_int = fit(X), fit(X_int)
+    variants = {
+        "float64": (forest, FlatForest(forest), X),
+        "float32": (forest, FlatForest(forest, quantize="float32"), X),
+        "int8": (forest_int, FlatForest(forest_int, quantize="int8"), X_int),
+    }
+
+    def best_time(predict, batch):
+        predict(batch)
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict(batch)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    results, regressions = [], []
+    for rows in n_rows:
+        result = {"rows": rows}
+        for name, (source, flat, data) in variants.items():
+            batch = data[5000:5000 + rows]
+            np.testing.assert_allclose(flat.predict_proba(batch), source.predict_proba(batch), rtol=0, atol=1e-12)
+            sklearn_time, flat_time = best_time(source.predict_proba, batch), best_time(flat.predict_proba, batch)
+            result[f"sklearn_{name}_ms"] = sklearn_time * 1000
+            result[f"{name}_ms"] = flat_time * 1000
+            if flat_time > max_slowdown * sklearn_time:
+                regressions.append(f"{name} at {rows} rows: {flat_time * 1000:.2f} ms vs sklearn {sklearn_time * 1000:.2f} ms")
+        results.append(result)
+
+    if regressions:
+        raise AssertionError("FlatForest slower than sklearn: " + "; ".join(regressions))
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark():
+        print(f"{result['rows']:>6} rows | " + " | ".join(
+            f"{name} {result[f'{name}_ms']:.3f} ms (sklearn {result[f'sklearn_{name}_ms']:.3f})"
+            for name in ("float64", "float32", "int8")))
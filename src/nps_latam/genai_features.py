@@ -1,9 +1,9 @@
 import pandas as pd
+import numpy as np
+import json
 import os
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
 # Load environment variables
@@ -20,7 +20,8 @@ def get_llm():
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-    
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
     return ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         google_api_key=api_key
@@ -31,11 +32,12 @@ def analyze_feedback_batch(texts):
     Analyzes a list of text feedback items using GenAI to extract features.
     Returns a DataFrame with the original text and extracted columns.
     """
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     llm = get_llm()
     parser = JsonOutputParser(pydantic_object=TextAnalysis)
 
-    from langchain_core.prompts import ChatPromptTemplate
-
     prompt = ChatPromptTemplate.from_messages([
         ("system", "You are an expert data analyst for an airline. Analyze the provided customer text and extract structured features as JSON.\n{format_instructions}"),
         ("human", "{text}")
@@ -110,6 +112,145 @@ def generate_synthetic_feedback(row):
     else:
         return "I was unhappy because " + " and ".join(issues) + "."
 
+# Synthetic feedback issues in the order generate_synthetic_feedback lists them
+_FEEDBACK_ISSUES = [
+    "wifi was the worst",
+    "food was cold",
+    "plane was dirty",
+    "legroom was terrible for such a long flight",
+]
+
+def generate_synthetic_feedback_frame(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized generate_synthetic_feedback for a whole DataFrame.
+    Each row's issues form a 4-bit code that indexes a precomputed table of texts,
+    so no Python code runs per row. Returns the same strings as the row version.
+    """
+    def col(name, default):
+        if name in df.columns:
+            return df[name].to_numpy()
+        return np.full(len(df), default)
+
+    with np.errstate(invalid="ignore"):
+        masks = [
+            col('Wifi_a_bordo', 5) <= 2,
+            col('Comida_Bebida', 5) <= 2,
+            col('Limpieza', 5) <= 2,
+            (col('Distancia_Vuelo', 0) > 1000) & (col('Espacio_Piernas', 5) <= 2),
+        ]
+    code = np.zeros(len(df), dtype=np.int64)
+    for bit, mask in enumerate(masks):
+        code |= mask.astype(np.int64) << bit
+
+    table = ["It was an okay flight, nothing special."]
+    for c in range(1, 2 ** len(_FEEDBACK_ISSUES)):
+        issues = [issue for bit, issue in enumerate(_FEEDBACK_ISSUES) if c >> bit & 1]
+        table.append("I was unhappy because " + " and ".join(issues) + ".")
+    texts = np.array(table, dtype=object)[code]
+
+    satisfied = (code == 0) & (col('Satisfaccion', None) == 'satisfied')
+    texts[satisfied] = "Great flight, everything went smoothly."
+    return pd.Series(texts, index=df.index, name="feedback_text")
+
+# Serializes read-merge-write of feedback caches between request and job threads
+_cache_lock = threading.Lock()
+
+def load_feedback_cache(cache_path) -> dict:
+    """Reads a feedback cache (text -> analysis); a missing or unreadable file is an empty cache."""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable feedback cache {cache_path}: {e}")
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def _merge_feedback_cache(cache_path, new_entries: dict) -> dict:
+    """
+    Adds `new_entries` to the cache file and returns the merged cache. The file is
+    re-read under the lock so entries written meanwhile by other threads or workers
+    are kept, then replaced atomically so readers never see a partial file.
+    """
+    with _cache_lock:
+        cache = load_feedback_cache(cache_path)
+        cache.update(new_entries)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    return cache
+
+def analyze_feedback_cached(texts, cache_path=None, batch_size=50, analyzer=None):
+    """
+    Analyzes texts with a cache in front of the LLM.
+    Texts are deduplicated, only unseen ones are sent to `analyzer` in batches of
+    `batch_size`, and results are mapped back to every input position.
+    The cache is a JSON file (text -> analysis) when `cache_path` is given.
+
+    Returns a DataFrame shaped like analyze_feedback_batch's output; texts the analyzer
+    failed on keep its "Error" sentiment (uncached), empty or non-text inputs get "N/A".
+    """
+    analyzer = analyzer or analyze_feedback_batch
+    cache = load_feedback_cache(cache_path)
+
+    texts = list(texts)
+    missing = [t for t in dict.fromkeys(texts) if isinstance(t, str) and t and t not in cache]
+    new_entries, failed = {}, {}
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        analyzed = analyzer(batch)
+        for text, record in zip(batch, analyzed.to_dict(orient="records")):
+            entry = {k: record.get(k) for k in ("sentiment", "intent", "keywords")}
+            # Failed analyses are reported as such but not cached, so they are retried next time
+            if record.get("sentiment") == "Error":
+                failed[text] = entry
+            else:
+                new_entries[text] = entry
+
+    # LLM calls above run without the lock; only the file update is serialized
+    if cache_path and new_entries:
+        cache = _merge_feedback_cache(cache_path, new_entries)
+    else:
+        cache.update(new_entries)
+
+    empty = {"sentiment": "N/A", "intent": "N/A", "keywords": []}
+    features_df = pd.DataFrame([cache.get(t) or failed.get(t, empty) if isinstance(t, str) else empty
+                                for t in texts])
+    features_df['original_text'] = texts
+    sentiment_map = {"Positive": 1, "Neutral": 0, "Negative": -1}
+    features_df['sentiment_score'] = features_df['sentiment'].map(sentiment_map).fillna(0)
+    return features_df
+
+TEXT_INTENTS = ["Booking", "Complaint", "Inquiry", "Feedback", "Other"]
+TEXT_TOPICS = ["Wifi", "Food", "Cleanliness", "Legroom", "Delay", "Luggage", "Service"]
+
+def text_features_frame(analysis_df: pd.DataFrame, index=None) -> pd.DataFrame:
+    """
+    Converts analysis output into compact int8 model columns:
+    sentiment score, one-hot intent and keyword topic flags.
+    """
+    features = {"txt_sentiment": analysis_df["sentiment_score"].to_numpy().astype(np.int8)}
+    intents = analysis_df["intent"].astype(str).to_numpy()
+    for intent in TEXT_INTENTS:
+        features[f"txt_intent_{intent}"] = (intents == intent).astype(np.int8)
+
+    keywords = analysis_df["keywords"].map(lambda ks: " ".join(ks or []).lower())
+    for topic in TEXT_TOPICS:
+        features[f"txt_topic_{topic}"] = keywords.str.contains(topic.lower(), regex=False).to_numpy().astype(np.int8)
+
+    return pd.DataFrame(features, index=index if index is not None else analysis_df.index)
+
+def build_text_features(df: pd.DataFrame, cache_path=None, analyzer=None) -> pd.DataFrame:
+    """
+    Text-feature stage: synthetic feedback for every row, cached/batched analysis,
+    and compact columns aligned to `df.index`.
+    """
+    texts = generate_synthetic_feedback_frame(df)
+    analysis_df = analyze_feedback_cached(texts.tolist(), cache_path=cache_path, analyzer=analyzer)
+    return text_features_frame(analysis_df, index=df.index)
+
 if __name__ == "__main__":
     # Test execution
     sample_texts = [
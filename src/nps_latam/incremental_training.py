@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to sys.path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src.nps_latam.data_pipeline import clean_and_save_dataset
+from src.nps_latam.ingestion import load_dataset
+from src.nps_latam.data_quality import validate_dataset
+
+EXPERIMENT_NAME = "NPS_Latam_Model_Tracking"
+# Artifact path per model kind; runs are tagged with it so the registry knows where to look
+ARTIFACT_PATHS = {"forest": "random_forest_model", "sgd": "sgd_model"}
+CLASSES = np.array([0, 1])
+# Forest size cap: once reached, every update drops as many of the oldest trees as it adds
+MAX_FOREST_ESTIMATORS = 300
+
+
+def create_sgd_pipeline(random_state=42):
+    """
+    Scaler + logistic-loss SGD pipeline that can be updated with partial_fit_pipeline.
+    StandardScaler keeps running means/variances, so new partitions update it in place.
+    """
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('sgd', SGDClassifier(loss='log_loss', alpha=1e-4, random_state=random_state))
+    ])
+
+
+def partial_fit_pipeline(pipeline, X: pd.DataFrame, y, epochs: int = 5):
+    """Updates the scaler moments and the SGD weights with one new partition."""
+    scaler, sgd = pipeline.named_steps['scaler'], pipeline.named_steps['sgd']
+    scaler.partial_fit(X)
+    X_scaled = scaler.transform(X)
+    for _ in range(epochs):
+        sgd.partial_fit(X_scaled, y, classes=CLASSES)
+    # Pipeline.feature_names_in_ is read from its first step
+    return pipeline
+
+
+def warm_start_forest(forest, X: pd.DataFrame, y, n_new_trees: int = 20,
+                      max_estimators: int = MAX_FOREST_ESTIMATORS):
+    """
+    Adds `n_new_trees` trees trained on the new partition only; existing trees are kept as they are.
+    Beyond `max_estimators` the oldest trees are dropped, so the forest stays a fixed-size
+    window over the most recent partitions instead of growing (in size and latency) forever.
+    """
+    if len(np.unique(y)) < len(forest.classes_):
+        raise ValueError("New partition must contain every class to add trees to the forest.")
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+    forest.fit(X, y)
+    if max_estimators is not None and len(forest.estimators_) > max_estimators:
+        forest.estimators_ = forest.estimators_[-max_estimators:]
+        forest.set_params(n_estimators=max_estimators)
+    return forest
+
+
+def load_partitions(paths, features=None) -> pd.DataFrame:
+    """
+    Reads, validates and cleans new labelled partitions; aligns them to `features` when given.
+    Invalid rows are quarantined; a partition failing a schema gate raises DataQualityError.
+    """
+    frames = []
+    for path in paths:
+        df, _ = validate_dataset(load_dataset(path), name=f"partition_{Path(path).stem}", raise_on_failure=True)
+        frames.append(clean_and_save_dataset(df, output_path=None))
+    df = pd.concat(frames, ignore_index=True)
+    if 'target' not in df.columns:
+        raise ValueError("Partitions must be labelled (Satisfaccion or target column).")
+    df = df.dropna(subset=['target'])
+    y = df['target'].astype(int)
+    X = df.drop(columns=['target'])
+    if features is not None:
+        X = X.reindex(columns=features, fill_value=0)
+    return X, y
+
+
+def _find_parent_run(mlflow, model_kind: str):
+    """Latest finished run with a servable model of this kind (see ModelRegistry._servable), or None."""
+    from src.nps_latam.model_registry import ModelRegistry
+
+    runs = mlflow.search_runs(experiment_names=[EXPERIMENT_NAME], order_by=["start_time DESC"],
+                              filter_string="attributes.status = 'FINISHED'", max_results=50)
+    if runs.empty:
+        return None
+    # Runs from before the tag existed are full forest retrains
+    artifact_paths = runs.get("tags.model_artifact_path", pd.Series(index=runs.index, dtype=object))
+    matches = runs[artifact_paths.fillna(ARTIFACT_PATHS["forest"]) == ARTIFACT_PATHS[model_kind]]
+    # The tag is set when a run starts, so a match may have stopped (data-quality gate,
+    # failed training) before logging its model
+    registry = ModelRegistry(tracking_uri=mlflow.get_tracking_uri(), experiment_name=EXPERIMENT_NAME,
+                             artifact_path=ARTIFACT_PATHS[model_kind])
+    for run_id in matches.run_id:
+        servable, _ = registry._servable(run_id)
+        if servable:
+            return run_id
+    return None
+
+
+def _parent_lineage(mlflow, parent_run_id: str) -> dict:
+    try:
+        return mlflow.artifacts.load_dict(f"runs:/{parent_run_id}/lineage.json")
+    except Exception:
+        # Full retrains do not log a lineage file; they are the root of the chain
+        return {"root_run_id": parent_run_id, "depth": 0, "partitions": []}
+
+
+def train_incremental(partitions, model_kind: str = "forest", parent_run_id: str = None,
+                      n_new_trees: int = 20, max_estimators: int = MAX_FOREST_ESTIMATORS,
+                      holdout: float = 0.2, progress=None):
+    """
+    Updates the latest model of `model_kind` with new labelled partitions only and logs
+    the result as a new MLflow run linked to its parent.
+
+    Args:
+        partitions (list): CSV files with new labelled rows (survey exports, labelled predictions).
+        model_kind (str): "forest" (warm_start adds trees) or "sgd" (partial_fit updates weights).
+        parent_run_id (str): Run to continue from; the latest run of the same kind when None.
+            For "sgd" without any parent a new model is started from the partitions.
+        n_new_trees (int): Trees added per forest update.
+        max_estimators (int): Forest size cap; the oldest trees are dropped beyond it (None: no cap).
+        holdout (float): Share of the new rows kept aside for the logged validation metrics.
+        progress (callable): Optional f(fraction, message) callback (used by the job queue).
+
+    Returns:
+        dict: Run id, parent run id and metrics.
+    """
+    if model_kind not in ARTIFACT_PATHS:
+        raise ValueError(f"model_kind must be one of {sorted(ARTIFACT_PATHS)}.")
+    progress = progress or (lambda fraction, message: None)
+    partitions = [str(p) for p in partitions]
+
+    import mlflow
+    import mlflow.sklearn
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    mlflow.set_tracking_uri("file://" + str(project_root / "mlruns"))
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    artifact_path = ARTIFACT_PATHS[model_kind]
+
+    progress(0.05, "Loading parent model")
+    if parent_run_id is None:
+        parent_run_id = _find_parent_run(mlflow, model_kind)
+    if parent_run_id is not None:
+        model = mlflow.sklearn.load_model(f"runs:/{parent_run_id}/{artifact_path}")
+        lineage = _parent_lineage(mlflow, parent_run_id)
+        features = list(model.feature_names_in_)
+    elif model_kind == "sgd":
+        model, lineage, features = create_sgd_pipeline(), None, None
+    else:
+        raise LookupError("No parent forest run found; run a full train_and_track first.")
+
+    already_seen = set(lineage["partitions"]) if lineage else set()
+    new_partitions = [p for p in partitions if os.path.abspath(p) not in already_seen]
+    if not new_partitions:
+        raise ValueError("All partitions were already used by the parent run's lineage.")
+
+    progress(0.15, "Reading new partitions")
+    X, y = load_partitions(new_partitions, features)
+    X_train, X_valid, y_train, y_valid = train_test_split(X, y, test_size=holdout, stratify=y, random_state=42)
+
+    with mlflow.start_run() as run:
+        mlflow.set_tags({
+            "training_mode": "incremental" if parent_run_id else "initial",
+            "model_artifact_path": artifact_path,
+            "parent_run_id": parent_run_id or "",
+        })
+        mlflow.log_params({
+            "model_kind": model_kind,
+            "new_partitions": len(new_partitions),
+            "new_rows": len(X),
+            "n_new_trees": n_new_trees if model_kind == "forest" else 0,
+            "max_estimators": max_estimators if model_kind == "forest" else 0,
+        })
+
+        progress(0.3, "Updating model")
+        start = time.perf_counter()
+        if model_kind == "forest":
+            warm_start_forest(model, X_train, y_train, n_new_trees=n_new_trees, max_estimators=max_estimators)
+        else:
+            partial_fit_pipeline(model, X_train, y_train)
+        train_seconds = time.perf_counter() - start
+
+        progress(0.7, "Evaluating")
+        y_prob = model.predict_proba(X_valid)[:, 1]
+        y_pred = model.classes_[(y_prob > 0.5).astype(int)]
+        metrics = {
+            "accuracy": accuracy_score(y_valid, y_pred),
+            "f1_score": f1_score(y_valid, y_pred),
+            "roc_auc": roc_auc_score(y_valid, y_prob),
+            "train_seconds": train_seconds,
+        }
+        if model_kind == "forest":
+            metrics["n_estimators"] = len(model.estimators_)
+        mlflow.log_metrics(metrics)
+
+        progress(0.85, "Logging model")
+        mlflow.sklearn.log_model(model, artifact_path)
+        mlflow.log_dict({
+            "parent_run_id": parent_run_id,
+            "root_run_id": lineage["root_run_id"] if lineage else run.info.run_id,
+            "depth": lineage["depth"] + 1 if lineage else 0,
+            "partitions": sorted(already_seen | {os.path.abspath(p) for p in new_partitions}),
+        }, "lineage.json")
+
+        print(f"Incremental {model_kind} run {run.info.run_id} (parent {parent_run_id}): {len(X)} new rows, "
+              f"trained in {train_seconds:.2f}s, AUC={metrics['roc_auc']:.4f}")
+        return {"run_id": run.info.run_id, "parent_run_id": parent_run_id, **metrics}
@@ -0,0 +1,186 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns of the survey export, stored as pandas categoricals
+CATEGORY_COLUMNS = ("Genero", "Tipo_Cliente", "Tipo_Viaje", "Clase")
+MB = 1024 * 1024
+
+
+def memory_budget_mb():
+    """Budget from the INGEST_MEMORY_BUDGET_MB env var, or None (no limit)."""
+    value = os.getenv("INGEST_MEMORY_BUDGET_MB")
+    return float(value) if value else None
+
+
+def optimize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcasts columns in place: integers to the smallest type holding their actual range
+    (1-5 Likert ratings become int8), floats to float32 and CATEGORY_COLUMNS to category.
+    Integers are downcast after parsing because read_csv wraps out-of-range values
+    silently when given a narrow integer dtype.
+    """
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = series.astype(np.float32)
+        elif column in CATEGORY_COLUMNS:
+            df[column] = series.astype("category")
+    return df
+
+
+def _column_bytes(df: pd.DataFrame) -> pd.Series:
+    return df.memory_usage(deep=True, index=False)
+
+
+class IngestionPlan:
+    def __init__(self, path, sample_rows: int = 10_000, usecols=None):
+        """
+        Samples the head of a CSV to estimate its row count and its memory footprint
+        with pandas' default dtypes (`raw`) and after optimize_frame (`optimized`).
+
+        Args:
+            path (str): CSV file.
+            sample_rows (int): Rows read for the estimate.
+            usecols (list): Columns that will be loaded (all when None).
+        """
+        self.path = str(path)
+        self.usecols = usecols
+        # Floats are parsed straight to float32 and categoricals straight to category
+        self.read_dtypes = {}
+
+        with open(self.path, "rb") as f:
+            head = list(itertools.islice(f, sample_rows + 1))
+        sample_bytes = sum(len(line) for line in head[1:])
+        sample = pd.read_csv(self.path, nrows=sample_rows, usecols=usecols, encoding="utf-8")
+        self.sample_rows = len(sample)
+        file_size = os.path.getsize(self.path)
+        self.estimated_rows = int(round(file_size / (sample_bytes / len(head[1:])))) if len(head) > 1 else 0
+
+        self.raw_column_bytes = _column_bytes(sample)
+        self.raw_dtypes = sample.dtypes.astype(str)
+        for column in sample.columns:
+            if pd.api.types.is_float_dtype(sample[column]):
+                self.read_dtypes[column] = np.float32
+            elif column in CATEGORY_COLUMNS and not pd.api.types.is_numeric_dtype(sample[column]):
+                self.read_dtypes[column] = "category"
+        self.sample = optimize_frame(sample)
+        self.optimized_column_bytes = _column_bytes(self.sample)
+
+    def _per_row(self, column_bytes: pd.Series) -> float:
+        return column_bytes.sum() / self.sample_rows if self.sample_rows else 0.0
+
+    @property
+    def raw_bytes(self) -> float:
+        """Estimated size of the whole file loaded with default dtypes."""
+        return self._per_row(self.raw_column_bytes) * self.estimated_rows
+
+    @property
+    def optimized_bytes(self) -> float:
+        """Estimated size of the whole file after downcasting."""
+        return self._per_row(self.optimized_column_bytes) * self.estimated_rows
+
+    def chunk_rows(self, budget_bytes: float) -> int:
+        """Rows per chunk so that one default-dtype chunk fits next to the optimized result."""
+        headroom = budget_bytes - self.optimized_bytes
+        return max(1_000, int(headroom / max(self._per_row(self.raw_column_bytes), 1.0)))
+
+
+def _concat_chunks(chunks: list) -> pd.DataFrame:
+    """Concatenates optimized chunks; categoricals get a common category set so they stay categorical."""
+    if len(chunks) == 1:
+        return chunks[0]
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            categories = pd.api.types.union_categoricals([chunk[column] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def memory_report(raw_column_bytes: pd.Series, df: pd.DataFrame, raw_dtypes=None) -> pd.DataFrame:
+    """Per-column bytes before (default dtypes) and after downcasting, largest columns first."""
+    after = _column_bytes(df)
+    report = pd.DataFrame({
+        "dtype_before": pd.Series(raw_dtypes, dtype=object) if raw_dtypes is not None else None,
+        "dtype_after": df.dtypes.astype(str),
+        "bytes_before": raw_column_bytes.reindex(after.index).round().astype(np.int64),
+        "bytes_after": after,
+    })
+    report["saved_pct"] = 100 * (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0))
+    report.index.name = "column"
+    return report.sort_values("bytes_before", ascending=False).reset_index()
+
+
+def load_dataset(path, memory_budget: float = None, usecols=None, chunk_rows: int = None,
+                 sample_rows: int = 10_000, report: bool = False):
+    """
+    Loads a CSV with minimal dtypes within a memory budget.
+
+    The head of the file is sampled first. If the downcast result would not fit the
+    budget a MemoryError is raised before anything large is allocated. If a
+    default-dtype read would not fit, the file is read in chunks that are downcast
+    one at a time, so the peak stays near the final size.
+
+    Args:
+        path (str): CSV file.
+        memory_budget (float): Budget in MB; INGEST_MEMORY_BUDGET_MB when None (no limit if unset).
+        usecols (list): Columns to load (all when None).
+        chunk_rows (int): Force chunked reading with this many rows per chunk.
+        sample_rows (int): Rows sampled for dtype inference and size estimates.
+        report (bool): Also return the per-column memory report.
+
+    Returns:
+        pd.DataFrame, or (DataFrame, report DataFrame) with `report`.
+    """
+    plan = IngestionPlan(path, sample_rows=sample_rows, usecols=usecols)
+    budget_mb = memory_budget if memory_budget is not None else memory_budget_mb()
+    budget = budget_mb * MB if budget_mb else None
+
+    if budget is not None and plan.optimized_bytes > budget:
+        raise MemoryError(
+            f"{path}: about {plan.optimized_bytes / MB:.0f} MB after downcasting "
+            f"({plan.estimated_rows} rows), over the {budget_mb:.0f} MB ingestion budget. "
+            "Load fewer columns or process the file in chunks (pd.read_csv(chunksize=...) + optimize_frame)."
+        )
+    if chunk_rows is None and budget is not None and plan.raw_bytes + plan.optimized_bytes > budget:
+        chunk_rows = plan.chunk_rows(budget)
+
+    read_kwargs = {"usecols": usecols, "dtype": plan.read_dtypes, "encoding": "utf-8"}
+    if chunk_rows:
+        chunks = [optimize_frame(chunk) for chunk in pd.read_csv(path, chunksize=chunk_rows, **read_kwargs)]
+        df = _concat_chunks(chunks) if chunks else plan.sample.iloc[:0]
+    else:
+        df = optimize_frame(pd.read_csv(path, **read_kwargs))
+
+    if not report:
+        return df
+    # "Before" is the sampled default-dtype footprint scaled to the rows loaded
+    raw_bytes = plan.raw_column_bytes / max(plan.sample_rows, 1) * len(df)
+    return df, memory_report(raw_bytes, df, plan.raw_dtypes)
+
+
+def profile_dataset(path, sample_rows: int = 10_000, usecols=None) -> pd.DataFrame:
+    """Estimated per-column memory of the whole file before and after downcasting, from a sample."""
+    plan = IngestionPlan(path, sample_rows=sample_rows, usecols=usecols)
+    scale = plan.estimated_rows / max(plan.sample_rows, 1)
+    report = memory_report(plan.raw_column_bytes * scale, plan.sample, plan.raw_dtypes)
+    report["bytes_after"] = (report["bytes_after"] * scale).round().astype(np.int64)
+    report["saved_pct"] = 100 * (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0))
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from nps_latam.config import PROCESSED_DATA_PATH
+
+    target = sys.argv[1] if len(sys.argv) > 1 else PROCESSED_DATA_PATH
+    df, memory = load_dataset(target, report=True)
+    print(memory.to_string(index=False))
+    print(f"\n{len(df)} rows: {memory['bytes_before'].sum() / MB:.1f} MB -> {memory['bytes_after'].sum() / MB:.1f} MB")
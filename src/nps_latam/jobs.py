@@ -0,0 +1,228 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Job states; the last three are final
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a task when cancellation was requested. Like asyncio.CancelledError it
+    is not an Exception, so task code with broad `except Exception` handlers cannot swallow it.
+    """
+
+
+class JobStore:
+    def __init__(self, path: str = ":memory:"):
+        """
+        SQLite-backed job table. A file path persists jobs across restarts and lets
+        every API worker process see the same jobs; ":memory:" keeps them in-process.
+        """
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            # Readers in other processes do not block the writer
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    def _execute(self, sql: str, args=()):
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def create(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        self._execute("INSERT INTO jobs (id, kind, status, params, worker_pid, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                      (job_id, kind, QUEUED, json.dumps(params), os.getpid(), time.time()))
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str, include_result: bool = True):
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_dict(rows[0], include_result) if rows else None
+
+    def list(self, limit: int = 50, status: str = None) -> list:
+        if status:
+            rows = self._execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit))
+        else:
+            rows = self._execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._to_dict(row, include_result=False) for row in rows]
+
+    def cancel_requested(self, job_id: str) -> bool:
+        rows = self._execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))
+        return bool(rows and rows[0]["cancel_requested"])
+
+    def fail_orphans(self, pids=None) -> int:
+        """
+        Marks jobs left queued or running by a process that no longer exists as failed.
+        Jobs owned by live processes (other API workers) are left alone; `pids` limits
+        the sweep to jobs owned by those processes, known to have exited.
+        """
+        rows = self._execute("SELECT id, worker_pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING))
+        if pids is None:
+            orphans = [row["id"] for row in rows if not _pid_alive(row["worker_pid"])]
+        else:
+            orphans = [row["id"] for row in rows if row["worker_pid"] in set(pids)]
+        for job_id in orphans:
+            self.update(job_id, status=FAILED, error="Interrupted: the worker running it exited.",
+                        finished_at=time.time())
+        return len(orphans)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row, include_result: bool) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        if include_result:
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+        else:
+            job.pop("result")
+        return job
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobContext:
+    """Handed to every task: reports progress and checks for cancellation."""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    def progress(self, fraction: float, message: str = None):
+        self.check_cancelled()
+        self.store.update(self.job_id, progress=max(0.0, min(1.0, fraction)), message=message)
+
+    def check_cancelled(self):
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled()
+
+
+class JobQueue:
+    def __init__(self, store: JobStore, workers: int = 2):
+        """
+        Runs registered tasks on a thread pool and records their state in `store`.
+
+        A task is `func(ctx, **params)` returning a JSON-serializable result. Cancellation
+        is cooperative: queued jobs never start, running jobs stop at their next
+        `ctx.progress()` or `ctx.check_cancelled()` call.
+        """
+        self.store = store
+        self.tasks = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, func):
+        self.tasks[kind] = func
+
+    def submit(self, kind: str, params: dict = None) -> str:
+        if kind not in self.tasks:
+            raise KeyError(f"Unknown job kind '{kind}'.")
+        params = params or {}
+        job_id = self.store.create(kind, params)
+        future = self._pool.submit(self._run, job_id, kind, params)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id: str, kind: str, params: dict):
+        ctx = JobContext(self.store, job_id)
+        if self.store.cancel_requested(job_id):
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+            return
+        self.store.update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = self.tasks[kind](ctx, **params)
+            self.store.update(job_id, status=SUCCEEDED, progress=1.0, result=result, finished_at=time.time())
+        except JobCancelled:
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            self.store.update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+
+    def cancel(self, job_id: str):
+        """Requests cancellation. Returns the job, or None if it does not exist."""
+        job = self.store.get(job_id, include_result=False)
+        if job is None or job["status"] in FINAL_STATES:
+            return job
+        self.store.update(job_id, cancel_requested=1)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+        return self.store.get(job_id, include_result=False)
+
+    def shutdown(self, timeout: float = 0):
+        """
+        Stops accepting work. Jobs that have not started yet are marked failed; running
+        jobs get up to `timeout` seconds to finish and are marked failed after that, since
+        the process is about to exit under them.
+        """
+        with self._lock:
+            pending = list(self._futures.items())
+        running = []
+        for job_id, future in pending:
+            if future.cancel():
+                self.store.update(job_id, status=FAILED, error="Interrupted: the API shut down before it started.",
+                                  finished_at=time.time())
+            else:
+                running.append((job_id, future))
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+        if running and timeout > 0:
+            wait([future for _, future in running], timeout=timeout)
+        for job_id, future in running:
+            if not future.done():
+                self.store.update(job_id, status=FAILED, error="Interrupted: the API shut down while it was running.",
+                                  finished_at=time.time())
@@ -0,0 +1,285 @@
+import bisect
+import csv
+import datetime
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Prefix of the reply FlightChatbot.respond logs when the LLM call fails
+ERROR_RESPONSE_PREFIX = "I'm sorry, I encountered an error"
+# Upper bounds (characters) of the length histogram buckets; the last bucket is open-ended
+LENGTH_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048)
+# Bytes before the resume offset compared to tell an appended log from a replaced one
+_FINGERPRINT_BYTES = 64
+# Bytes read and parsed at a time, so a first refresh over a large log has bounded memory
+_READ_BLOCK_BYTES = 1 << 20
+SNAPSHOT_VERSION = 1
+
+
+class LengthStats:
+    """Count, sum, max and bucketed histogram of text lengths."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * (len(LENGTH_BUCKETS) + 1)
+
+    def add(self, length: int):
+        self.count += 1
+        self.total += length
+        self.max = max(self.max, length)
+        self.buckets[bisect.bisect_left(LENGTH_BUCKETS, length)] += 1
+
+    def summary(self) -> dict:
+        labels = [f"<={edge}" for edge in LENGTH_BUCKETS] + [f">{LENGTH_BUCKETS[-1]}"]
+        return {
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "total": self.total, "max": self.max, "buckets": self.buckets}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        stats = cls()
+        stats.count, stats.total, stats.max = data["count"], data["total"], data["max"]
+        stats.buckets = list(data["buckets"])
+        return stats
+
+
+class ChatLogTail:
+    def __init__(self, log_file: str, recent_rows: int = 500, snapshot_path: str = None,
+                 snapshot_interval: float = 30.0):
+        """
+        Incrementally tails the chatbot CSV log and keeps dashboard aggregates up to date:
+        counts per hour and day, error replies, and query/response length distributions.
+
+        Only bytes appended since the previous refresh are read and parsed, so the cost
+        of a refresh depends on the new rows, not on the size of the log. A log that was
+        truncated or replaced (rotation) is detected by the bytes just before the read
+        offset no longer matching, and is parsed again from the start.
+
+        Args:
+            log_file (str): Path to the chatbot log written by FlightChatbot.
+            recent_rows (int): Number of most recent rows kept in memory for history views.
+            snapshot_path (str): JSON file the aggregates and read offset are saved to. A new
+                tail resumes from it and only parses rows logged after it was written.
+            snapshot_interval (float): Minimum seconds between snapshot writes.
+        """
+        self.log_file = str(log_file)
+        self.recent_rows = recent_rows
+        self.snapshot_path = str(snapshot_path) if snapshot_path else None
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self._next_snapshot = 0.0
+        self._reset()
+        if self.snapshot_path:
+            self._load_snapshot()
+
+    def _reset(self):
+        self._offset = 0
+        self._tail_bytes = b""
+        self._header = None
+        self._stat = None
+        self.total = 0
+        self.errors = 0
+        self.hourly_counts = [0] * 24
+        self.daily_counts = {}
+        self.query_lengths = LengthStats()
+        self.response_lengths = LengthStats()
+        self.latest_timestamp = None
+        self.recent = deque(maxlen=self.recent_rows)
+
+    @staticmethod
+    def _complete_records(data: bytes) -> bytes:
+        """Trims a trailing partial record (unterminated line or open quoted field)."""
+        end = data.rfind(b"\n") + 1
+        # Records may span lines inside quotes; a complete prefix has balanced quotes
+        while end and data.count(b'"', 0, end) % 2:
+            end = data.rfind(b"\n", 0, end - 1) + 1
+        return data[:end]
+
+    def refresh(self) -> int:
+        """Parses rows appended since the last call. Returns the number of new rows."""
+        with self._lock:
+            try:
+                stat = os.stat(self.log_file)
+            except FileNotFoundError:
+                self._reset()
+                return 0
+
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current == self._stat:
+                return 0
+
+            new_rows = 0
+            with open(self.log_file, "rb") as f:
+                if stat.st_size < self._offset or self._fingerprint(f) != self._tail_bytes:
+                    # Log was truncated or rotated
+                    self._reset()
+                f.seek(self._offset)
+                pending = b""
+                while True:
+                    block = f.read(_READ_BLOCK_BYTES)
+                    if not block:
+                        break
+                    # A partial trailing record is carried over to the next block
+                    pending += block
+                    data = self._complete_records(pending)
+                    pending = pending[len(data):]
+                    if data:
+                        self._offset += len(data)
+                        self._tail_bytes = (self._tail_bytes + data[-_FINGERPRINT_BYTES:])[-_FINGERPRINT_BYTES:]
+                        new_rows += self._parse(data)
+
+            self._stat = current if self._offset == stat.st_size else None
+
+            if new_rows and self.snapshot_path and time.monotonic() >= self._next_snapshot:
+                self._save_snapshot()
+            return new_rows
+
+    def _parse(self, data: bytes) -> int:
+        """Adds the complete records in `data`; returns the number of rows (header excluded)."""
+        reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+        rows = 0
+        for record in reader:
+            if self._header is None:
+                self._header = record
+                continue
+            if not record:
+                continue
+            self._add(dict(zip(self._header, record)))
+            rows += 1
+        return rows
+
+    def _add(self, row: dict):
+        index = self.total
+        self.total += 1
+        try:
+            timestamp = datetime.datetime.fromisoformat(row.get("timestamp", ""))
+        except ValueError:
+            timestamp = None
+        if timestamp is not None:
+            self.hourly_counts[timestamp.hour] += 1
+            day = timestamp.date().isoformat()
+            self.daily_counts[day] = self.daily_counts.get(day, 0) + 1
+            if self.latest_timestamp is None or timestamp > self.latest_timestamp:
+                self.latest_timestamp = timestamp
+
+        response = row.get("bot_response") or ""
+        if response.startswith(ERROR_RESPONSE_PREFIX):
+            self.errors += 1
+        self.query_lengths.add(len(row.get("user_query") or ""))
+        self.response_lengths.add(len(response))
+        self.recent.append({"index": index, **row})
+
+    def kpis(self, days: int = 30) -> dict:
+        """Current aggregates; `days` limits the daily counts to the most recent days."""
+        with self._lock:
+            return {
+                "total_interactions": self.total,
+                "latest_interaction": self.latest_timestamp.isoformat() if self.latest_timestamp else None,
+                "hourly_counts": list(self.hourly_counts),
+                "daily_counts": dict(sorted(self.daily_counts.items())[-days:]) if days else {},
+                "error_responses": self.errors,
+                "error_rate": self.errors / self.total if self.total else 0.0,
+                "query_length": self.query_lengths.summary(),
+                "response_length": self.response_lengths.summary(),
+            }
+
+    # --- Snapshots ---
+
+    def _fingerprint(self, f) -> bytes:
+        """The (up to) _FINGERPRINT_BYTES bytes of the log before the read offset."""
+        start = max(0, self._offset - _FINGERPRINT_BYTES)
+        f.seek(start)
+        return f.read(self._offset - start)
+
+    def _save_snapshot(self):
+        """Writes the aggregates and read offset (caller holds the lock)."""
+        self._next_snapshot = time.monotonic() + self.snapshot_interval
+        try:
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "offset": self._offset,
+                "fingerprint": self._tail_bytes.hex(),
+                "header": self._header,
+                "total": self.total,
+                "errors": self.errors,
+                "hourly_counts": self.hourly_counts,
+                "daily_counts": self.daily_counts,
+                "query_lengths": self.query_lengths.to_dict(),
+                "response_lengths": self.response_lengths.to_dict(),
+                "latest_timestamp": self.latest_timestamp.isoformat() if self.latest_timestamp else None,
+                "recent": list(self.recent),
+            }
+            # Atomic replace: API workers sharing the file never read a partial snapshot
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Could not save chat log snapshot: {e}")
+
+    def save_snapshot(self):
+        with self._lock:
+            if self.snapshot_path:
+                self._save_snapshot()
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                return
+            self._offset = snapshot["offset"]
+            with open(self.log_file, "rb") as f:
+                # The log must still start with the bytes the snapshot was taken over
+                self._tail_bytes = bytes.fromhex(snapshot["fingerprint"])
+                if os.fstat(f.fileno()).st_size < self._offset or self._fingerprint(f) != self._tail_bytes:
+                    self._reset()
+                    return
+        except (OSError, ValueError, KeyError):
+            self._reset()
+            return
+
+        self._header = snapshot["header"]
+        self.total = snapshot["total"]
+        self.errors = snapshot["errors"]
+        self.hourly_counts = snapshot["hourly_counts"]
+        self.daily_counts = snapshot["daily_counts"]
+        self.query_lengths = LengthStats.from_dict(snapshot["query_lengths"])
+        self.response_lengths = LengthStats.from_dict(snapshot["response_lengths"])
+        latest = snapshot["latest_timestamp"]
+        self.latest_timestamp = datetime.datetime.fromisoformat(latest) if latest else None
+        self.recent.extend(snapshot["recent"])
+
+    def rows_since(self, cursor: int = 0, limit: int = 500) -> dict:
+        """
+        Returns rows with index >= `cursor` (at most `limit`, newest kept) and the
+        cursor to pass on the next call.
+        """
+        with self._lock:
+            rows = [row for row in self.recent if row["index"] >= cursor]
+            return {"cursor": self.total, "rows": rows[-limit:] if limit else []}
+
+    def recent_queries(self, limit: int) -> list:
+        with self._lock:
+            queries = [row.get("user_query") for row in self.recent if row.get("user_query")]
+        return queries[-limit:]
+
+
+def log_summary(log_file: str, snapshot_path: str = None, days: int = 30) -> dict:
+    """
+    Aggregates of a chatbot log without reading it whole: resumes from the snapshot
+    (when given) and parses only rows logged since, then refreshes the snapshot.
+    """
+    tail = ChatLogTail(log_file, snapshot_path=snapshot_path, snapshot_interval=0)
+    tail.refresh()
+    return tail.kpis(days=days)
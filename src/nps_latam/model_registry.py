@@ -0,0 +1,454 @@
+import copy
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import PROJECT_ROOT
+from .explanations import Explainer
+from .feature_schema import FeatureSchema
+from .forest_inference import compile_model
+from .run_index import RunIndex
+
+DEFAULT_EXPERIMENT = "NPS_Latam_Model_Tracking"
+DEFAULT_ARTIFACT_PATH = "random_forest_model"
+
+
+def serving_view(model, features):
+    """
+    Shallow copy of a fitted model (fitted arrays shared) that scores plain NumPy rows
+    built in `features` order without sklearn's per-call feature-name check.
+
+    The check exists to catch columns passed in the wrong order; here the order is
+    verified once against the names the model was fitted with, and a mismatch raises.
+    The model itself keeps its names, so DataFrame callers (batch scoring) and the
+    warning everywhere else in the process are unaffected.
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return model
+    if list(names) != list(features):
+        raise ValueError("Model feature names do not match the registered feature list (order or names differ).")
+
+    def unnamed(estimator):
+        if "feature_names_in_" not in vars(estimator):
+            return estimator
+        view = copy.copy(estimator)
+        del view.feature_names_in_
+        return view
+
+    if hasattr(model, "steps"):
+        view = copy.copy(model)
+        view.steps = [(name, unnamed(step) if step not in (None, "passthrough") else step)
+                      for name, step in model.steps]
+        return view
+    return unnamed(model)
+
+
+class ModelVersion:
+    """
+    A loaded model plus the feature list it expects, the request schema
+    generated from it and its explainer (with its cache of explained rows).
+    `scorer` is the model's serving_view, fed with rows parsed by `schema`.
+
+    Instances are reference-counted by the registry: every request scoring with
+    a version holds a lease on it, and a retired version only drops its pipeline
+    once the last lease is released.
+    """
+
+    def __init__(self, version: str, pipeline, features, source: str = "local", run_id: str = None):
+        self.version = version
+        self.pipeline = pipeline
+        self.features = list(features)
+        self.schema = FeatureSchema(self.features)
+        self.scorer = serving_view(pipeline, self.features)
+        self.explainer = Explainer(self.scorer, self.features)
+        self.source = source
+        self.run_id = run_id
+        self.loaded_at = time.time()
+        self.refcount = 0
+        self.retired = False
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "run_id": self.run_id,
+            "n_features": len(self.features),
+            "loaded_at": self.loaded_at,
+            "in_flight": self.refcount,
+            "explanations": self.explainer.stats() if self.explainer is not None else None,
+            "retired": self.retired,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, tracking_uri: str = None, experiment_name: str = DEFAULT_EXPERIMENT,
+                 artifact_path: str = DEFAULT_ARTIFACT_PATH, forest_quantize: str = "float64",
+                 best_metric: str = "roc_auc", runs_refresh_interval: float = 5.0):
+        """
+        In-process registry of model versions with atomic hot-swap and shadow scoring.
+
+        Args:
+            tracking_uri (str): MLflow tracking URI. Defaults to the local `mlruns/` store.
+            experiment_name (str): Experiment searched when loading runs.
+            artifact_path (str): Artifact path the model was logged under in each run.
+            forest_quantize (str): Threshold precision used when compiling forests into
+                FlatForest ('float64', 'float32' or 'int8'), or None to serve them through sklearn.
+            best_metric (str): Metric ranking finished runs in the run index (`runs.best()`).
+            runs_refresh_interval (float): Minimum seconds between run index refreshes.
+        """
+        self.tracking_uri = tracking_uri or "file://" + str(PROJECT_ROOT / "mlruns")
+        self.experiment_name = experiment_name
+        self.artifact_path = artifact_path
+        self.forest_quantize = forest_quantize
+        # Latest/best run lookups without scanning the experiment
+        self.runs = RunIndex(self.tracking_uri, experiment_name, best_metric=best_metric,
+                             min_interval=runs_refresh_interval)
+
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._active = None
+        self._shadow = None
+        self._shadow_fraction = 0.0
+        self._shadow_stats = {"scored": 0, "agreements": 0, "abs_prob_diff_sum": 0.0}
+
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        # Runs the watcher must not pick up again: every run ever registered (even if
+        # since unloaded) and runs it already skipped or failed to load
+        self._handled_runs = set()
+
+    # --- Registration & loading ---
+
+    def register(self, version: str, pipeline, features, source: str = "local",
+                 run_id: str = None, activate: bool = False) -> ModelVersion:
+        """
+        Registers an already fitted pipeline under `version`. Forest classifiers are
+        compiled into a FlatForest for serving unless `forest_quantize` is None.
+        """
+        if self.forest_quantize is not None:
+            pipeline = compile_model(pipeline, quantize=self.forest_quantize)
+        model_version = ModelVersion(version, pipeline, features, source=source, run_id=run_id)
+        with self._lock:
+            if version in self._versions:
+                raise ValueError(f"Model version '{version}' is already registered.")
+            self._versions[version] = model_version
+            if run_id is not None:
+                self._handled_runs.add(run_id)
+        if activate:
+            self.activate(version)
+        return model_version
+
+    def _mlflow(self):
+        import mlflow
+        mlflow.set_tracking_uri(self.tracking_uri)
+        return mlflow
+
+    def list_runs(self, max_results: int = 20) -> list:
+        """Lists the most recent runs of the tracked experiment, newest first."""
+        mlflow = self._mlflow()
+        runs = mlflow.search_runs(
+            experiment_names=[self.experiment_name],
+            order_by=["start_time DESC"],
+            max_results=max_results,
+        )
+        if runs.empty:
+            return []
+        return [
+            {"run_id": row.run_id, "start_time": str(row.start_time), "loaded": row.run_id in self._versions}
+            for row in runs.itertuples()
+        ]
+
+    def latest_run_summary(self):
+        """Returns id, start time, status and metrics of the most recent run, or None if there are no runs."""
+        return self.runs.latest()
+
+    def best_run_summary(self):
+        """Same summary for the finished run with the highest `best_metric`, or None."""
+        return self.runs.best()
+
+    def latest_run_id(self):
+        # Explicit loads and the watcher must not act on a throttled view
+        self.runs.refresh(force=True)
+        latest = self.runs.latest()
+        return latest["run_id"] if latest else None
+
+    def _servable(self, run_id: str):
+        """
+        (servable, reason) for a run: it must be FINISHED, have a logged model and not
+        have been stopped by the data-quality gate (tag data_quality=failed).
+        A None reason means the run is still open and may become servable.
+        """
+        from mlflow.tracking import MlflowClient
+
+        client = MlflowClient(tracking_uri=self.tracking_uri)
+        run = client.get_run(run_id)
+        if run.info.status in ("RUNNING", "SCHEDULED"):
+            return False, None
+        if run.info.status != "FINISHED":
+            return False, f"status {run.info.status}"
+        if run.data.tags.get("data_quality") == "failed":
+            return False, "failed the data-quality gate"
+        # MLflow 3 records logged models as run outputs; older runs keep them under the artifact path
+        outputs = getattr(run, "outputs", None)
+        if outputs is not None and outputs.model_outputs:
+            return True, None
+        artifact_path = run.data.tags.get("model_artifact_path", self.artifact_path)
+        if client.list_artifacts(run_id, artifact_path):
+            return True, None
+        return False, "no logged model"
+
+    def load_from_mlflow(self, run_id: str = None, activate: bool = False) -> ModelVersion:
+        """
+        Loads the model logged by an MLflow run (the latest run when `run_id` is None).
+        The run id doubles as the version name.
+        """
+        if run_id is None:
+            run_id = self.latest_run_id()
+            if run_id is None:
+                raise LookupError(f"No runs found for experiment '{self.experiment_name}'.")
+
+        with self._lock:
+            existing = self._versions.get(run_id)
+        if existing is not None:
+            if activate:
+                self.activate(run_id)
+            return existing
+
+        mlflow = self._mlflow()
+        import mlflow.sklearn
+        # Incremental runs tag where their model lives (e.g. sgd_model)
+        artifact_path = mlflow.get_run(run_id).data.tags.get("model_artifact_path", self.artifact_path)
+        pipeline = mlflow.sklearn.load_model(f"runs:/{run_id}/{artifact_path}")
+
+        features = getattr(pipeline, "feature_names_in_", None)
+        if features is None:
+            raise ValueError(f"Model from run '{run_id}' does not expose feature_names_in_.")
+
+        print(f"Loaded model from MLflow run {run_id} ({len(features)} features).")
+        return self.register(run_id, pipeline, features, source="mlflow", run_id=run_id, activate=activate)
+
+    # --- Swapping ---
+
+    def activate(self, version: str, retire_previous: bool = True) -> ModelVersion:
+        """
+        Atomically makes `version` the active model. In-flight requests keep the
+        lease on the version they started with; new requests see the new one.
+        """
+        with self._lock:
+            new_active = self._get(version)
+            previous = self._active
+            self._active = new_active
+            if self._shadow is new_active:
+                self._shadow = None
+                self._shadow_fraction = 0.0
+            if retire_previous and previous is not None and previous is not new_active and previous is not self._shadow:
+                self._retire(previous)
+        print(f"Active model set to '{version}'.")
+        return new_active
+
+    def set_shadow(self, version: str, fraction: float) -> ModelVersion:
+        """Scores `fraction` (0-1) of the traffic with `version` as well, without serving its output."""
+        if not 0.0 <= fraction <= 1.0:
+            raise ValueError("Shadow fraction must be between 0 and 1.")
+        with self._lock:
+            candidate = self._get(version)
+            if candidate is self._active:
+                raise ValueError(f"Model version '{version}' is already active.")
+            self._shadow = candidate
+            self._shadow_fraction = fraction
+            self._shadow_stats = {"scored": 0, "agreements": 0, "abs_prob_diff_sum": 0.0}
+        return candidate
+
+    def clear_shadow(self):
+        with self._lock:
+            self._shadow = None
+            self._shadow_fraction = 0.0
+
+    def unload(self, version: str):
+        """Retires `version`; its pipeline is freed once in-flight requests finish."""
+        with self._lock:
+            model_version = self._get(version)
+            if model_version is self._active:
+                raise ValueError(f"Cannot unload the active model version '{version}'.")
+            if model_version is self._shadow:
+                self._shadow = None
+                self._shadow_fraction = 0.0
+            self._retire(model_version)
+
+    def _get(self, version: str) -> ModelVersion:
+        model_version = self._versions.get(version)
+        if model_version is None or model_version.retired:
+            raise KeyError(f"Model version '{version}' is not loaded.")
+        return model_version
+
+    def _retire(self, model_version: ModelVersion):
+        # Caller holds the lock
+        model_version.retired = True
+        self._versions.pop(model_version.version, None)
+        if model_version.refcount == 0:
+            model_version.pipeline = model_version.scorer = model_version.explainer = None
+
+    # --- State hand-off ---
+
+    def export_state(self) -> dict:
+        """Loaded versions and the active/shadow selection, as JSON-serializable data for `apply_state`."""
+        with self._lock:
+            return {
+                "versions": [{"version": v.version, "run_id": v.run_id} for v in self._versions.values()],
+                "active": self._active.version if self._active else None,
+                "shadow": self._shadow.version if self._shadow else None,
+                "shadow_fraction": self._shadow_fraction,
+            }
+
+    def apply_state(self, state: dict):
+        """
+        Makes this registry match an `export_state` snapshot taken in another process:
+        MLflow versions it lacks are loaded, the active and shadow models are set, and
+        versions missing from the snapshot are unloaded.
+        """
+        for entry in state["versions"]:
+            with self._lock:
+                loaded = entry["version"] in self._versions
+            if not loaded and entry["run_id"] is not None:
+                self.load_from_mlflow(entry["run_id"])
+
+        if state["active"] is not None:
+            self.activate(state["active"], retire_previous=False)
+        if state["shadow"] is not None:
+            self.set_shadow(state["shadow"], state["shadow_fraction"])
+        else:
+            self.clear_shadow()
+
+        wanted = {entry["version"] for entry in state["versions"]}
+        with self._lock:
+            stale = [version for version in self._versions if version not in wanted]
+        for version in stale:
+            self.unload(version)
+
+    # --- Leases ---
+
+    def _acquire(self, model_version: ModelVersion):
+        model_version.refcount += 1
+        return model_version
+
+    def _release(self, model_version: ModelVersion):
+        with self._lock:
+            model_version.refcount -= 1
+            if model_version.retired and model_version.refcount == 0:
+                model_version.pipeline = model_version.scorer = model_version.explainer = None
+
+    @contextmanager
+    def lease(self, version: str = None):
+        """
+        Holds a reference to a model version (the active one by default) for the
+        duration of the block. Yields None when no model is active.
+        """
+        with self._lock:
+            model_version = self._active if version is None else self._versions.get(version)
+            if model_version is not None:
+                self._acquire(model_version)
+        try:
+            yield model_version
+        finally:
+            if model_version is not None:
+                self._release(model_version)
+
+    def pick_shadow(self):
+        """Returns the shadow version name if this request was sampled for shadow scoring."""
+        with self._lock:
+            shadow, fraction = self._shadow, self._shadow_fraction
+        if shadow is None or fraction <= 0.0 or random.random() >= fraction:
+            return None
+        return shadow.version
+
+    def record_shadow(self, primary_prob: float, shadow_prob: float):
+        with self._lock:
+            stats = self._shadow_stats
+            stats["scored"] += 1
+            stats["agreements"] += int((primary_prob >= 0.5) == (shadow_prob >= 0.5))
+            stats["abs_prob_diff_sum"] += abs(primary_prob - shadow_prob)
+
+    # --- Introspection ---
+
+    @property
+    def active(self):
+        return self._active
+
+    def describe(self) -> dict:
+        with self._lock:
+            stats = dict(self._shadow_stats)
+            scored = stats["scored"]
+            return {
+                "active": self._active.version if self._active else None,
+                "shadow": self._shadow.version if self._shadow else None,
+                "shadow_fraction": self._shadow_fraction,
+                "shadow_stats": {
+                    "scored": scored,
+                    "agreement_rate": stats["agreements"] / scored if scored else None,
+                    "mean_abs_prob_diff": stats["abs_prob_diff_sum"] / scored if scored else None,
+                },
+                "versions": [v.describe() for v in self._versions.values()],
+                "watching": self._watch_thread is not None and self._watch_thread.is_alive(),
+            }
+
+    # --- Registry watching ---
+
+    def watch(self, interval: float = 60.0, mode: str = "activate", shadow_fraction: float = 0.1):
+        """
+        Polls the MLflow experiment in a daemon thread and picks up new runs.
+
+        Only finished runs with a logged model that passed the data-quality gate are
+        loaded, and each run is considered once: a version an operator unloaded is
+        not brought back, and a run that fails to load is not retried every poll.
+
+        Args:
+            interval (float): Seconds between polls.
+            mode (str): 'activate' to hot-swap new runs in, 'shadow' to score them on
+                `shadow_fraction` of the traffic first.
+            shadow_fraction (float): Traffic share used in 'shadow' mode.
+        """
+        if mode not in ("activate", "shadow"):
+            raise ValueError("mode must be 'activate' or 'shadow'.")
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+
+        def _poll():
+            while not self._watch_stop.wait(interval):
+                self.poll_once(mode, shadow_fraction)
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=_poll, name="model-registry-watch", daemon=True)
+        self._watch_thread.start()
+
+    def poll_once(self, mode: str = "activate", shadow_fraction: float = 0.1) -> bool:
+        """
+        One watcher step (see `watch`): loads the latest run if it is new and servable.
+        Returns True when a run was loaded. Used directly by the pre-fork parent,
+        which watches on behalf of its workers.
+        """
+        try:
+            run_id = self.latest_run_id()
+            if run_id is None or run_id in self._handled_runs:
+                return False
+            servable, reason = self._servable(run_id)
+            if not servable:
+                if reason is not None:
+                    self._handled_runs.add(run_id)
+                    print(f"Model registry watch: skipping run {run_id} ({reason}).")
+                return False
+            # Marked before loading so a broken run is tried once, not every interval
+            self._handled_runs.add(run_id)
+            self.load_from_mlflow(run_id)
+            if mode == "activate":
+                self.activate(run_id)
+            else:
+                self.set_shadow(run_id, shadow_fraction)
+            return True
+        except Exception as e:
+            print(f"Model registry watch failed: {e}")
+            return False
+
+    def stop_watching(self):
+        self._watch_stop.set()
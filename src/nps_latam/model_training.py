@@ -1,8 +1,6 @@
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.feature_selection import RFECV
 import pandas as pd
 
 def create_logreg_pipeline(max_iter=1000, random_state=42):
@@ -19,6 +17,9 @@ def run_rfecv_selection(X_train, y_train, cv=5, scoring='roc_auc', min_features=
     Runs Recursive Feature Elimination with Cross-Validation (RFECV) using RandomForest.
     Returns the fitted selector and the ranked feature dataframe.
     """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_selection import RFECV
+
     rfecv = RFECV(
         estimator=RandomForestClassifier(n_estimators=20, n_jobs=-1, random_state=42),
         cv=cv,
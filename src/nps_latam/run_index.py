@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+# Runs still open when seen; their metrics are re-read by id until they finish
+_OPEN_STATUSES = ("RUNNING", "SCHEDULED")
+
+
+def _summary(run) -> dict:
+    return {
+        "run_id": run.info.run_id,
+        "start_time": datetime.fromtimestamp(run.info.start_time / 1000, tz=timezone.utc).isoformat(),
+        "status": run.info.status,
+        "metrics": dict(run.data.metrics),
+    }
+
+
+class RunIndex:
+    def __init__(self, tracking_uri: str, experiment_name: str, best_metric: str = "roc_auc",
+                 min_interval: float = 5.0):
+        """
+        Latest and best run of an MLflow experiment, kept up to date incrementally.
+
+        A refresh only asks MLflow for runs started after the newest one already seen,
+        plus the few runs that were still open, so reads cost the same whatever the
+        size of the run history. On a local file store the experiment directory's
+        mtime is checked first and nothing is queried when no run was created.
+
+        Args:
+            tracking_uri (str): MLflow tracking URI.
+            experiment_name (str): Experiment to index.
+            best_metric (str): Metric (higher is better) that ranks finished runs for `best()`.
+            min_interval (float): Seconds between refreshes; reads in between use the index as is.
+        """
+        self.tracking_uri = tracking_uri
+        self.experiment_name = experiment_name
+        self.best_metric = best_metric
+        self.min_interval = min_interval
+
+        self._lock = threading.Lock()
+        self._client = None
+        self._experiment_id = None
+        self._experiment_dir = None
+        self._dir_mtime = None
+        self._last_start_ms = -1
+        self._open_runs = set()
+        self._latest = None
+        self._best = None
+        self._next_refresh = 0.0
+
+    def _connect(self):
+        from mlflow.tracking import MlflowClient
+
+        client = MlflowClient(tracking_uri=self.tracking_uri)
+        experiment = client.get_experiment_by_name(self.experiment_name)
+        if experiment is None:
+            return False
+        self._client = client
+        self._experiment_id = experiment.experiment_id
+        parsed = urlparse(self.tracking_uri)
+        if parsed.scheme in ("", "file"):
+            self._experiment_dir = os.path.join(parsed.path, experiment.experiment_id)
+        return True
+
+    def _experiment_changed(self) -> bool:
+        if self._experiment_dir is None:
+            return True
+        try:
+            mtime = os.stat(self._experiment_dir).st_mtime_ns
+        except OSError:
+            return True
+        changed, self._dir_mtime = mtime != self._dir_mtime, mtime
+        return changed
+
+    def _consider(self, run):
+        summary = _summary(run)
+        if run.info.start_time >= self._last_start_ms:
+            self._last_start_ms = run.info.start_time
+        if self._latest is None or run.info.start_time >= self._latest["_start_ms"] \
+                or run.info.run_id == self._latest["run_id"]:
+            self._latest = {**summary, "_start_ms": run.info.start_time}
+
+        if run.info.status in _OPEN_STATUSES:
+            self._open_runs.add(run.info.run_id)
+            return
+        self._open_runs.discard(run.info.run_id)
+        value = run.data.metrics.get(self.best_metric)
+        if run.info.status == "FINISHED" and value is not None \
+                and (self._best is None or value > self._best["metrics"][self.best_metric]):
+            self._best = summary
+
+    def refresh(self, force: bool = False):
+        """Pulls runs created since the last refresh and updates the runs that were still open."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now < self._next_refresh:
+                return
+            self._next_refresh = now + self.min_interval
+            if self._client is None and not self._connect():
+                return
+
+            if self._experiment_changed():
+                # >= so runs sharing the newest millisecond are not missed; re-reading one is harmless
+                page_token = None
+                while True:
+                    runs = self._client.search_runs(
+                        [self._experiment_id],
+                        filter_string=f"attributes.start_time >= {self._last_start_ms}",
+                        order_by=["attributes.start_time ASC"],
+                        max_results=1000,
+                        page_token=page_token,
+                    )
+                    for run in runs:
+                        self._consider(run)
+                    page_token = runs.token
+                    if not page_token:
+                        break
+
+            for run_id in list(self._open_runs):
+                self._consider(self._client.get_run(run_id))
+
+    def latest(self):
+        """Summary (run id, start time, status, metrics) of the most recently started run, or None."""
+        self.refresh()
+        with self._lock:
+            return {k: v for k, v in self._latest.items() if k != "_start_ms"} if self._latest else None
+
+    def best(self):
+        """Summary of the finished run with the highest `best_metric`, or None."""
+        self.refresh()
+        with self._lock:
+            return dict(self._best) if self._best else None
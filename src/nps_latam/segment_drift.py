@@ -0,0 +1,214 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Population Stability Index levels commonly read as moderate / significant shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.2
+_EPS = 1e-4
+
+
+class SegmentIndex:
+    def __init__(self, ref_df: pd.DataFrame, cur_df: pd.DataFrame, columns, pairs: bool = True):
+        """
+        Precomputed group index of a reference and a current batch.
+
+        Rows are coded once by their joint cell (the combination of all segment
+        column values). Any histogram is computed once per cell with a single
+        np.bincount pass, and every segment (column value or pair of values) is a
+        sum of cells, done with a small aggregation matrix instead of another pass
+        over the rows.
+
+        Args:
+            ref_df (pd.DataFrame): Reference batch.
+            cur_df (pd.DataFrame): Current batch.
+            columns (list): Segment columns (e.g. Clase, Tipo_Viaje, Distance_Bin); missing ones are skipped.
+            pairs (bool): Also index every pair of segment columns.
+        """
+        self.columns = [c for c in columns if c in ref_df.columns and c in cur_df.columns]
+        n_ref = len(ref_df)
+
+        joint = np.zeros(n_ref + len(cur_df), dtype=np.int64)
+        uniques = {}
+        for column in self.columns:
+            codes, values = pd.factorize(pd.concat([ref_df[column], cur_df[column]], ignore_index=True),
+                                         use_na_sentinel=False)
+            joint = joint * len(values) + codes
+            uniques[column] = list(values)
+
+        cells, cell_keys = pd.factorize(joint)
+        self.ref_cells, self.cur_cells = cells[:n_ref], cells[n_ref:]
+        self.n_cells = len(cell_keys)
+
+        # Decode every cell back to its per-column value codes
+        cell_codes, rest = {}, np.asarray(cell_keys, dtype=np.int64)
+        for column in reversed(self.columns):
+            rest, cell_codes[column] = np.divmod(rest, len(uniques[column]))
+
+        # (name, labels, aggregation matrix of shape (segments, cells))
+        self.segmentations = []
+        specs = [(column,) for column in self.columns]
+        if pairs:
+            specs += list(combinations(self.columns, 2))
+        for spec in specs:
+            group = np.zeros(self.n_cells, dtype=np.int64)
+            for column in spec:
+                group = group * len(uniques[column]) + cell_codes[column]
+            groups, group_keys = pd.factorize(group)
+            labels = []
+            for key in group_keys:
+                parts = []
+                for column in reversed(spec):
+                    key, code = divmod(int(key), len(uniques[column]))
+                    parts.append(f"{column}={uniques[column][code]}")
+                labels.append(" & ".join(reversed(parts)))
+            matrix = np.zeros((len(labels), self.n_cells))
+            matrix[groups, np.arange(self.n_cells)] = 1.0
+            self.segmentations.append((" x ".join(spec), labels, matrix))
+
+    @property
+    def n_segments(self) -> int:
+        return sum(len(labels) for _, labels, _ in self.segmentations)
+
+    def cell_histograms(self, ref_bins, cur_bins, n_bins: int):
+        """(cells, bins) count matrices of both batches, one bincount each."""
+        shape = (self.n_cells, n_bins)
+        ref_hist = np.bincount(self.ref_cells * n_bins + ref_bins, minlength=self.n_cells * n_bins).reshape(shape)
+        cur_hist = np.bincount(self.cur_cells * n_bins + cur_bins, minlength=self.n_cells * n_bins).reshape(shape)
+        return ref_hist, cur_hist
+
+    def cell_sums(self, ref_values=None, cur_values=None):
+        """Per-cell row counts (or sums of `values`) of both batches."""
+        return (np.bincount(self.ref_cells, weights=ref_values, minlength=self.n_cells),
+                np.bincount(self.cur_cells, weights=cur_values, minlength=self.n_cells))
+
+
+def bin_feature(ref: pd.Series, cur: pd.Series, bins: int = 10):
+    """
+    Shared bin codes for a feature in both batches. Discrete features (integer or
+    boolean ranges such as 0-5 ratings in both batches, or non-numeric columns) get
+    one bin per value; continuous ones, and integer columns that arrive as floats
+    in either batch (e.g. with missing values), use reference quantile edges.
+    Missing values get their own bin.
+
+    Returns:
+        tuple: (ref codes, cur codes, number of bins)
+    """
+    def is_discrete(series):
+        return pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series)
+
+    if is_discrete(ref) and is_discrete(cur):
+        ref_values, cur_values = ref.to_numpy(np.int64), cur.to_numpy(np.int64)
+        low = min(ref_values.min(initial=np.iinfo(np.int64).max), cur_values.min(initial=np.iinfo(np.int64).max))
+        high = max(ref_values.max(initial=low), cur_values.max(initial=low))
+        if high - low <= 50:
+            # Value offsets are the codes; no hashing needed
+            return ref_values - low, cur_values - low, int(high - low) + 1
+
+    if not pd.api.types.is_numeric_dtype(ref):
+        codes, uniques = pd.factorize(pd.concat([ref, cur], ignore_index=True), use_na_sentinel=False)
+        return codes[:len(ref)], codes[len(ref):], len(uniques)
+
+    ref_values, cur_values = ref.to_numpy(np.float64), cur.to_numpy(np.float64)
+    edges = np.unique(np.nanquantile(ref_values, np.linspace(0, 1, bins + 1)[1:-1]))
+    ref_codes = np.searchsorted(edges, ref_values, side="right")
+    cur_codes = np.searchsorted(edges, cur_values, side="right")
+    # NaNs sort past every edge; give them a bin of their own
+    ref_codes[np.isnan(ref_values)] = len(edges) + 1
+    cur_codes[np.isnan(cur_values)] = len(edges) + 1
+    return ref_codes, cur_codes, len(edges) + 2
+
+
+def _psi(ref_hist: np.ndarray, cur_hist: np.ndarray) -> np.ndarray:
+    """PSI per row of two (groups, bins) count matrices."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ref_p = np.clip(ref_hist / ref_hist.sum(axis=1, keepdims=True), _EPS, None)
+        cur_p = np.clip(cur_hist / cur_hist.sum(axis=1, keepdims=True), _EPS, None)
+    return ((cur_p - ref_p) * np.log(cur_p / ref_p)).sum(axis=1)
+
+
+def segment_drift(ref_df: pd.DataFrame, cur_df: pd.DataFrame, segment_columns, features=None,
+                  target: str = "target", pairs: bool = True, bins: int = 10, min_rows: int = 100,
+                  top_k: int = 10, index: SegmentIndex = None, return_details: bool = False):
+    """
+    Drift and satisfaction per segment (and pair of segments) of a current batch vs a reference.
+
+    Each feature costs one bincount pass per batch over the precomputed cell index,
+    whatever the number of segments; segment histograms are aggregated from cells.
+
+    Args:
+        ref_df (pd.DataFrame): Reference batch (e.g. training data).
+        cur_df (pd.DataFrame): Current batch.
+        segment_columns (list): Columns defining segments (Clase, Tipo_Viaje, Distance_Bin...).
+        features (list): Features to compare; numeric columns shared by both batches when None.
+        target (str): Satisfaction label (1 = satisfied); satisfaction rates are skipped if absent.
+        pairs (bool): Include every pair of segment columns.
+        bins (int): Quantile bins for continuous features.
+        min_rows (int): Segments with fewer rows in either batch are not reported.
+        top_k (int): Number of segments returned, most drifted first (None for all).
+        index (SegmentIndex): Reuse a precomputed index for these two batches.
+        return_details (bool): Also return the per (segment, feature) PSI table.
+
+    Returns:
+        pd.DataFrame: One row per segment with sizes, population share, mean/max PSI,
+        most drifted feature, drifted feature count and satisfaction rates. With
+        `return_details`, a (summary, details) tuple.
+    """
+    index = index or SegmentIndex(ref_df, cur_df, segment_columns, pairs=pairs)
+    if features is None:
+        excluded = set(index.columns) | {target}
+        features = [c for c in ref_df.columns
+                    if c in cur_df.columns and c not in excluded and pd.api.types.is_numeric_dtype(ref_df[c])]
+    else:
+        features = [c for c in features if c in ref_df.columns and c in cur_df.columns]
+
+    # One pass over the rows per feature; everything below works on (cells, bins) matrices
+    cell_hists = [index.cell_histograms(*bin_feature(ref_df[f], cur_df[f], bins)) for f in features]
+    ref_counts, cur_counts = index.cell_sums()
+    has_target = target in ref_df.columns and target in cur_df.columns
+    if has_target:
+        ref_satisfied, cur_satisfied = index.cell_sums(ref_df[target].to_numpy(np.float64),
+                                                       cur_df[target].to_numpy(np.float64))
+
+    summaries, details = [], []
+    for name, labels, matrix in index.segmentations:
+        n_ref, n_cur = matrix @ ref_counts, matrix @ cur_counts
+        psi = np.column_stack([_psi(matrix @ ref_hist, matrix @ cur_hist) for ref_hist, cur_hist in cell_hists]) \
+            if features else np.zeros((len(labels), 0))
+
+        summary = pd.DataFrame({
+            "segmentation": name,
+            "segment": labels,
+            "n_ref": n_ref.astype(np.int64),
+            "n_cur": n_cur.astype(np.int64),
+            "share_ref": n_ref / max(len(ref_df), 1),
+            "share_cur": n_cur / max(len(cur_df), 1),
+        })
+        if features:
+            summary["mean_psi"] = psi.mean(axis=1)
+            summary["max_psi"] = psi.max(axis=1)
+            summary["top_feature"] = np.asarray(features)[psi.argmax(axis=1)]
+            summary["drifted_features"] = (psi >= PSI_SIGNIFICANT).sum(axis=1)
+        if has_target:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                summary["satisfaction_ref"] = (matrix @ ref_satisfied) / n_ref
+                summary["satisfaction_cur"] = (matrix @ cur_satisfied) / n_cur
+            summary["satisfaction_delta"] = summary["satisfaction_cur"] - summary["satisfaction_ref"]
+
+        keep = (n_ref >= min_rows) & (n_cur >= min_rows)
+        summaries.append(summary[keep])
+        if return_details and features:
+            detail = pd.DataFrame(psi[keep], columns=features)
+            detail.insert(0, "segment", np.asarray(labels)[keep])
+            details.append(detail.melt(id_vars="segment", var_name="feature", value_name="psi"))
+
+    result = pd.concat(summaries, ignore_index=True)
+    if "mean_psi" in result.columns:
+        result = result.sort_values("mean_psi", ascending=False, ignore_index=True)
+    if top_k:
+        result = result.head(top_k)
+    if return_details:
+        details_df = pd.concat(details, ignore_index=True) if details else pd.DataFrame(columns=["segment", "feature", "psi"])
+        return result, details_df
+    return result
@@ -0,0 +1,365 @@
+import argparse
+import gc
+import json
+import math
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import uvicorn
+
+# Add project root to sys.path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from src.nps_latam import api
+from src.nps_latam.jobs import JobStore
+
+
+def _cgroup_cpu_quota():
+    """Returns the container CPU quota (in CPUs) from cgroup v2 or v1, or None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """Number of CPUs this process may use, honouring affinity masks and cgroup quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def process_memory(pid: int) -> dict:
+    """Reads RSS, PSS and private/shared memory (kB) of a process from /proc."""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[key.lower()] = int(rest.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that notifies the parent through a pipe once it accepts connections."""
+
+    def __init__(self, config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        try:
+            if self.started:
+                os.write(self.ready_fd, b"1")
+        except BrokenPipeError:
+            # The parent stopped waiting (ready timeout); serving does not depend on it
+            pass
+        finally:
+            os.close(self.ready_fd)
+
+
+class PreforkServer:
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = None,
+                 graceful_timeout: int = 30, ready_timeout: int = 120):
+        """
+        Pre-fork process manager for the API.
+
+        The parent loads the model once, freezes the GC so collections do not touch
+        (and copy) the shared heap, then forks workers that share the model's NumPy
+        buffers copy-on-write and accept connections from one inherited socket.
+
+        With MODEL_REGISTRY_WATCH_INTERVAL set, the parent (not the workers) polls
+        MLflow and forks a new generation around each new run, so workers keep
+        sharing one copy of the model.
+
+        Model swaps requested through a worker (admin endpoints, jobs with activate)
+        are handed to the parent, which applies them and forks a new generation, so a
+        swap reaches every worker and survives respawns.
+
+        Signals:
+            SIGHUP: pick up the latest servable MLflow run (the current model stays
+                active if there is none) and replace all workers without dropping requests.
+            SIGUSR2: apply the registry state published by a worker (see api._publish_registry_state).
+            SIGUSR1: print per-worker memory usage.
+            SIGTERM / SIGINT: stop workers gracefully and exit.
+
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind.
+            workers (int): Number of workers. Defaults to the CPUs available to the container.
+            graceful_timeout (int): Seconds a worker may spend finishing in-flight requests.
+            ready_timeout (int): Seconds to wait for a new worker to start accepting.
+        """
+        self.host = host
+        self.port = port
+        self.num_workers = workers or available_cpus()
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+
+        self.sock = None
+        self.workers = set()
+        self.retiring = set()
+        self._should_exit = False
+        self._should_reload = False
+        self._should_apply = False
+        self._should_report = False
+        self._next_watch = None
+
+    # --- Workers ---
+
+    def _spawn_worker(self):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2, signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                config = uvicorn.Config(api.app, timeout_graceful_shutdown=self.graceful_timeout)
+                _WorkerServer(config, write_fd).run(sockets=[self.sock])
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        os.close(write_fd)
+        return pid, read_fd
+
+    def _wait_ready(self, pending: dict) -> set:
+        """Waits until the workers in {pid: ready pipe fd} accept connections; returns the ready pids."""
+        ready = set()
+        fds = {fd: pid for pid, fd in pending.items()}
+        deadline = time.monotonic() + self.ready_timeout
+        while fds and time.monotonic() < deadline:
+            readable, _, _ = select.select(list(fds), [], [], max(0.0, deadline - time.monotonic()))
+            for fd in readable:
+                pid = fds.pop(fd)
+                if os.read(fd, 1) == b"1":
+                    ready.add(pid)
+                os.close(fd)
+        for fd in fds:
+            os.close(fd)
+        return ready
+
+    def _spawn_generation(self) -> set:
+        """Forks a full set of workers and waits until each of them accepts connections."""
+        # Objects created so far (model included) move to the permanent generation
+        gc.collect()
+        gc.freeze()
+
+        pending = dict(self._spawn_worker() for _ in range(self.num_workers))
+        ready = self._wait_ready(pending)
+        print(f"✅ {len(ready)}/{len(pending)} workers ready: {sorted(ready)}")
+        return set(pending)
+
+    def _stop_workers(self, pids, timeout):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            self._reap(remaining)
+            time.sleep(0.1)
+        for pid in remaining:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self._fail_orphaned_jobs(pids)
+
+    def _reap(self, pids: set = None):
+        """Collects exited workers; dead workers of the current generation are replaced."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pids is not None:
+                pids.discard(pid)
+            else:
+                self._fail_orphaned_jobs([pid])
+            self.retiring.discard(pid)
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self._should_exit:
+                    print(f"⚠️ Worker {pid} exited with status {status}; respawning.")
+                    new_pid, read_fd = self._spawn_worker()
+                    self.workers.add(new_pid)
+                    if not self._wait_ready({new_pid: read_fd}):
+                        print(f"⚠️ Replacement worker {new_pid} did not become ready.")
+
+    def _fail_orphaned_jobs(self, pids):
+        """
+        Marks jobs still queued or running under exited workers as failed; a worker killed
+        mid-job cannot do it itself. The store connection is closed before the next fork.
+        """
+        try:
+            store = JobStore(api.JOBS_DB)
+            try:
+                failed = store.fail_orphans(pids=pids)
+            finally:
+                store.close()
+        except Exception as e:
+            print(f"⚠️ Could not check jobs of exited workers: {e}")
+            return
+        if failed:
+            print(f"Marked {failed} jobs of exited workers as failed.")
+
+    # --- Parent lifecycle ---
+
+    def reload(self, load: bool = True):
+        """
+        Refreshes the model in the parent, forks a new generation, then retires the old one.
+        With `load=True` the latest servable MLflow run is activated if it is new; the
+        local model is only trained when nothing is active. With `load=False` the
+        registry already holds the new state (watcher or worker hand-off).
+        """
+        print("🔄 Reloading model and workers...")
+        if load:
+            api.model_registry.poll_once("activate")
+            if api.model_registry.active is None:
+                api.load_model()
+        old_workers = self.workers
+        self.workers = self._spawn_generation()
+        # Old workers stop accepting and finish in-flight requests; the new ones already share the socket
+        for pid in old_workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        self.retiring |= old_workers
+
+    def _apply_published_state(self) -> bool:
+        """
+        Applies the registry state a worker published; returns False if there was none.
+        A partially applied state still returns True: workers must follow the parent.
+        """
+        try:
+            with open(api.serving_state_path) as f:
+                state = json.load(f)
+            os.remove(api.serving_state_path)
+        except FileNotFoundError:
+            return False
+        try:
+            api.model_registry.apply_state(state)
+        except Exception as e:
+            print(f"⚠️ Could not fully apply the published model state: {e}")
+        return True
+
+    def _watch_registry(self):
+        """Polls MLflow every api.WATCH_INTERVAL seconds; a new run gets a new worker generation."""
+        if not api.WATCH_INTERVAL:
+            return
+        now = time.monotonic()
+        if self._next_watch is None:
+            self._next_watch = now + api.WATCH_INTERVAL
+        if now < self._next_watch:
+            return
+        self._next_watch = now + api.WATCH_INTERVAL
+        if api.model_registry.poll_once(api.WATCH_MODE, api.WATCH_SHADOW_FRACTION):
+            self.reload(load=False)
+
+    def report_memory(self):
+        print(f"Parent {os.getpid()}: {process_memory(os.getpid())}")
+        for pid in sorted(self.workers):
+            print(f"Worker {pid}: {process_memory(pid)}")
+
+    def _handle_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self._should_reload = True
+        elif signum == signal.SIGUSR2:
+            self._should_apply = True
+        elif signum == signal.SIGUSR1:
+            self._should_report = True
+        else:
+            self._should_exit = True
+
+    def run(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+        print(f"Starting NPS Latam API with {self.num_workers} workers on {self.host}:{self.port}...")
+        api.watch_in_worker = False
+        api.JOBS_SHUTDOWN_TIMEOUT = self.graceful_timeout
+        state_dir = tempfile.mkdtemp(prefix="nps-serve-")
+        api.serving_state_path = os.path.join(state_dir, "registry_state.json")
+        # Read by per-process state that must be shared between workers (chat memory backend)
+        os.environ["WEB_CONCURRENCY"] = str(self.num_workers)
+        api.load_model()
+        self.workers = self._spawn_generation()
+        self.report_memory()
+
+        for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._handle_signal)
+
+        while not self._should_exit:
+            if self._should_reload:
+                self._should_reload = False
+                self.reload()
+            if self._should_apply:
+                self._should_apply = False
+                if self._apply_published_state():
+                    self.reload(load=False)
+            if self._should_report:
+                self._should_report = False
+                self.report_memory()
+            self._watch_registry()
+            self._reap()
+            time.sleep(0.5)
+
+        print("Stopping workers...")
+        self._stop_workers(self.workers | self.retiring, self.graceful_timeout)
+        self.sock.close()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process NPS Latam API server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "0")) or None,
+                        help="Worker processes (default: API_WORKERS or available CPUs).")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    args = parser.parse_args()
+
+    PreforkServer(args.host, args.port, args.workers, graceful_timeout=args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+# Resolve the project root relative to this file
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+
+HEAVY_MODULES = ["sklearn", "langchain_google_genai", "mlflow", "evidently", "matplotlib", "seaborn"]
+
+_IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def _python_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(project_root / "src"), str(project_root), env.get("PYTHONPATH", "")])
+    return env
+
+
+def measure_import(module: str = "nps_latam", repeats: int = 5) -> dict:
+    """
+    Times `import <module>` in fresh interpreters and lists which heavy
+    dependencies the import dragged in.
+    """
+    timings = []
+    loaded = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True, env=_python_env(), cwd=project_root,
+        ).stdout.strip().splitlines()[-1]
+        elapsed, modules = out.split(" ", 1) if " " in out else (out, "")
+        timings.append(float(elapsed))
+        loaded = [m for m in modules.split(",") if m]
+    return {"module": module, "median_s": statistics.median(timings), "min_s": min(timings), "heavy_modules_loaded": loaded}
+
+
+def measure_api_ready(timeout: float = 300.0) -> dict:
+    """
+    Starts the API with uvicorn on a free port and measures the time until /health
+    answers and until it reports a loaded model (None if that does not happen within
+    `timeout` or the server exits first).
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.nps_latam.api:app", "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=_python_env(), cwd=project_root,
+    )
+    result = {"health_s": None, "model_loaded_s": None}
+    try:
+        while time.perf_counter() - start < timeout and proc.poll() is None:
+            try:
+                health = requests.get(f"http://127.0.0.1:{port}/health", timeout=1).json()
+            except requests.RequestException:
+                time.sleep(0.05)
+                continue
+            elapsed = time.perf_counter() - start
+            if result["health_s"] is None:
+                result["health_s"] = elapsed
+            if health.get("model_loaded"):
+                result["model_loaded_s"] = elapsed
+                break
+            # Serving before the model is active; keep polling until it is (or timeout)
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return result
+
+
+if __name__ == "__main__":
+    for module in ["nps_latam", "src.nps_latam.api"]:
+        stats = measure_import(module)
+        print(f"import {module}: median {stats['median_s'] * 1000:.1f} ms, "
+              f"min {stats['min_s'] * 1000:.1f} ms, heavy modules: {stats['heavy_modules_loaded'] or 'none'}")
+
+    ready = measure_api_ready()
+    print(f"API time-to-ready: /health {ready['health_s']}s, model loaded {ready['model_loaded_s']}s")
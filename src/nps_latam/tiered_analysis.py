@@ -0,0 +1,247 @@
+import re
+import threading
+import time
+import unicodedata
+
+import pandas as pd
+
+from .genai_features import analyze_feedback_cached, load_feedback_cache
+
+# Token prefixes per topic (English and Spanish); a token matches when it starts with a stem
+TOPIC_STEMS = {
+    "Wifi": ["wifi", "wi-fi", "internet", "conexion"],
+    "Food": ["food", "meal", "snack", "drink", "comida", "bebida", "vegetarian"],
+    "Delay": ["delay", "late", "retras", "demor", "cancel"],
+    "Luggage": ["luggage", "baggage", "bag", "suitcase", "equipaje", "maleta"],
+    "Cleanliness": ["dirty", "clean", "sucio", "limpi"],
+    "Legroom": ["legroom", "seat", "asiento", "espacio"],
+    "Service": ["crew", "staff", "service", "servicio", "tripulacion", "atencion"],
+}
+POSITIVE_STEMS = ["great", "excellent", "good", "smooth", "attentive", "friendly", "love", "amazing",
+                  "thank", "perfect", "excelente", "bueno", "buena", "genial", "gracias", "amable"]
+NEGATIVE_STEMS = ["worst", "terrible", "awful", "bad", "cold", "dirty", "lost", "unhappy", "broken", "rude",
+                  "horrible", "pesim", "malo", "mala", "sucio", "perdi", "retras", "demor", "frustr", "molest"]
+NEGATION_TOKENS = {"not", "no", "never", "nothing", "nunca", "nada", "sin", "ni"}
+BOOKING_STEMS = ["book", "rebook", "reserv", "ticket", "boleto", "pasaje", "cambiar", "change"]
+INQUIRY_STEMS = ["how", "when", "where", "what", "can", "could", "do", "does", "como", "cuando", "donde",
+                 "que", "tienen", "puedo", "hay"]
+
+SENTIMENT_SCORES = {"Positive": 1, "Neutral": 0, "Negative": -1}
+
+
+def _tokens(text: str) -> list:
+    normalized = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return re.findall(r"[a-z][a-z\-]*", normalized)
+
+
+def _matches(tokens, stems) -> int:
+    return sum(1 for token in tokens if any(token.startswith(stem) for stem in stems))
+
+
+def rule_keywords(text: str) -> list:
+    tokens = _tokens(text)
+    return [topic for topic, stems in TOPIC_STEMS.items() if _matches(tokens, stems)][:3]
+
+
+def rule_analysis(text: str):
+    """
+    Keyword-rule analysis. Returns the TextAnalysis fields, or None when the text is
+    ambiguous (mixed or negated sentiment, or no clear intent) and needs a better tier.
+    """
+    tokens = _tokens(text)
+    if NEGATION_TOKENS.intersection(tokens):
+        return None
+
+    positives, negatives = _matches(tokens, POSITIVE_STEMS), _matches(tokens, NEGATIVE_STEMS)
+    if positives and negatives:
+        return None
+    sentiment = "Positive" if positives else "Negative" if negatives else "Neutral"
+
+    question = "?" in text or (tokens and tokens[0] in INQUIRY_STEMS)
+    if _matches(tokens, BOOKING_STEMS):
+        intent = "Booking"
+    elif question:
+        # "My luggage is lost, can you help?" could be a complaint or an inquiry
+        if sentiment != "Neutral":
+            return None
+        intent = "Inquiry"
+    elif sentiment == "Negative":
+        intent = "Complaint"
+    elif sentiment == "Positive":
+        intent = "Feedback"
+    else:
+        return None
+
+    return {"sentiment": sentiment, "intent": intent, "keywords": rule_keywords(text)}
+
+
+class TieredFeedbackAnalyzer:
+    def __init__(self, cache_path: str = None, confidence_threshold: float = 0.8,
+                 llm_analyzer=None, min_training_texts: int = 30, refit_every: int = 100):
+        """
+        Feedback analyzer that tries cheap local tiers before the LLM.
+
+        Tiers, in order:
+            1. rules: keyword/lexicon rules, microseconds per text.
+            2. model: TF-IDF + logistic regression trained on cached LLM labels.
+            3. llm: analyze_feedback_cached (Gemini), only for texts the local tiers
+               could not classify with at least `confidence_threshold`.
+
+        Args:
+            cache_path (str): JSON cache of LLM labels; used to train tier 2 and filled by tier 3.
+            confidence_threshold (float): Minimum local-model probability (sentiment and intent) to skip the LLM.
+            llm_analyzer (callable): Batch analyzer passed to analyze_feedback_cached (defaults to Gemini).
+            min_training_texts (int): Cached labels needed before the local model is trained.
+            refit_every (int): Retrain the local model after this many texts escalated to the LLM.
+
+        Nothing is read or trained on construction: the local model is fitted in a
+        background thread (`fit_async`, started by the first `analyze` call at the
+        latest), so requests never wait on a fit and tier 3 covers until it is ready.
+        """
+        self.cache_path = cache_path
+        self.confidence_threshold = confidence_threshold
+        self.llm_analyzer = llm_analyzer
+        self.min_training_texts = min_training_texts
+        self.refit_every = refit_every
+        self._escalated_since_fit = 0
+
+        self.sentiment_model = None
+        self.intent_model = None
+        self._lock = threading.Lock()
+        self._stats = {tier: {"texts": 0, "seconds": 0.0} for tier in ("rules", "model", "llm")}
+        self._fit_thread = None
+        self._fit_started = False
+
+    def fit_async(self):
+        """Starts fit_from_cache in a daemon thread unless a fit is already running."""
+        with self._lock:
+            self._fit_started = True
+            if self._fit_thread is not None and self._fit_thread.is_alive():
+                return
+            self._fit_thread = threading.Thread(target=self._fit_safely, name="feedback-model-fit", daemon=True)
+            try:
+                self._fit_thread.start()
+            except RuntimeError:
+                # Interpreter shutting down; the current model (if any) keeps serving
+                self._fit_thread = None
+
+    def _fit_safely(self):
+        try:
+            self.fit_from_cache()
+        except Exception as e:
+            print(f"Local feedback model training failed: {e}")
+
+    def fit_from_cache(self) -> bool:
+        """(Re)trains the local model on cached LLM labels. Returns True if a model was trained."""
+        cache = load_feedback_cache(self.cache_path)
+
+        labelled = pd.DataFrame(
+            [{"text": t, "sentiment": v.get("sentiment"), "intent": v.get("intent")} for t, v in cache.items()]
+        )
+        if len(labelled) < self.min_training_texts:
+            return False
+        if labelled["sentiment"].nunique() < 2 or labelled["intent"].nunique() < 2:
+            return False
+
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+
+        def make_model():
+            return Pipeline([
+                ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, strip_accents="unicode")),
+                ("clf", LogisticRegression(max_iter=1000)),
+            ])
+
+        sentiment_model = make_model().fit(labelled["text"], labelled["sentiment"])
+        intent_model = make_model().fit(labelled["text"], labelled["intent"])
+        with self._lock:
+            self.sentiment_model, self.intent_model = sentiment_model, intent_model
+        print(f"Local feedback model trained on {len(labelled)} cached LLM labels.")
+        return True
+
+    def _record(self, tier: str, texts: int, seconds: float):
+        with self._lock:
+            self._stats[tier]["texts"] += texts
+            self._stats[tier]["seconds"] += seconds
+
+    def analyze(self, texts) -> pd.DataFrame:
+        """Analyzes texts; returns the same columns as analyze_feedback_batch."""
+        if not self._fit_started:
+            self.fit_async()
+        texts = list(texts)
+        results = [None] * len(texts)
+        pending = []
+
+        # Tier 1: rules
+        start = time.perf_counter()
+        for i, text in enumerate(texts):
+            if not text or not isinstance(text, str):
+                results[i] = {"sentiment": "N/A", "intent": "N/A", "keywords": []}
+                continue
+            results[i] = rule_analysis(text)
+            if results[i] is None:
+                pending.append(i)
+        self._record("rules", len(texts) - len(pending), time.perf_counter() - start)
+
+        # Tier 2: local model
+        sentiment_model, intent_model = self.sentiment_model, self.intent_model
+        if pending and sentiment_model is not None:
+            start = time.perf_counter()
+            batch = [texts[i] for i in pending]
+            sentiment_proba = sentiment_model.predict_proba(batch)
+            intent_proba = intent_model.predict_proba(batch)
+            still_pending = []
+            for row, i in enumerate(pending):
+                confidence = min(sentiment_proba[row].max(), intent_proba[row].max())
+                if confidence >= self.confidence_threshold:
+                    results[i] = {
+                        "sentiment": sentiment_model.classes_[sentiment_proba[row].argmax()],
+                        "intent": intent_model.classes_[intent_proba[row].argmax()],
+                        "keywords": rule_keywords(texts[i]),
+                    }
+                else:
+                    still_pending.append(i)
+            self._record("model", len(pending) - len(still_pending), time.perf_counter() - start)
+            pending = still_pending
+
+        # Tier 3: LLM (cached, batched)
+        if pending:
+            start = time.perf_counter()
+            llm_df = analyze_feedback_cached([texts[i] for i in pending], cache_path=self.cache_path,
+                                             analyzer=self.llm_analyzer)
+            for i, record in zip(pending, llm_df.to_dict(orient="records")):
+                results[i] = {k: record[k] for k in ("sentiment", "intent", "keywords")}
+            self._record("llm", len(pending), time.perf_counter() - start)
+
+            # New LLM labels are training data for the local model; refit off the request path
+            with self._lock:
+                self._escalated_since_fit += len(pending)
+                refit = self._escalated_since_fit >= self.refit_every
+                if refit:
+                    self._escalated_since_fit = 0
+            if refit:
+                self.fit_async()
+
+        features_df = pd.DataFrame(results, columns=["sentiment", "intent", "keywords"])
+        features_df['original_text'] = texts
+        features_df['sentiment_score'] = features_df['sentiment'].map(SENTIMENT_SCORES).fillna(0)
+        return features_df
+
+    def stats(self) -> dict:
+        """Share of texts handled per tier, escalation rate to the LLM and mean latency per text."""
+        with self._lock:
+            total = sum(s["texts"] for s in self._stats.values())
+            return {
+                "texts": total,
+                "escalation_rate": self._stats["llm"]["texts"] / total if total else None,
+                "local_model_trained": self.sentiment_model is not None,
+                "tiers": {
+                    tier: {
+                        "texts": s["texts"],
+                        "share": s["texts"] / total if total else None,
+                        "mean_latency_ms": 1000 * s["seconds"] / s["texts"] if s["texts"] else None,
+                    }
+                    for tier, s in self._stats.items()
+                },
+            }
@@ -1,13 +1,10 @@
 import pandas as pd
-import mlflow
-import mlflow.sklearn
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, confusion_matrix
 import os
+import time
 import sys
+import shutil
+import tempfile
+import threading
 from pathlib import Path
 
 # Add project root to sys.path
@@ -17,14 +14,80 @@ if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
 from src.nps_latam.data_pipeline import clean_and_save_dataset, split_data
-from src.nps_latam.genai_features import analyze_feedback_batch
+from src.nps_latam.genai_features import build_text_features
+from src.nps_latam.evaluation import bootstrap_metrics
+from src.nps_latam.log_analytics import log_summary
+from src.nps_latam.ingestion import load_dataset
+from src.nps_latam.data_quality import validate_dataset
 
-def train_and_track():
-    mlflow.set_tracking_uri("file://" + str(project_root / "mlruns"))
+def log_feature_importance_plot(run_id: str, feature_importance: pd.Series, tracking_uri: str):
+    """
+    Renders the top-20 feature importance chart and attaches it to a finished run.
+    Uses the object-oriented matplotlib API, so it is safe off the main thread.
+    The chart is rendered in a per-call temp directory so concurrent runs never
+    upload each other's plot; reports/feature_importance.png is then replaced
+    atomically as the latest local copy.
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    from mlflow.tracking import MlflowClient
+
+    top = feature_importance.sort_values(ascending=False).head(20)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(x=top, y=top.index, ax=ax)
+    ax.set_title("Top 20 Feature Importance")
+    fig.tight_layout()
+    with tempfile.TemporaryDirectory(prefix=f"plots-{run_id}-") as tmp_dir:
+        # Same artifact name for every run
+        plot_path = os.path.join(tmp_dir, "feature_importance.png")
+        fig.savefig(plot_path)
+        MlflowClient(tracking_uri=tracking_uri).log_artifact(run_id, plot_path)
+
+        report_path = project_root / "reports" / "feature_importance.png"
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        staged = f"{report_path}.{run_id}.tmp"
+        shutil.copyfile(plot_path, staged)
+        os.replace(staged, report_path)
+    print(f"Feature importance plot logged to run {run_id}.")
+
+def train_and_track(use_text_features: bool = None, progress=None, defer_plots: bool = True):
+    """
+    Trains the RandomForest model and tracks it in MLflow.
+
+    Params and metrics are collected while the run progresses and sent in one
+    log_params/log_metrics batch each, instead of one store write per value.
+
+    Args:
+        use_text_features (bool): Join GenAI text features (sentiment, intent, topics)
+            into the training matrix. Defaults to the NPS_TEXT_FEATURES env var.
+        progress (callable): Optional f(fraction, message) called at each stage (used by the job queue).
+        defer_plots (bool): Render the feature importance plot in a background thread after
+            the run is closed, so it is not on the training critical path.
+
+    Returns:
+        dict: Run id and validation metrics, or None if the run did not complete.
+    """
+    progress = progress or (lambda fraction, message: None)
+    if use_text_features is None:
+        use_text_features = os.getenv("NPS_TEXT_FEATURES", "0") == "1"
+
+    # Heavy dependencies are imported on use so importing this module stays cheap
+    import mlflow
+    import mlflow.sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    tracking_uri = "file://" + str(project_root / "mlruns")
+    mlflow.set_tracking_uri(tracking_uri)
     mlflow.set_experiment("NPS_Latam_Model_Tracking")
+    params, metrics = {}, {}
     
-    with mlflow.start_run():
+    with mlflow.start_run() as run:
         print("Starting MLflow run...")
+        # Full retrains are the root of incremental lineages (see incremental_training)
+        mlflow.set_tags({"training_mode": "full", "model_artifact_path": "random_forest_model"})
+        progress(0.05, "Loading data")
         
         # 1. Load Data
         data_path = project_root / "Data" / "Satisfaccion_pasajeros_limpio.csv"
@@ -32,38 +95,80 @@ def train_and_track():
             print(f"Data not found at {data_path}")
             return
             
-        df = pd.read_csv(data_path)
+        # Downcast dtypes, chunked when a default read would not fit INGEST_MEMORY_BUDGET_MB
+        df = load_dataset(data_path)
         
         # 2. Integrate Chatbot Logs (as requested)
-        # We attempt to load logs to potential use as additional data or just log stats
+        # Totals come from the incremental log aggregates, so the log is never read whole
         logs_path = project_root / "Data" / "chatbot_logs.csv"
         if logs_path.exists():
-            logs_df = pd.read_csv(logs_path)
-            mlflow.log_metric("chatbot_interactions_count", len(logs_df))
-            print(f"Found {len(logs_df)} chatbot interactions.")
+            log_stats = log_summary(str(logs_path), snapshot_path=str(project_root / "Data" / "chatbot_log_stats.json"))
+            metrics["chatbot_interactions_count"] = log_stats["total_interactions"]
+            metrics["chatbot_error_rate"] = log_stats["error_rate"]
+            print(f"Found {log_stats['total_interactions']} chatbot interactions.")
             
             # Feature Idea: Use GenAI to extract sentiment from logs and maybe perform online learning
             # For now, we just track the volume.
         
+        # 2b. Data quality gate: bad rows are quarantined, schema failures stop the run
+        progress(0.1, "Validating data")
+        df, quality = validate_dataset(df, name="training")
+        metrics["dq_bad_rows"] = quality["bad_rows"]
+        mlflow.log_artifact(quality["report_path"])
+        if quality["bad_rows"]:
+            print(f"Quarantined {quality['bad_rows']} invalid rows to {quality['quarantine_path']}.")
+        if not quality["passed"]:
+            print("Data quality check failed: " + "; ".join(quality["failures"]))
+            mlflow.set_tag("data_quality", "failed")
+            mlflow.log_metrics(metrics)
+            return
+
         # 3. Preprocess
         # Using existing pipeline
+        progress(0.15, "Preprocessing")
         try:
              # Ensure target mapping explicitly if needed, or rely on clean_and_save_dataset
             df_clean = clean_and_save_dataset(df, output_path=None)
+        except Exception as e:
+            print(f"Preprocessing failed: {e}")
+            return
+
+        # 3b. Optional GenAI text features
+        # Built from df_clean, which no longer has Satisfaccion, so the synthetic
+        # feedback cannot leak the label into the features.
+        params["text_features"] = use_text_features
+        if use_text_features:
+            progress(0.25, "Building text features")
+            stage_start = time.perf_counter()
+            try:
+                text_features = build_text_features(
+                    df_clean, cache_path=str(project_root / "Data" / "genai_feedback_cache.json")
+                )
+                df_clean = pd.concat([df_clean, text_features], axis=1)
+                print(f"Joined {text_features.shape[1]} text feature columns.")
+            except Exception as e:
+                print(f"Text feature stage failed, training without it: {e}")
+            metrics["text_features_seconds"] = time.perf_counter() - stage_start
+
+        try:
             X_train, X_valid, X_test, y_train, y_valid, y_test = split_data(df_clean)
         except Exception as e:
             print(f"Preprocessing failed: {e}")
+            mlflow.log_params(params)
+            mlflow.log_metrics(metrics)
             return
 
         # 4. Model Training
         n_estimators = 100
         max_depth = 10
         
-        mlflow.log_param("n_estimators", n_estimators)
-        mlflow.log_param("max_depth", max_depth)
+        params.update(n_estimators=n_estimators, max_depth=max_depth)
+        mlflow.log_params(params)
         
+        progress(0.4, "Training")
         clf = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42)
         clf.fit(X_train, y_train)
+        progress(0.75, "Evaluating")
         
         # 5. Evaluation
         y_pred = clf.predict(X_valid)
@@ -75,24 +180,37 @@ def train_and_track():
         
         print(f"Validation Metrics: Accuracy={acc:.4f}, F1={f1:.4f}, AUC={auc:.4f}")
         
-        mlflow.log_metric("accuracy", acc)
-        mlflow.log_metric("f1_score", f1)
-        mlflow.log_metric("roc_auc", auc)
+        metrics.update(accuracy=acc, f1_score=f1, roc_auc=auc)
+
+        # Bootstrap intervals tell the release gate whether a metric change is noise
+        segment_cols = [c for c in ("Clase", "Tipo_Cliente", "Age_Bin") if c in df.columns]
+        # In-process by default: training also runs inside API job threads next to the serving workers
+        ci_df = bootstrap_metrics(y_valid, y_prob, segments=df.loc[X_valid.index, segment_cols], n_boot=200,
+                                  n_jobs=int(os.getenv("TRAIN_BOOTSTRAP_JOBS", "1")))
+        overall = ci_df[ci_df["segment"] == "all"].set_index("metric")
+        for metric in ("roc_auc", "f1_score", "accuracy"):
+            metrics[f"{metric}_ci_lower"] = overall.loc[metric, "lower"]
+            metrics[f"{metric}_ci_upper"] = overall.loc[metric, "upper"]
+        mlflow.log_metrics(metrics)
+        ci_path = project_root / "reports" / "segment_metrics.csv"
+        os.makedirs(os.path.dirname(ci_path), exist_ok=True)
+        ci_df.to_csv(ci_path, index=False)
+        mlflow.log_artifact(str(ci_path))
         
         # 6. Log Model
+        progress(0.85, "Logging model")
         mlflow.sklearn.log_model(clf, "random_forest_model")
         
-        # 7. Feature Importance Plot
-        feature_imp = pd.Series(clf.feature_importances_, index=X_train.columns).sort_values(ascending=False)
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x=feature_imp.head(20), y=feature_imp.head(20).index)
-        plt.title("Top 20 Feature Importance")
-        plt.tight_layout()
-        plot_path = project_root / "reports" / "feature_importance.png"
-        os.makedirs(os.path.dirname(plot_path), exist_ok=True)
-        plt.savefig(plot_path)
-        mlflow.log_artifact(str(plot_path))
+        feature_importance = pd.Series(clf.feature_importances_, index=X_train.columns)
         print("Run complete.")
 
+    # 7. Feature Importance Plot, attached to the closed run
+    if defer_plots:
+        threading.Thread(target=log_feature_importance_plot, name="mlflow-plots",
+                         args=(run.info.run_id, feature_importance, tracking_uri)).start()
+    else:
+        log_feature_importance_plot(run.info.run_id, feature_importance, tracking_uri)
+    return {"run_id": run.info.run_id, "accuracy": acc, "f1_score": f1, "roc_auc": auc}
+
 if __name__ == "__main__":
     train_and_track()